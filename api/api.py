@@ -1,5 +1,5 @@
 # uvicorn api.test_api:app --reload --port 8000 hiring
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form, BackgroundTasks, Request
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
@@ -11,14 +11,26 @@ import tempfile
 import json
 from src.vector_db import initialize_system, save_data
 from src.cv_management import add_cv, remove_cv_from_system
-from src.ranking import rank_cvs
-from src.text_processing import extract_text_from_pdf, clean_text
+from src.ranking import rank_cvs_progressive, insert_candidate, refine_window, remove_candidate, RERANKERS
+from src.ranking_scheduler import RankingScheduler, RankingSnapshot
+from src.job_cache import get_job_artifacts
+from src.job_matrix import get_job_ranking, has_refined_ranking, save_refined_ranking
+from src.job_index import get_job_index, matching_jobs
+from src.corpus_ranking import corpus_ranking
+from src.neighbor_graph import get_neighbor_graph
+from src.section_scoring import section_weights, set_section_weights
+from src.skills import get_vocabulary, record_skills
 from src.chat import compare_candidates
-from config import AZURE_CONFIG, DEPLOYMENT_NAME
-from langchain_openai import AzureChatOpenAI
+from src.snapshot import current_generation, load_if_changed, save_ranking, load_ranking_state, ranking_mtime
+from src.llm_gateway import get_llm, get_metrics
+from config import SNAPSHOT_POLL_SECONDS, CORPUS_RANKING, RANKING_SCORER, NEIGHBOR_GRAPH_K, RANKING_DEADLINE_MS
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
 import datetime
 import io
+import time
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
 
 # Initialize FastAPI app
 app = FastAPI(title="CV Chatbot API", description="RESTful API for CV chatbot functionality")
@@ -38,22 +50,214 @@ job_desc_path = "junior_devops_requirements.pdf"
 
 # Global variables to store system state
 faiss_index, metadata = None, None
-ranked_cvs = None
+
+# The current RankingSnapshot, replaced whole (never modified) under ranking_lock.
+# Its version is bumped on every change; provisional rankings are in vector
+# order, awaiting the re-ranker.
+ranking_snapshot = None
+ranking_lock = threading.RLock()
+
+# Skill filters of the latest ranking request; cleared when the active job changes
+skill_filters = {"must_have": (), "nice_to_have": ()}
+
+# Snapshot generation this worker has loaded, and when it last checked for a newer one
+snapshot_generation = None
+ranking_loaded_mtime = None
+last_snapshot_check = 0.0
+
+def current_ranking():
+    """The current ranked candidates, or None before the first ranking"""
+    snapshot = ranking_snapshot
+    return snapshot.candidates if snapshot is not None else None
+
+def inputs_tag(ranking_job=None):
+    """(index generation, job description hash) a ranking started now is computed from"""
+    return snapshot_generation, get_job_artifacts(ranking_job or job_desc_path).content_hash
+
+def set_ranking(new_ranking, provisional=False, tag=None):
+    """Swap a new ranking snapshot in for this worker; returns it"""
+    global ranking_snapshot
+    with ranking_lock:
+        generation, job_hash = tag or inputs_tag()
+        version = ranking_snapshot.version + 1 if ranking_snapshot is not None else 1
+        ranking_snapshot = RankingSnapshot(new_ranking, version, generation, job_hash, provisional)
+        return ranking_snapshot
+
+def publish_ranking(new_ranking, provisional=False, tag=None):
+    """
+    Make a ranking current in this worker and share it with the others.
+    Returns the new snapshot, or None if tag (the inputs the ranking was
+    computed from) is no longer current, in which case nothing is published.
+    """
+    global ranking_loaded_mtime
+    with ranking_lock:
+        if tag is not None and tag != inputs_tag():
+            print(f"Discarding ranking computed for {tag}, inputs are now {inputs_tag()}")
+            return None
+        snapshot = set_ranking(new_ranking, provisional, tag)
+        save_ranking(snapshot.candidates, job_desc_path, snapshot_generation, provisional=provisional)
+        ranking_loaded_mtime = ranking_mtime(snapshot_generation)
+        return snapshot
+
+def store_refined_ranking(ranking_job, ranking, filters, stats):
+    # The batch store keeps one ranking per job, so filtered rankings are not stored there
+    if stats.get("reranker") != "none" and not any(filters.values()):
+        save_refined_ranking(ranking_job, ranking, snapshot_generation)
+
+def upgrade_ranking(pending, provisional, ranking_job, filters, stats):
+    """Replace a provisional ranking with the re-ranked one, unless something newer was published meanwhile"""
+    try:
+        ranking = pending.result()
+    except Exception as e:
+        print(f"Error re-ranking: {str(e)}")
+        return
+    with ranking_lock:
+        if ranking_snapshot is not provisional:
+            print(f"Discarding late re-ranking of version {provisional.version}, now at {ranking_snapshot.version}")
+            return
+        if publish_ranking(ranking, tag=provisional.tag) is None:
+            return
+    store_refined_ranking(ranking_job, ranking, filters, stats)
+
+def rank_progressively(ranking_job, filters, tag, **options):
+    """
+    Publish a ranking within RANKING_DEADLINE_MS: the re-ranked one if it is
+    ready, else the vector order as provisional, upgraded when the re-ranker finishes.
+    """
+    stats = {}
+    ranking, pending = rank_cvs_progressive(ranking_job, faiss_index, metadata, stats=stats, **options, **filters)
+    snapshot = publish_ranking(ranking, provisional=pending is not None, tag=tag)
+    if snapshot is None:
+        # A re-ranking of stale inputs is not wanted; if it already started, let it finish first
+        if pending is not None and not pending.cancel():
+            ranking_scheduler.hold(pending)
+        return {"discarded": True}
+    if pending is None:
+        store_refined_ranking(ranking_job, ranking, filters, stats)
+    else:
+        pending.add_done_callback(lambda done: upgrade_ranking(done, snapshot, ranking_job, filters, stats))
+        # No other ranking starts until this re-ranking has been published or discarded
+        ranking_scheduler.hold(pending)
+    stats.update(provisional=snapshot.provisional, version=snapshot.version)
+    return stats
+
+def place_new_candidates(current, added, ranking_job, filters, tag):
+    """Place newly added CVs into the current ranking instead of re-ranking everyone"""
+    ranking, positions = list(current.candidates), []
+    for filename in added:
+        record = next((cv for cv in reversed(metadata) if cv.filename == filename), None)
+        if record is None:
+            continue
+        # Scoring one CV against the cached job vector takes milliseconds;
+        # most uploads don't make the ranked pool and stop here
+        ranking, position = insert_candidate(ranking, record, ranking_job, filters["must_have"])
+        if position is not None:
+            positions.append(position)
+    if not positions:
+        return {}
+    if len(positions) > 1:
+        # One ranking of the whole pool beats a window re-ranking per new CV
+        return rank_progressively(ranking_job, filters, tag)
+    
+    # Show the provisional placement right away, then let the LLM
+    # re-order just the neighbourhood around it
+    if publish_ranking(ranking, tag=tag) is None:
+        return {"discarded": True}
+    snapshot = publish_ranking(refine_window(ranking, positions[0], ranking_job), tag=tag)
+    if snapshot is None:
+        return {"discarded": True}
+    return {"provisional": False, "version": snapshot.version}
+
+def run_ranking(batch):
+    """Bring the ranking up to date with a batch of scheduled requests (see RankingScheduler)"""
+    ranking_job, filters = job_desc_path, skill_filters
+    tag = inputs_tag(ranking_job)
+    current = ranking_snapshot
+    try:
+        # Provisional rankings are re-ranked rather than patched: the re-ranking
+        # they were waiting for is discarded once the CV set changes
+        if batch["full"] or current is None or current.provisional or current.job_hash != tag[1]:
+            stats = rank_progressively(ranking_job, filters, tag, **batch["options"])
+        else:
+            stats = place_new_candidates(current, batch["added"], ranking_job, filters, tag)
+    except Exception as e:
+        print(f"Error updating rankings: {str(e)}")
+        return {}
+    # {"discarded": True} makes the scheduler run the batch again on the new inputs
+    return stats
+
+ranking_scheduler = RankingScheduler(run_ranking)
+
+def load_initial_ranking():
+    """Adopt the ranking another worker stored for this snapshot, or compute it"""
+    global ranking_loaded_mtime
+    stored = load_ranking_state(metadata, job_desc_path, snapshot_generation)
+    if stored is not None:
+        set_ranking(*stored)
+        ranking_loaded_mtime = ranking_mtime(snapshot_generation)
+    else:
+        rank_progressively(job_desc_path, skill_filters, inputs_tag())
 
 try:
     faiss_index, metadata = initialize_system(cv_dir)
-    ranked_cvs = rank_cvs(job_desc_path, faiss_index, metadata)
+    snapshot_generation = current_generation()
+    load_initial_ranking()
 except Exception as e:
     print(f"Error initializing system: {str(e)}")
 
-# Initialize language model for chat
-chat_model = AzureChatOpenAI(
-    azure_endpoint=AZURE_CONFIG["azure_endpoint"],
-    api_key=AZURE_CONFIG["api_key"],
-    api_version=AZURE_CONFIG["api_version"],
-    deployment_name=DEPLOYMENT_NAME,
-    temperature=0.3
-)
+def refresh_snapshot():
+    """Pick up a newer snapshot generation (or ranking) written by another worker"""
+    global faiss_index, metadata, snapshot_generation, ranking_loaded_mtime, last_snapshot_check
+    
+    now = time.monotonic()
+    if now - last_snapshot_check < SNAPSHOT_POLL_SECONDS:
+        return
+    last_snapshot_check = now
+    
+    try:
+        loaded = load_if_changed(snapshot_generation)
+        if loaded is not None:
+            faiss_index, metadata, snapshot_generation = loaded
+            print(f"Switched to snapshot generation {snapshot_generation}")
+            # Until a ranking for the new generation shows up, drop CVs that no longer exist
+            with ranking_lock:
+                current = ranking_snapshot
+                if current is not None:
+                    present = {cv.filename for cv in metadata}
+                    set_ranking([cv for cv in current.candidates if cv.filename in present], current.provisional,
+                                (snapshot_generation, current.job_hash))
+        
+        mtime = ranking_mtime(snapshot_generation)
+        if mtime is not None and mtime != ranking_loaded_mtime:
+            stored = load_ranking_state(metadata, job_desc_path, snapshot_generation)
+            if stored is not None:
+                set_ranking(*stored)
+            ranking_loaded_mtime = mtime
+    except Exception as e:
+        print(f"Error refreshing snapshot: {str(e)}")
+
+# Language model for chat (shared, pooled client from the LLM gateway)
+chat_model = get_llm(temperature=0.3, purpose="chat")
+
+def current_ordering(ranked=None):
+    """The ranked head followed by the vector-ranked rest of the corpus, or None when paging is off"""
+    if CORPUS_RANKING != "on" or not metadata:
+        return None
+    return corpus_ranking(get_job_artifacts(job_desc_path), metadata, ranked or current_ranking(),
+                          must_have=skill_filters["must_have"])
+
+def candidate_at(candidate_id):
+    """Candidate at a position of the full ordering (None if out of range)"""
+    ranked = current_ranking()
+    ordering = current_ordering(ranked)
+    if ordering is not None:
+        return ordering.at(candidate_id)
+    return ranked[candidate_id] if 0 <= candidate_id < len(ranked) else None
+
+@app.middleware("http")
+async def sync_snapshot(request: Request, call_next):
+    await run_in_threadpool(refresh_snapshot)
+    return await call_next(request)
 
 # Define request and response models
 class Message(BaseModel):
@@ -71,6 +275,9 @@ class JobRequirementsTextUpdate(BaseModel):
     title: str
     requirements_text: str
 
+class SectionWeightsUpdate(BaseModel):
+    weights: Optional[Dict[str, float]] = None
+
 class JobApplication(BaseModel):
     job_id: str
     applicant_name: str
@@ -89,16 +296,30 @@ def health_check():
         return JSONResponse(status_code=503, content={"status": "error", "message": "System not initialized"})
     return {"status": "healthy", "cv_count": len(metadata)}
 
+@app.get("/llm-metrics")
+def llm_metrics():
+    """Latency, error and token counters of this worker's LLM calls"""
+    return {"metrics": get_metrics()}
+
 @app.get("/candidates")
-def get_candidates(top_n: Optional[int] = 20):
-    """Get the top N candidates for the job description"""
-    global ranked_cvs
-    
-    if ranked_cvs is None:
+def get_candidates(top_n: Optional[int] = 20, offset: int = 0, limit: Optional[int] = None):
+    """Get a page of candidates for the job description (the top N by default)"""
+    snapshot = ranking_snapshot
+    if snapshot is None:
         raise HTTPException(status_code=503, detail="System not initialized")
+    if limit is None:
+        limit = top_n
+    offset = max(offset, 0)
+    
+    # Past the LLM-ranked head, pages come from the cached full-corpus ordering
+    ordering = current_ordering(snapshot.candidates)
+    if ordering is not None:
+        page, total = ordering.page(offset, max(limit, 0)), len(ordering)
+    else:
+        page, total = snapshot.candidates[offset:offset + max(limit, 0)], len(snapshot.candidates)
         
     candidates = []
-    for i, cv in enumerate(ranked_cvs[:min(top_n, len(ranked_cvs))]):
+    for i, cv in enumerate(page, start=offset):
         candidates.append({
             "id": i,
             "filename": cv["filename"],
@@ -107,27 +328,65 @@ def get_candidates(top_n: Optional[int] = 20):
             "summary": cv["cleaned_text"][:6000] + "..." if len(cv["cleaned_text"]) > 1000 else cv["cleaned_text"]
         })
         
-    return {"candidates": candidates}
+    return {"candidates": candidates, "offset": offset, "total": total,
+            "version": snapshot.version, "provisional": snapshot.provisional}
 
 @app.get("/candidates/{candidate_id}")
 def get_candidate_details(candidate_id: int):
     """Get detailed information about a specific candidate"""
-    global ranked_cvs
-    
-    if ranked_cvs is None:
+    if ranking_snapshot is None:
         raise HTTPException(status_code=503, detail="System not initialized")
         
-    if candidate_id < 0 or candidate_id >= len(ranked_cvs):
+    cv = candidate_at(candidate_id)
+    if cv is None:
         raise HTTPException(status_code=404, detail=f"Candidate with ID {candidate_id} not found")
         
-    cv = ranked_cvs[candidate_id]
     return {
         "id": candidate_id,
         "filename": cv["filename"],
         "similarity": cv["similarity"],
         "contact": cv["contact"],
         "full_text": cv["raw_text"],
-        "cleaned_text": cv["cleaned_text"]
+        "cleaned_text": cv["cleaned_text"],
+        "skills": record_skills(cv.record)
+    }
+
+@app.get("/candidates/{candidate_id}/matching-jobs")
+def get_matching_jobs(candidate_id: int, top_n: Optional[int] = 5):
+    """Get the job posts that best fit a specific candidate"""
+    if ranking_snapshot is None:
+        raise HTTPException(status_code=503, detail="System not initialized")
+    if top_n is None or top_n < 1:
+        raise HTTPException(status_code=400, detail="top_n must be at least 1")
+        
+    cv = candidate_at(candidate_id)
+    if cv is None:
+        raise HTTPException(status_code=404, detail=f"Candidate with ID {candidate_id} not found")
+    
+    jobs = matching_jobs(cv, top_n)
+    for job in jobs:
+        job["is_current"] = os.path.abspath(job["path"]) == os.path.abspath(job_desc_path)
+    return {"id": candidate_id, "filename": cv.filename, "jobs": jobs}
+
+@app.get("/candidates/{candidate_id}/similar")
+def get_similar_candidates(candidate_id: int, top_n: Optional[int] = 5):
+    """Get the CVs most similar to a specific candidate, from the precomputed neighbour graph"""
+    if ranking_snapshot is None:
+        raise HTTPException(status_code=503, detail="System not initialized")
+    # The graph only keeps NEIGHBOR_GRAPH_K neighbours per CV
+    if top_n is None or not 1 <= top_n <= NEIGHBOR_GRAPH_K:
+        raise HTTPException(status_code=400, detail=f"top_n must be between 1 and {NEIGHBOR_GRAPH_K}")
+        
+    cv = candidate_at(candidate_id)
+    if cv is None:
+        raise HTTPException(status_code=404, detail=f"Candidate with ID {candidate_id} not found")
+    
+    similar = get_neighbor_graph(metadata).similar(cv.filename, top_n)
+    return {
+        "id": candidate_id,
+        "filename": cv.filename,
+        "similar": [{"filename": other.filename, "similarity": other.similarity, "contact": other.contact}
+                    for other in similar],
     }
 
 # Add a new endpoint to get job requirements/post
@@ -140,23 +399,21 @@ def get_job_requirements():
         if not os.path.exists(job_desc_path):
             return {"requirements": "Job description file not found"}
         
-        job_text = extract_text_from_pdf(job_desc_path)
-        cleaned_job_text = clean_text(job_text)
+        job = get_job_artifacts(job_desc_path)
         
         return {
-            "requirements": job_text,
-            "cleaned_requirements": cleaned_job_text,
+            "requirements": job.raw_text,
+            "cleaned_requirements": job.cleaned_text,
             "filename": os.path.basename(job_desc_path)
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving job requirements: {str(e)}")
 
 @app.post("/job-requirements/upload-pdf", status_code=201)
-async def upload_job_requirements_pdf(background_tasks: BackgroundTasks, 
-                                     title: str = Form(...),
+async def upload_job_requirements_pdf(title: str = Form(...),
                                      file: UploadFile = File(...)):
     """Upload a new job post PDF file"""
-    global job_desc_path, ranked_cvs, faiss_index, metadata
+    global job_desc_path, skill_filters
     
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
@@ -176,20 +433,25 @@ async def upload_job_requirements_pdf(background_tasks: BackgroundTasks,
         with open(file_path, "wb") as buffer:
             buffer.write(await file.read())
         
+        # Parse and embed the new job post once, up front, for every consumer
+        await run_in_threadpool(get_job_artifacts, str(file_path))
+        await run_in_threadpool(get_job_index().add_job, str(file_path))
+        
         # Update the global job description path
         job_desc_path = str(file_path)
+        skill_filters = {"must_have": (), "nice_to_have": ()}
         
-        # Update rankings in the background
-        background_tasks.add_task(update_rankings)
+        # Re-rank once the scheduler's debounce window closes
+        ranking_scheduler.request(full=True)
         
         return {"status": "success", "message": f"Job requirements uploaded as {filename}", "path": str(file_path)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading job requirements: {str(e)}")
 
 @app.post("/job-requirements/update-text", status_code=201)
-async def update_job_requirements_text(background_tasks: BackgroundTasks, request: JobRequirementsTextUpdate):
+async def update_job_requirements_text(request: JobRequirementsTextUpdate):
     """Update job post from text input"""
-    global job_desc_path, ranked_cvs
+    global job_desc_path, skill_filters
     
     try:
         # Create jobs directory if it doesn't exist
@@ -217,11 +479,16 @@ async def update_job_requirements_text(background_tasks: BackgroundTasks, reques
         # Save the PDF
         pdf.output(str(file_path))
         
+        # Parse and embed the new job post once, up front, for every consumer
+        await run_in_threadpool(get_job_artifacts, str(file_path))
+        await run_in_threadpool(get_job_index().add_job, str(file_path))
+        
         # Update the global job description path
         job_desc_path = str(file_path)
+        skill_filters = {"must_have": (), "nice_to_have": ()}
         
-        # Update rankings in the background
-        background_tasks.add_task(update_rankings)
+        # Re-rank once the scheduler's debounce window closes
+        ranking_scheduler.request(full=True)
         
         return {"status": "success", "message": f"Job requirements created as {filename}", "path": str(file_path)}
     except Exception as e:
@@ -257,9 +524,9 @@ def list_job_requirements():
     return {"job_files": sorted(job_files, key=lambda x: x["is_current"], reverse=True)}
 
 @app.post("/job-requirements/set-active/{path}")
-def set_active_job_requirements(path: str, background_tasks: BackgroundTasks):
+def set_active_job_requirements(path: str):
     """Set a specific job post file as active"""
-    global job_desc_path
+    global job_desc_path, skill_filters
     
     # URL decode the path if needed
     import urllib.parse
@@ -269,17 +536,59 @@ def set_active_job_requirements(path: str, background_tasks: BackgroundTasks):
     if not file_path.exists():
         raise HTTPException(status_code=404, detail=f"Job requirements file not found: {path}")
     
+    # Parse and embed the job post once, up front, for every consumer
+    get_job_artifacts(str(file_path))
     job_desc_path = str(file_path)
+    skill_filters = {"must_have": (), "nice_to_have": ()}
     
-    # Update rankings in the background
-    background_tasks.add_task(update_rankings)
+    # Switching jobs is a lookup in the batch CVs x jobs rankings; the LLM only
+    # runs the first time a job is activated on the current data
+    if metadata is None:
+        # Nothing to rank until the system is initialized
+        return {"status": "success", "message": f"Active job requirements set to {file_path.name}",
+                "path": str(file_path), "ranking": None}
+    refined = has_refined_ranking(job_desc_path, snapshot_generation)
+    # Without a refined ranking this is the vector order, provisional until the re-rank replaces it
+    publish_ranking(get_job_ranking(metadata, job_desc_path, snapshot_generation), provisional=not refined)
+    if not refined:
+        ranking_scheduler.request(full=True)
     
-    return {"status": "success", "message": f"Active job requirements set to {file_path.name}", "path": str(file_path)}
+    return {"status": "success", "message": f"Active job requirements set to {file_path.name}", "path": str(file_path),
+            "ranking": "refined" if refined else "vector"}
+
+@app.get("/job-requirements/section-weights")
+def get_section_weights():
+    """Section weights of the active job for the "sections" scorer, and the sections found in it"""
+    try:
+        job = get_job_artifacts(job_desc_path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving job requirements: {str(e)}")
+    return {
+        "filename": os.path.basename(job_desc_path),
+        "weights": section_weights(job_desc_path),
+        "sections": list(job.section_spans),
+        "scorer": RANKING_SCORER,
+    }
+
+@app.post("/job-requirements/section-weights")
+def update_section_weights(request: SectionWeightsUpdate):
+    """Override the active job's section weights (null weights restore the defaults)"""
+    try:
+        set_section_weights(job_desc_path, request.weights)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Error saving section weights: {str(e)}")
+    # Only the "sections" scorer reads the weights
+    if RANKING_SCORER == "sections":
+        ranking_scheduler.request(full=True)
+    return {"status": "success", "filename": os.path.basename(job_desc_path),
+            "weights": section_weights(job_desc_path)}
 
 @app.post("/chat")
 def chat_with_bot(request: ChatRequest):
     """Chat with the AI assistant about candidates"""
-    global ranked_cvs
+    ranked_cvs = current_ranking()
     
     try:
         messages = [{"role": m.role, "content": m.content} for m in request.messages]
@@ -289,7 +598,7 @@ def chat_with_bot(request: ChatRequest):
         
         if system_message_index is None and ranked_cvs:
             # Get job requirements
-            job_text = extract_text_from_pdf(job_desc_path)
+            job_text = get_job_artifacts(job_desc_path).raw_text
             
             # If no system message exists but we have candidates, add one with both job and candidate info
             system_content = "You are an AI assistant that helps analyze CV candidates for job matching.\n\n"
@@ -344,25 +653,24 @@ def chat_with_bot(request: ChatRequest):
 @app.post("/compare-candidates")
 def compare_candidates_endpoint(request: CandidateComparisonRequest):
     """Compare two candidates"""
-    global ranked_cvs
-    
-    if ranked_cvs is None:
+    if ranking_snapshot is None:
         raise HTTPException(status_code=503, detail="System not initialized")
         
-    if (request.candidate1_index < 0 or request.candidate1_index >= len(ranked_cvs) or
-        request.candidate2_index < 0 or request.candidate2_index >= len(ranked_cvs)):
+    candidate1 = candidate_at(request.candidate1_index)
+    candidate2 = candidate_at(request.candidate2_index)
+    if candidate1 is None or candidate2 is None:
         raise HTTPException(status_code=404, detail="One or both candidate IDs not found")
         
     try:
-        comparison = compare_candidates(ranked_cvs[request.candidate1_index], ranked_cvs[request.candidate2_index], job_desc_path)
+        comparison = compare_candidates(candidate1, candidate2, job_desc_path)
         return {"comparison": comparison}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error comparing candidates: {str(e)}")
 
 @app.post("/upload-cv")
-async def upload_cv(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
+async def upload_cv(file: UploadFile = File(...)):
     """Upload a new CV file with improved error handling and filename preservation"""
-    global faiss_index, metadata, ranked_cvs
+    global faiss_index, metadata, snapshot_generation
     
     if faiss_index is None or metadata is None:
         raise HTTPException(status_code=503, detail="System not initialized")
@@ -392,8 +700,9 @@ async def upload_cv(background_tasks: BackgroundTasks, file: UploadFile = File(.
         
         if success:
             faiss_index, metadata = updated_index, updated_metadata
-            # Update rankings in the background
-            background_tasks.add_task(update_rankings)
+            snapshot_generation = current_generation()
+            # Place the new CV into the ranking with the scheduler's next batch
+            ranking_scheduler.request(added=[original_filename])
             return {"status": "success", "message": f"CV {original_filename} uploaded successfully"}
         else:
             # Return the specific error message from the add_cv function
@@ -410,9 +719,9 @@ async def upload_cv(background_tasks: BackgroundTasks, file: UploadFile = File(.
             os.unlink(temp_file_path)
 
 @app.delete("/remove-cv/{filename}")
-def remove_cv_endpoint(filename: str, background_tasks: BackgroundTasks):
+def remove_cv_endpoint(filename: str):
     """Remove a CV by filename"""
-    global faiss_index, metadata, ranked_cvs
+    global faiss_index, metadata, snapshot_generation
     
     if faiss_index is None or metadata is None:
         raise HTTPException(status_code=503, detail="System not initialized")
@@ -428,30 +737,107 @@ def remove_cv_endpoint(filename: str, background_tasks: BackgroundTasks):
         
         # Update globals
         faiss_index, metadata = updated_index, updated_metadata
-        # Update rankings in the background
-        background_tasks.add_task(update_rankings)
+        snapshot_generation = current_generation()
+        # Nobody else changed, so just drop the CV from the current ordering
+        with ranking_lock:
+            current = ranking_snapshot
+            if current is not None:
+                publish_ranking(remove_candidate(current.candidates, filename), current.provisional)
+        # A provisional ranking's pending re-ranking is now stale; the scheduler re-ranks it
+        ranking_scheduler.request()
         return {"status": "success", "message": f"CV {filename} removed successfully"}
     except Exception as e:
         # Log the error for debugging
         print(f"Error in remove_cv_endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error removing CV: {str(e)}")
 
-def update_rankings():
-    """Update the ranked CVs after changes to the database"""
-    global ranked_cvs, faiss_index, metadata
+def parse_skills(value):
+    """Comma-separated skill names as a tuple of vocabulary names (unknown names raise ValueError)"""
+    vocabulary = get_vocabulary()
+    names = [name.strip() for name in (value or "").split(",") if name.strip()]
+    return tuple(vocabulary.names[skill_id] for skill_id in vocabulary.skill_ids(names))
+
+@app.get("/rankings/status")
+def ranking_status():
+    """Version of the current ranking, the inputs it was computed from and the scheduler's counters"""
+    snapshot = ranking_snapshot
+    if snapshot is None:
+        raise HTTPException(status_code=503, detail="System not initialized")
+    return {
+        "version": snapshot.version,
+        "provisional": snapshot.provisional,
+        "generation": snapshot.generation,
+        "job_hash": snapshot.job_hash,
+        "current": snapshot.tag == inputs_tag(),
+        "scheduler": ranking_scheduler.status(),
+    }
+
+@app.get("/skills")
+def list_skills():
+    """Skills that must-have / nice-to-have filters can use"""
+    return {"skills": get_vocabulary().names}
+
+@app.post("/rankings/refresh")
+def refresh_rankings(reranker: Optional[str] = None, budget_ms: Optional[float] = None,
+                     must_have: Optional[str] = None, nice_to_have: Optional[str] = None,
+                     mmr_lambda: Optional[float] = None):
+    """
+    Re-rank now with a chosen re-ranker ("llm", "cross-encoder" or "none") and latency budget.
+    must_have / nice_to_have are comma-separated skills; they stay in effect until the next
+    refresh or job switch. mmr_lambda (0..1) diversifies the candidates sent to the re-ranker.
+    Answers within 2 x RANKING_DEADLINE_MS; if the ranking has not run by then it stays
+    queued, and the response has queued=true with the current ranking's version.
+    """
+    global skill_filters
+    if faiss_index is None or metadata is None:
+        raise HTTPException(status_code=503, detail="System not initialized")
+    if reranker is not None and reranker not in RERANKERS:
+        raise HTTPException(status_code=400, detail=f"Unknown re-ranker: {reranker}")
+    if mmr_lambda is not None and not 0 <= mmr_lambda <= 1:
+        raise HTTPException(status_code=400, detail="mmr_lambda must be between 0 and 1")
     try:
-        ranked_cvs = rank_cvs(job_desc_path, faiss_index, metadata)
-    except Exception as e:
-        print(f"Error updating rankings: {str(e)}")
+        skill_filters = {"must_have": parse_skills(must_have), "nice_to_have": parse_skills(nice_to_have)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    options = {"reranker": reranker} if reranker else {}
+    if budget_ms is not None:
+        options["latency_budget_ms"] = budget_ms
+    if mmr_lambda is not None:
+        options["mmr_lambda"] = mmr_lambda
+    started = time.perf_counter()
+    # Joins (or starts) the scheduler's next batch, without waiting out the debounce. The batch
+    # may first wait for a re-ranking already in progress, so the wait is bounded: one deadline
+    # for that to settle and one for this ranking; past it the ranking is left queued.
+    future = ranking_scheduler.request(full=True, options=options, immediate=True)
+    try:
+        stats = future.result(timeout=2 * RANKING_DEADLINE_MS / 1000 if RANKING_DEADLINE_MS is not None else None)
+    except FutureTimeout:
+        stats = {"queued": True}
+    snapshot = ranking_snapshot
+    return {
+        "status": "success",
+        "queued": stats.get("queued", False),
+        "reranker": stats.get("reranker"),
+        "rerank_ms": stats.get("rerank_ms"),
+        "prompt_tokens": stats.get("prompt_tokens"),
+        "provisional": stats.get("provisional", snapshot.provisional if snapshot is not None else None),
+        "version": stats.get("version", snapshot.version if snapshot is not None else None),
+        "total_ms": (time.perf_counter() - started) * 1000,
+        "count": len(current_ranking() or []),
+        "must_have": list(skill_filters["must_have"]),
+        "nice_to_have": list(skill_filters["nice_to_have"]),
+    }
 
 # Startup event
 @app.on_event("startup")
 async def startup_event():
-    global faiss_index, metadata, ranked_cvs
+    global faiss_index, metadata, snapshot_generation
     if (faiss_index is None or metadata is None):
         try:
             faiss_index, metadata = initialize_system(cv_dir)
-            ranked_cvs = rank_cvs(job_desc_path, faiss_index, metadata)
+            snapshot_generation = current_generation()
+            load_initial_ranking()
         except Exception as e:
             print(f"Error initializing system: {str(e)}")
 
@@ -491,7 +877,6 @@ async def get_job_application_page(job_id: str, request: Request):
 @app.post("/submit-application/{job_id}")
 async def submit_job_application(
     job_id: str,
-    background_tasks: BackgroundTasks,
     applicant_name: str = Form(...),
     email: str = Form(...),
     phone: str = Form(...),
@@ -499,7 +884,7 @@ async def submit_job_application(
     cv_file: UploadFile = File(...)
 ):
     """Submit a job application"""
-    global faiss_index, metadata
+    global faiss_index, metadata, snapshot_generation
     
     try:
         # Create applications directory if it doesn't exist
@@ -550,8 +935,9 @@ async def submit_job_application(
             
             if success:
                 faiss_index, metadata = updated_index, updated_metadata
-                # Update rankings in the background
-                background_tasks.add_task(update_rankings)
+                snapshot_generation = current_generation()
+                # Place the new CV into the ranking with the scheduler's next batch
+                ranking_scheduler.request(added=[cv_filename])
                 print(f"Added application CV {cv_filename} to ranking system")
             else:
                 print(f"Failed to add application CV to ranking system: {message}")
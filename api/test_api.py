@@ -12,10 +12,10 @@ import json
 from src.vector_db import initialize_system, save_data
 from src.cv_management import add_cv, remove_cv_from_system
 from src.ranking import rank_cvs
-from src.text_processing import extract_text_from_pdf, clean_text
+from src.job_cache import get_job_artifacts
 from src.chat import compare_candidates
-from config import AZURE_CONFIG, DEPLOYMENT_NAME
-from langchain_openai import AzureChatOpenAI
+from src.llm_gateway import get_llm
+from starlette.concurrency import run_in_threadpool
 from pathlib import Path
 import datetime
 import io
@@ -47,14 +47,8 @@ try:
 except Exception as e:
     print(f"Error initializing system: {str(e)}")
 
-# Initialize language model for chat
-chat_model = AzureChatOpenAI(
-    azure_endpoint=AZURE_CONFIG["azure_endpoint"],
-    api_key=AZURE_CONFIG["api_key"],
-    api_version=AZURE_CONFIG["api_version"],
-    deployment_name=DEPLOYMENT_NAME,
-    temperature=0.3
-)
+# Language model for chat (shared, pooled client from the LLM gateway)
+chat_model = get_llm(temperature=0.3, purpose="chat")
 
 # Define request and response models
 class Message(BaseModel):
@@ -152,12 +146,11 @@ def get_job_requirements():
         if not os.path.exists(job_desc_path):
             return {"requirements": "Job description file not found"}
         
-        job_text = extract_text_from_pdf(job_desc_path)
-        cleaned_job_text = clean_text(job_text)
+        job = get_job_artifacts(job_desc_path)
         
         return {
-            "requirements": job_text,
-            "cleaned_requirements": cleaned_job_text,
+            "requirements": job.raw_text,
+            "cleaned_requirements": job.cleaned_text,
             "filename": os.path.basename(job_desc_path)
         }
     except Exception as e:
@@ -188,6 +181,9 @@ async def upload_job_requirements_pdf(background_tasks: BackgroundTasks,
         with open(file_path, "wb") as buffer:
             buffer.write(await file.read())
         
+        # Parse and embed the new job post once, up front, for every consumer
+        await run_in_threadpool(get_job_artifacts, str(file_path))
+        
         # Update the global job description path
         job_desc_path = str(file_path)
         
@@ -229,6 +225,9 @@ async def update_job_requirements_text(background_tasks: BackgroundTasks, reques
         # Save the PDF
         pdf.output(str(file_path))
         
+        # Parse and embed the new job post once, up front, for every consumer
+        await run_in_threadpool(get_job_artifacts, str(file_path))
+        
         # Update the global job description path
         job_desc_path = str(file_path)
         
@@ -286,6 +285,8 @@ def set_active_job_requirements(path: str, background_tasks: BackgroundTasks):
     if not file_path.exists():
         raise HTTPException(status_code=404, detail=f"Job requirements file not found: {path}")
     
+    # Parse and embed the job post once, up front, for every consumer
+    get_job_artifacts(str(file_path))
     job_desc_path = str(file_path)
     
     # Update rankings in the background
@@ -306,7 +307,7 @@ def chat_with_bot(request: ChatRequest):
         
         if system_message_index is None and ranked_cvs:
             # Get job requirements
-            job_text = extract_text_from_pdf(job_desc_path)
+            job_text = get_job_artifacts(job_desc_path).raw_text
             
             # If no system message exists but we have candidates, add one with both job and candidate info
             system_content = "You are an AI assistant that helps analyze CV candidates for job matching.\n\n"
@@ -604,8 +605,8 @@ def get_job_details(path: str):
         if not os.path.exists(path):
             raise HTTPException(status_code=404, detail="Job file not found")
         
-        job_text = extract_text_from_pdf(path)
-        cleaned_job_text = clean_text(job_text)
+        job = get_job_artifacts(path)
+        job_text, cleaned_job_text = job.raw_text, job.cleaned_text
         
         # Extract some basic attributes from filename
         filename = os.path.basename(path)
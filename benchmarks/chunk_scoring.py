@@ -0,0 +1,78 @@
+# Benchmark: first-stage scorers over the whole corpus
+#
+# Compares the full-document FAISS search with chunk-level max-sim / top-k mean
+# scoring (one matmul over all chunk vectors), and a per-CV Python loop doing
+# the same chunk scoring for reference.
+#
+# Usage: python benchmarks/chunk_scoring.py --cvs 10000 --chunks 5
+import os
+import sys
+import time
+import argparse
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.cv_record import CVRecord
+from src.chunk_scoring import ChunkMatrix, chunk_scores, record_chunk_score, top_k_indices
+
+
+def build_metadata(n, n_chunks, dim, rng):
+    metadata = []
+    for i in range(n):
+        # Vary the chunk count around the requested mean, like real CVs do
+        count = max(1, int(rng.integers(n_chunks - 2, n_chunks + 3)))
+        metadata.append(CVRecord(f"cv_{i}.pdf", "", "", rng.standard_normal(dim, dtype=np.float32),
+                                 chunk_vectors=rng.standard_normal((count, dim), dtype=np.float32)))
+    return metadata
+
+
+def best_of(fn, repeats):
+    """Best wall time of repeats calls, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure first-stage scoring latency")
+    parser.add_argument("--cvs", type=int, default=10000)
+    parser.add_argument("--chunks", type=int, default=5, help="Mean chunks per CV")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--candidates", type=int, default=150)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    metadata = build_metadata(args.cvs, args.chunks, args.dim, rng)
+    query = rng.standard_normal(args.dim, dtype=np.float32)
+
+    index = faiss.IndexFlatL2(args.dim)
+    index.add(np.vstack([cv.embedding for cv in metadata]))
+    build_ms = best_of(lambda: ChunkMatrix(metadata), 1)
+    matrix = ChunkMatrix(metadata)
+
+    rows = [
+        ("faiss (doc)", best_of(lambda: index.search(query.reshape(1, -1), args.candidates), args.repeats)),
+        ("chunk_max", best_of(lambda: top_k_indices(chunk_scores(query, matrix, "chunk_max"), args.candidates),
+                              args.repeats)),
+        ("chunk_topk", best_of(lambda: top_k_indices(chunk_scores(query, matrix, "chunk_topk"), args.candidates),
+                               args.repeats)),
+        ("loop max", best_of(lambda: [record_chunk_score(cv, query) for cv in metadata], 1)),
+    ]
+
+    print(f"{args.cvs} CVs, {matrix.vectors.shape[0]} chunks, dim {args.dim}")
+    print(f"chunk matrix build (once per corpus change): {build_ms:.1f} ms, "
+          f"{matrix.vectors.nbytes / 2**20:.1f} MB")
+    print(f"{'scorer':>12} {'ms/query':>9}")
+    for name, ms in rows:
+        print(f"{name:>12} {ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Memory benchmark: legacy metadata dicts vs compact CVRecord
+#
+# Usage: python benchmarks/cv_record_memory.py --sizes 10000,100000
+import os
+import sys
+import time
+import random
+import pickle
+import argparse
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.cv_record import CVRecord
+
+WORDS = ("python docker kubernetes aws terraform linux git jenkins ansible react "
+         "sql postgres java developer engineer team project deployment pipeline "
+         "cloud monitoring scripting automation university bachelor degree").split()
+SECTION_NAMES = ("summary", "experience", "education", "skills", "projects")
+
+
+def synthetic_cv(i, text_chars, n_chunks, dim):
+    """Deterministically generate the pieces of one CV"""
+    rng = random.Random(i)
+    words_per_section = max(1, text_chars // (len(SECTION_NAMES) * 8))
+    parts, spans, pos = [], {}, 0
+    for name in SECTION_NAMES:
+        body = f"{name.title()}\n" + " ".join(rng.choices(WORDS, k=words_per_section))
+        spans[name] = [(pos, pos + len(body))]
+        parts.append(body)
+        pos += len(body) + 1
+    raw_text = "\n".join(parts)
+    cleaned = " ".join(w for w in raw_text.lower().split() if len(w) > 3)
+    step = max(1, len(raw_text) // n_chunks)
+    chunks = [raw_text[j * step:(j + 1) * step + 200] for j in range(n_chunks)]
+    vec_rng = np.random.default_rng(i)
+    embedding = vec_rng.standard_normal(dim, dtype=np.float32)
+    chunk_vectors = vec_rng.standard_normal((n_chunks, dim), dtype=np.float32)
+    contact = {"email": f"candidate{i}@example.com", "phone": "+1 555 0100"}
+    return f"cv_{i}.pdf", raw_text, cleaned, spans, chunks, embedding, chunk_vectors, contact
+
+
+def build_legacy(n, text_chars, n_chunks, dim):
+    metadata = []
+    for i in range(n):
+        filename, raw_text, cleaned, spans, chunks, embedding, chunk_vectors, contact = \
+            synthetic_cv(i, text_chars, n_chunks, dim)
+        metadata.append({
+            "filename": filename,
+            "raw_text": raw_text,
+            "cleaned_text": cleaned,
+            "embedding": embedding,
+            "contact": contact,
+            "sections": {name: "\n".join(raw_text[s:e] for s, e in ss) for name, ss in spans.items()},
+            "chunks": chunks,
+            "chunk_embeddings": [{"text": c, "embedding": v.copy()} for c, v in zip(chunks, chunk_vectors)],
+            "chunk_count": len(chunks),
+            "summary": None,
+        })
+    return metadata
+
+
+def build_records(n, text_chars, n_chunks, dim):
+    metadata = []
+    for i in range(n):
+        filename, raw_text, cleaned, spans, chunks, embedding, chunk_vectors, contact = \
+            synthetic_cv(i, text_chars, n_chunks, dim)
+        metadata.append(CVRecord(filename, raw_text, cleaned, embedding, contact,
+                                 spans, chunks, chunk_vectors))
+    return metadata
+
+
+def measure(builder, n, args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    metadata = builder(n, args.text_chars, args.chunks, args.dim)
+    build_s = time.perf_counter() - start
+    in_memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    pickled = len(pickle.dumps(metadata, protocol=pickle.HIGHEST_PROTOCOL))
+    del metadata
+    return {"in_memory_mb": in_memory / 2**20, "pickle_mb": pickled / 2**20, "build_s": build_s}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare metadata memory footprint of dicts vs CVRecord")
+    parser.add_argument("--sizes", default="10000,100000", help="Comma-separated CV counts")
+    parser.add_argument("--text-chars", type=int, default=3000, help="Approximate raw text size per CV")
+    parser.add_argument("--chunks", type=int, default=5, help="Chunks per CV")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    args = parser.parse_args()
+
+    print(f"{'CVs':>8} {'layout':>9} {'RAM MB':>10} {'pickle MB':>10} {'build s':>8}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        results = {}
+        for name, builder in (("dict", build_legacy), ("CVRecord", build_records)):
+            results[name] = measure(builder, n, args)
+            r = results[name]
+            print(f"{n:>8} {name:>9} {r['in_memory_mb']:>10.1f} {r['pickle_mb']:>10.1f} {r['build_s']:>8.2f}")
+        saved = 1 - results["CVRecord"]["in_memory_mb"] / results["dict"]["in_memory_mb"]
+        print(f"{n:>8} {'saving':>9} {saved:>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# Benchmark: single-prompt vs parallel sliding-window vs cached pointwise LLM re-ranking
+#
+# Uses a deterministic fake LLM whose latency grows with prompt size and which
+# orders (or scores) candidates by a hidden relevance, so wall-clock latency,
+# token cost and ranking quality (agreement with the hidden order) can be
+# compared without network access. Pointwise mode is run twice: "cold" with an
+# empty score cache and "warm" with every pair already cached.
+#
+# Usage: python benchmarks/llm_rerank.py --pools 20,60,100 --window 12 --step 6 --concurrency 4
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cv_record_memory import synthetic_cv
+from src.cv_record import CVRecord, RankedCV
+from src.ranking import llm_order_candidates, llm_order_windows, llm_order_pointwise
+from src.score_cache import ScoreCache
+from src.job_cache import JobArtifacts
+from config import LLM_POOL_SIZE
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeRankingLLM:
+    """Orders the numbered candidates in a prompt by a hidden relevance, after a size-dependent delay"""
+
+    def __init__(self, relevance, base_ms, ms_per_1k_tokens):
+        self.relevance = relevance
+        self.base_ms = base_ms
+        self.ms_per_1k_tokens = ms_per_1k_tokens
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def _answer(self, prompt):
+        files = re.findall(r"^File: (\S+)$", prompt, flags=re.M)
+        if "Respond with JSON" in prompt:
+            content = json.dumps({"scores": [{"candidate": i + 1, "score": round(self.relevance[name], 1)}
+                                             for i, name in enumerate(files)]})
+        else:
+            order = sorted(range(len(files)), key=lambda i: -self.relevance[files[i]])
+            content = ", ".join(str(i + 1) for i in order)
+        prompt_tokens = len(prompt) // 4
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += len(content) // 2
+        return content, (self.base_ms + self.ms_per_1k_tokens * prompt_tokens / 1000) / 1000
+
+    def invoke(self, prompt):
+        content, delay = self._answer(prompt)
+        time.sleep(delay)
+        return FakeResponse(content)
+
+    async def ainvoke(self, prompt):
+        content, delay = self._answer(prompt)
+        await asyncio.sleep(delay)
+        return FakeResponse(content)
+
+
+def build_pool(n, rng_seed=0):
+    """Candidates in first-stage order; hidden relevance agrees with it only roughly"""
+    rng = random.Random(rng_seed)
+    pool, relevance = [], {}
+    for i in range(n):
+        filename, raw_text, cleaned, spans, chunks, embedding, chunk_vectors, contact = synthetic_cv(i, 3000, 5, 8)
+        record = CVRecord(filename, raw_text, cleaned, embedding, contact, spans, chunks, chunk_vectors)
+        pool.append(RankedCV(record, 1.0 / (1 + i)))
+        relevance[filename] = 50 + 50 * (1 - i / n) + rng.gauss(0, 12)
+    return pool, relevance
+
+
+def precision_at(ranked, relevance, k):
+    """Share of the pool's true top-k (by hidden relevance) present in the returned top-k"""
+    best = set(sorted(relevance, key=relevance.get, reverse=True)[:k])
+    return len(best & {cv.filename for cv in ranked[:k]}) / k
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-prompt and windowed LLM re-ranking")
+    parser.add_argument("--pools", default="20,60,100", help="Comma-separated candidate pool sizes")
+    parser.add_argument("--window", type=int, default=12)
+    parser.add_argument("--step", type=int, default=6)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--base-ms", type=float, default=400, help="Fixed latency per LLM call")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=150, help="Latency per 1k prompt tokens")
+    parser.add_argument("--usd-per-1k-prompt", type=float, default=0.005)
+    parser.add_argument("--usd-per-1k-completion", type=float, default=0.015)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    jd = "Requirements\nPython, Docker, Kubernetes, Terraform, AWS.\n" * 20
+    print(f"{'mode':>8} {'pool':>5} {'calls':>6} {'latency s':>10} {'prompt tok':>11} "
+          f"{'cost USD':>9} {'P@' + str(args.top):>6}")
+    job = JobArtifacts("job.pdf", "benchmark-job", jd, jd.lower(), None, {})
+    for pool_size in [int(n) for n in args.pools.split(",")]:
+        pool, relevance = build_pool(pool_size)
+        cache = ScoreCache(os.path.join(tempfile.mkdtemp(), "scores.sqlite"))
+        modes = [
+            # The single prompt does not scale past LLM_POOL_SIZE, so it only sees the head of the pool
+            ("single", lambda llm: llm_order_candidates(jd, pool[:LLM_POOL_SIZE], args.top, llm)),
+            ("windows", lambda llm: llm_order_windows(jd, pool, llm, args.window, args.step, args.concurrency)),
+            ("pw cold", lambda llm: llm_order_pointwise(job, pool, llm, cache)),
+            ("pw warm", lambda llm: llm_order_pointwise(job, pool, llm, cache)),
+        ]
+        for mode, run in modes:
+            llm = FakeRankingLLM(relevance, args.base_ms, args.ms_per_1k_tokens)
+            start = time.perf_counter()
+            ranked = run(llm)
+            elapsed = time.perf_counter() - start
+            cost = (llm.prompt_tokens * args.usd_per_1k_prompt + llm.completion_tokens * args.usd_per_1k_completion) / 1000
+            top = min(args.top, pool_size)
+            print(f"{mode:>8} {pool_size:>5} {llm.calls:>6} {elapsed:>10.2f} {llm.prompt_tokens:>11} "
+                  f"{cost:>9.4f} {precision_at(ranked, relevance, top):>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+# Benchmark: per-stage timings of CV ingestion and ranking on synthetic data
+#
+# Writes synthetic CV and job description PDFs and times each stage the way
+# process_cvs / add_cv and rank_cvs run it: PDF extraction, cleaning, chunking,
+# embedding, index build, search, prompt build, LLM and response parsing.
+#
+# Per-document stages (extraction to embedding) run on --pdf-sample real PDFs
+# per corpus size and are reported per CV, with the whole-corpus cost
+# extrapolated. Corpus-wide stages (index build, search, ranking) run on the
+# full --cvs corpus, whose records come from the same text generator with
+# cheap stand-ins for spaCy and the embedding model (hashed bag-of-words
+# vectors), so 100k CVs build in minutes. The LLM is a deterministic local
+# stand-in: it orders candidates by the job skills visible in their profile,
+# after a delay that grows with prompt tokens.
+#
+# Results are saved as JSON; --compare prints the change against an earlier run.
+#
+# Usage: python benchmarks/pipeline.py --cvs 1000,10000,100000 --pdf-sample 100 --out pipeline.json
+import os
+import re
+import sys
+import json
+import time
+import random
+import zlib
+import argparse
+import platform
+import tempfile
+from contextlib import contextmanager
+
+import numpy as np
+import faiss
+from fpdf import FPDF
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import ranking
+from src.cv_record import CVRecord
+from src.job_cache import JobArtifacts
+from src.bm25_index import get_bm25_index
+from src.prompt_context import count_tokens
+from src.skills import get_vocabulary, encode_skills
+from src.text_processing import extract_text_from_pdf, clean_text, extract_contact_info
+from src.text_chunking import chunk_text, extract_section_spans
+from config import embedding_model, CHUNK_SIZE, CHUNK_OVERLAP, LLM_POOL_SIZE, INITIAL_CANDIDATES
+
+SKILLS = ("python", "docker", "kubernetes", "terraform", "ansible", "aws", "linux", "git", "jenkins",
+          "react", "sql", "java", "grafana", "kafka", "spark")
+FILLER = ("team project deployment pipeline cloud monitoring scripting automation delivered improved "
+          "designed maintained customers platform services reliability migration stakeholders").split()
+DIM = 384  # all-MiniLM-L6-v2
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeRankingLLM:
+    """Orders candidates by the job skills visible in their profile, after a size-dependent delay"""
+
+    def __init__(self, job_skills, base_ms, ms_per_1k_tokens):
+        self.job_skills = job_skills
+        self.base_ms = base_ms
+        self.ms_per_1k_tokens = ms_per_1k_tokens
+        self.seconds = 0.0
+
+    def invoke(self, prompt):
+        profiles = re.split(r"^\[Candidate \d+\]$", prompt.split("Candidate Profiles:", 1)[1], flags=re.M)[1:]
+        seen = [sum(skill in profile.lower() for skill in self.job_skills) for profile in profiles]
+        order = sorted(range(len(profiles)), key=lambda i: (-seen[i], i))
+        delay = (self.base_ms + self.ms_per_1k_tokens * count_tokens(prompt) / 1000) / 1000
+        self.seconds += delay
+        time.sleep(delay)
+        return FakeResponse(", ".join(str(i + 1) for i in order))
+
+
+class StageTimer:
+    """Accumulated wall-clock time and item count per stage"""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, items=1):
+        start = time.perf_counter()
+        yield
+        entry = self.stages.setdefault(name, {"ms": 0.0, "items": 0})
+        entry["ms"] += (time.perf_counter() - start) * 1000
+        entry["items"] += items
+
+    def report(self):
+        return {name: dict(entry, ms_per_item=entry["ms"] / max(entry["items"], 1))
+                for name, entry in self.stages.items()}
+
+
+def cv_skills(i):
+    """The skills synthetic CV i mentions"""
+    rng = random.Random(i)
+    return rng.sample(SKILLS, rng.randint(2, 8))
+
+
+def cv_text(i):
+    """Deterministic CV text: contact line, sections and a random subset of skills"""
+    skills = cv_skills(i)
+    rng = random.Random(-1 - i)
+    sentence = lambda: " ".join(rng.choices(FILLER, k=10)).capitalize() + "."
+    experience = " ".join(sentence() for _ in range(12)) + " " + \
+        " ".join(f"Used {skill} in production." for skill in skills[:3])
+    return (f"Candidate {i}\ncandidate{i}@example.com | +1 555 {i % 10000:04d}\n"
+            f"Summary\n{sentence()} {sentence()}\n"
+            f"Experience\n{experience}\n"
+            f"Education\nBachelor of Science, University {i % 97}. {sentence()}\n"
+            f"Skills\n{', '.join(skills)}\n")
+
+
+def jd_text(i, job_skills):
+    return (f"Job Post {i}\nAbout the role\nWe are hiring an engineer for our platform team.\n"
+            f"Requirements\n" + "\n".join(f"- Hands-on {skill} experience" for skill in job_skills) +
+            "\nBenefits\nRemote friendly, learning budget.\n")
+
+
+def write_pdf(text, path):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", size=10)
+    pdf.multi_cell(0, 5, text)
+    pdf.output(path)
+
+
+_word_vectors = {}
+
+
+def fake_embed(texts):
+    """Hashed bag-of-words embeddings: fast, deterministic and similar for texts sharing words"""
+    out = np.zeros((len(texts), DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in re.findall(r"\w+", text.lower()):
+            vector = _word_vectors.get(word)
+            if vector is None:
+                vector = _word_vectors[word] = \
+                    np.random.default_rng(zlib.crc32(word.encode())).standard_normal(DIM).astype(np.float32)
+            out[row] += vector
+    return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+
+
+def ingest_sample(pdf_dir, n, timer, embed):
+    """process_cvs / add_cv stages on real PDFs, timed per stage"""
+    vocabulary = get_vocabulary()
+    for i in range(n):
+        path = os.path.join(pdf_dir, f"cv_{i}.pdf")
+        write_pdf(cv_text(i), path)
+        with timer.stage("pdf_extraction"):
+            raw_text = extract_text_from_pdf(path)
+        with timer.stage("cleaning"):
+            cleaned = clean_text(raw_text)
+            extract_contact_info(raw_text)
+            extract_section_spans(raw_text)
+            encode_skills(raw_text, vocabulary)
+        with timer.stage("chunking"):
+            chunks = chunk_text(raw_text, CHUNK_SIZE, CHUNK_OVERLAP)
+        with timer.stage("embedding"):
+            embed(chunks)
+            embed([cleaned])
+
+
+def quick_clean(text):
+    """Stand-in for clean_text at corpus scale: lowercased words longer than three letters"""
+    return " ".join(word for word in re.findall(r"\w+", text.lower()) if len(word) > 3)
+
+
+def synthetic_corpus(n):
+    """CVRecords for the corpus-wide stages, without PDFs, spaCy or the embedding model"""
+    vocabulary = get_vocabulary()
+    records = []
+    for i in range(n):
+        raw_text = cv_text(i)
+        cleaned = quick_clean(raw_text)
+        step = max(1, CHUNK_SIZE - CHUNK_OVERLAP)
+        chunks = [raw_text[start:start + CHUNK_SIZE] for start in range(0, len(raw_text), step)]
+        records.append(CVRecord(f"cv_{i}.pdf", raw_text, cleaned, fake_embed([cleaned])[0],
+                                {"email": f"candidate{i}@example.com", "phone": None},
+                                extract_section_spans(raw_text), chunks, fake_embed(chunks),
+                                skill_bits=encode_skills(raw_text, vocabulary),
+                                skill_vocabulary=vocabulary.version))
+    return records
+
+
+def run_size(n, args, pdf_dir):
+    timer = StageTimer()
+    embed = fake_embed if args.fake_embeddings else \
+        (lambda texts: embedding_model.encode(texts) if texts else None)
+    sample = min(n, args.pdf_sample)
+    ingest_sample(pdf_dir, sample, timer, embed)
+
+    corpus_start = time.perf_counter()
+    metadata = synthetic_corpus(n)
+    corpus_s = time.perf_counter() - corpus_start
+
+    with timer.stage("index_build", n):
+        index = faiss.IndexFlatL2(DIM)
+        index.add(np.vstack([cv.embedding for cv in metadata]))
+        get_bm25_index(metadata)
+    extra = fake_embed([cv_text(n)])
+    with timer.stage("index_add"):
+        index.add(extra)
+    index.remove_ids(np.array([n], dtype=np.int64))
+
+    rng = random.Random(n)
+    jobs = []
+    for q in range(args.queries):
+        job_skills = tuple(rng.sample(SKILLS, 5))
+        jd_path = os.path.join(pdf_dir, f"jd_{q}.pdf")
+        write_pdf(jd_text(q, job_skills), jd_path)
+        with timer.stage("pdf_extraction_jd"):
+            raw_jd = extract_text_from_pdf(jd_path)
+        with timer.stage("cleaning_jd"):
+            cleaned_jd = clean_text(raw_jd)
+        with timer.stage("embedding_jd"):
+            jd_embedding = np.asarray(embed([cleaned_jd])[0], dtype=np.float32)
+        # Corpus vectors are fake, so the job is searched with a fake vector too
+        job = JobArtifacts(jd_path, f"benchmark-{q}", raw_jd, cleaned_jd, fake_embed([cleaned_jd])[0],
+                           extract_section_spans(raw_jd))
+        jobs.append((job, job_skills))
+
+    for job, job_skills in jobs:
+        with timer.stage("search"):
+            candidates = ranking.retrieve_candidates(job, index, metadata, limit=INITIAL_CANDIDATES)
+        pool = candidates[:LLM_POOL_SIZE]
+        with timer.stage("prompt_build"):
+            prompt = ranking.build_ranking_prompt(job.raw_text, pool, len(pool), job.embedding)
+        llm = FakeRankingLLM(job_skills, args.llm_base_ms, args.llm_ms_per_1k_tokens)
+        with timer.stage("llm"):
+            response = llm.invoke(prompt)
+        with timer.stage("parse"):
+            ranking._selected_indices(response, pool)
+
+    # rank_cvs end to end, with the job lookup and the LLM swapped for the stand-ins
+    by_path = {job.path: job for job, _ in jobs}
+    ranking.get_job_artifacts = by_path.__getitem__
+    for job, job_skills in jobs:
+        llm = FakeRankingLLM(job_skills, args.llm_base_ms, args.llm_ms_per_1k_tokens)
+        ranking.ranking_llm = lambda llm=llm: llm
+        with timer.stage("rank_cvs"):
+            ranking.rank_cvs(job.path, index, metadata, rerank_mode="single", reranker="llm", latency_budget_ms=None)
+
+    stages = timer.report()
+    per_cv = sum(stages[name]["ms_per_item"] for name in ("pdf_extraction", "cleaning", "chunking", "embedding"))
+    return {
+        "cvs": n,
+        "pdf_sample": sample,
+        "synthetic_corpus_s": corpus_s,
+        "stages": stages,
+        "add_cv_ms": per_cv + stages["index_add"]["ms"],
+        "process_cvs_estimate_s": (per_cv * n + stages["index_build"]["ms"]) / 1000,
+    }
+
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = {run["cvs"]: run for run in json.load(f)["runs"]}
+    print(f"\nChange vs {previous_path} (ms per item):")
+    for run in results["runs"]:
+        before = previous.get(run["cvs"])
+        if before is None:
+            continue
+        for name, entry in run["stages"].items():
+            old = before["stages"].get(name)
+            if old and old["ms_per_item"]:
+                change = 100 * (entry["ms_per_item"] / old["ms_per_item"] - 1)
+                print(f"{run['cvs']:>7} {name:>18} {old['ms_per_item']:>10.3f} -> {entry['ms_per_item']:>10.3f} "
+                      f"({change:+.0f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage timings of the CV ingestion and ranking pipeline")
+    parser.add_argument("--cvs", default="1000,10000", help="Comma-separated corpus sizes (e.g. 1000,10000,100000)")
+    parser.add_argument("--pdf-sample", type=int, default=100, help="CVs run through the per-document stages")
+    parser.add_argument("--queries", type=int, default=5, help="Job descriptions searched and ranked per size")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Time hashed embeddings instead of the model")
+    parser.add_argument("--llm-base-ms", type=float, default=400, help="Fixed latency per LLM call")
+    parser.add_argument("--llm-ms-per-1k-tokens", type=float, default=150, help="Latency per 1k prompt tokens")
+    parser.add_argument("--out", default="pipeline_benchmark.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "args": vars(args),
+        "runs": [],
+    }
+    print(f"{'cvs':>7} {'stage':>18} {'items':>7} {'total ms':>10} {'ms/item':>10}")
+    with tempfile.TemporaryDirectory() as pdf_dir:
+        for n in [int(size) for size in args.cvs.split(",")]:
+            run = run_size(n, args, pdf_dir)
+            results["runs"].append(run)
+            for name, entry in run["stages"].items():
+                print(f"{n:>7} {name:>18} {entry['items']:>7} {entry['ms']:>10.1f} {entry['ms_per_item']:>10.3f}")
+            print(f"{n:>7} {'add_cv':>18} {'':>7} {'':>10} {run['add_cv_ms']:>10.3f}")
+            print(f"{n:>7} {'process_cvs (est)':>18} {'':>7} {run['process_cvs_estimate_s'] * 1000:>10.0f}")
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# Benchmark: fixed section excerpts vs token-budgeted relevant chunks in ranking prompts
+#
+# Builds long synthetic CVs whose evidence for the job's skills sits at random
+# places in the text (chunk vectors lean towards the job vector where it
+# does), then orders the same pool with each PROMPT_CONTEXT mode against a
+# fake LLM. The fake LLM can only judge what the prompt shows it: it ranks
+# candidates by how many of the job's skills appear in their profile, and its
+# latency grows with prompt tokens. Reported: prompt tokens, prompt build time,
+# LLM latency and precision against the hidden (full-text) relevance.
+#
+# Usage: python benchmarks/prompt_context.py --pool 20 --chars 8000 --budgets 200,300,500
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cv_record_memory import WORDS, SECTION_NAMES
+from src import ranking
+from src import prompt_context
+from src.cv_record import CVRecord, RankedCV
+from src.text_chunking import chunk_text, extract_section_spans
+from src.prompt_context import count_tokens, prompt_meter
+from src.skills import get_vocabulary, encode_skills
+from config import CHUNK_SIZE, CHUNK_OVERLAP
+
+JOB_SKILLS = ("docker", "kubernetes", "terraform", "ansible", "prometheus", "jenkins")
+# Without words that read as section headers, so every section spans its whole body
+FILLER = [word for word in WORDS if word not in JOB_SKILLS and word != "degree"]
+DIM = 64
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeReaderLLM:
+    """Orders candidates by the job skills visible in their profile, after a size-dependent delay"""
+
+    def __init__(self, base_ms, ms_per_1k_tokens):
+        self.base_ms = base_ms
+        self.ms_per_1k_tokens = ms_per_1k_tokens
+        self.seconds = 0.0
+
+    def invoke(self, prompt):
+        profiles = re.split(r"^\[Candidate \d+\]$", prompt.split("Candidate Profiles:", 1)[1], flags=re.M)[1:]
+        seen = [sum(skill in profile.lower() for skill in JOB_SKILLS) for profile in profiles]
+        order = sorted(range(len(profiles)), key=lambda i: (-seen[i], i))
+        delay = (self.base_ms + self.ms_per_1k_tokens * count_tokens(prompt) / 1000) / 1000
+        self.seconds += delay
+        time.sleep(delay)
+        return FakeResponse(", ".join(str(i + 1) for i in order))
+
+
+def synthetic_candidate(i, chars, job_vector):
+    """A long CV with evidence for a random subset of the job skills at random positions"""
+    rng = random.Random(i)
+    skills = rng.sample(JOB_SKILLS, rng.randint(0, len(JOB_SKILLS)))
+    sentences = max(1, chars // (len(SECTION_NAMES) * 100))
+    sections = {name: [" ".join(rng.choices(FILLER, k=12)).capitalize() + "." for _ in range(sentences)]
+                for name in SECTION_NAMES}
+    for skill in skills:
+        body = sections[rng.choice(SECTION_NAMES)]
+        body.insert(rng.randrange(len(body) + 1), f"Ran {skill} in production for two years.")
+    raw_text = "\n".join(f"{name.title()}\n" + " ".join(body) for name, body in sections.items())
+    chunks = chunk_text(raw_text, CHUNK_SIZE, CHUNK_OVERLAP)
+
+    # Chunk vectors lean towards the job vector in proportion to the evidence they hold
+    vec_rng = np.random.default_rng(i)
+    chunk_vectors = np.vstack([
+        vec_rng.standard_normal(DIM) + 2.0 * sum(skill in chunk for skill in skills) * job_vector
+        for chunk in chunks]).astype(np.float32)
+    record = CVRecord(f"cv_{i}.pdf", raw_text, raw_text.lower(), chunk_vectors.mean(axis=0),
+                      {"email": f"candidate{i}@example.com", "phone": None},
+                      extract_section_spans(raw_text), chunks, chunk_vectors,
+                      skill_bits=encode_skills(raw_text), skill_vocabulary=get_vocabulary().version)
+    return record, len(skills)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ranking prompt context builders")
+    parser.add_argument("--pool", type=int, default=20)
+    parser.add_argument("--chars", type=int, default=8000, help="Approximate CV length")
+    parser.add_argument("--budgets", default="200,300,500", help="Comma-separated CANDIDATE_TOKEN_BUDGET values")
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--base-ms", type=float, default=400, help="Fixed latency per LLM call")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=150, help="Latency per 1k prompt tokens")
+    parser.add_argument("--repeats", type=int, default=5, help="Pools (different seeds) averaged")
+    args = parser.parse_args()
+
+    job_vector = np.random.default_rng(12345).standard_normal(DIM).astype(np.float32)
+    job_vector /= np.linalg.norm(job_vector)
+    jd = "Requirements\n" + "\n".join(f"- Hands-on {skill} experience" for skill in JOB_SKILLS)
+
+    configs = [("sections", None)] + [("relevant", int(b)) for b in args.budgets.split(",")]
+    print(f"{'context':>9} {'budget':>7} {'prompt tok':>11} {'build ms':>9} {'llm s':>7} {'P@' + str(args.top):>6}")
+    for mode, budget in configs:
+        ranking.PROMPT_CONTEXT = mode
+        if budget is not None:
+            ranking.candidate_context = lambda cv, jd_embedding, budget=budget: \
+                prompt_context.candidate_context(cv, jd_embedding, budget)
+        tokens = build_ms = llm_s = precision = 0.0
+        for repeat in range(args.repeats):
+            pool, relevance = [], {}
+            for i in range(args.pool):
+                record, evidence = synthetic_candidate(repeat * 10000 + i, args.chars, job_vector)
+                pool.append(RankedCV(record, 1.0 / (1 + i)))
+                relevance[record.filename] = evidence + 1e-3 * random.Random(i).random()
+
+            start = time.perf_counter()
+            with prompt_meter() as meter:
+                ranking.build_ranking_prompt(jd, pool, args.top, job_vector)
+            build_ms += (time.perf_counter() - start) * 1000
+            tokens += meter["prompt_tokens"]
+
+            llm = FakeReaderLLM(args.base_ms, args.ms_per_1k_tokens)
+            ranked = ranking.llm_order_candidates(jd, pool, args.top, llm, jd_embedding=job_vector) or pool
+            llm_s += llm.seconds
+            best = set(sorted(relevance, key=relevance.get, reverse=True)[:args.top])
+            precision += len(best & {cv.filename for cv in ranked[:args.top]}) / args.top
+
+        n = args.repeats
+        print(f"{mode:>9} {budget or '-':>7} {tokens / n:>11.0f} {build_ms / n:>9.1f} {llm_s / n:>7.2f} "
+              f"{precision / n:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
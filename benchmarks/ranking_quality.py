@@ -0,0 +1,220 @@
+# Evaluation: retrieval recall and ranking quality against latency, per configuration
+#
+# For every combination of FAISS index type, first-stage size
+# (INITIAL_CANDIDATES) and LLM pool size (LLM_POOL_SIZE, the upper bound when
+# --pool-sizing is adaptive) this reports:
+#   - ann recall@k: overlap of the index's dense top k with exact flat search
+#   - label recall: share of the labelled relevant CVs (up to the first-stage
+#     size) that reach the first-stage candidates
+#   - nDCG@k of the final rank_cvs output against the graded labels
+#   - search and end-to-end rank_cvs latency per query
+# Configurations on the latency / nDCG Pareto front are marked with "*", which
+# gives the speed/quality tradeoff curve; --report writes it as Markdown.
+#
+# Index types are faiss.index_factory strings, with search parameters after
+# "|", e.g. "HNSW32|efSearch=64" or "IVF256,Flat|nprobe=8"; separate several
+# with ";".
+#
+# The labelled set is synthetic by default: CVs and job posts from the pipeline
+# benchmark's generator, each CV graded by how many of the job's skills it
+# has. --labels evaluates the indexed CVs instead, against a JSON list of
+# {"job": path, "relevant": {filename: grade}} entries. Ranking uses the
+# pipeline benchmark's local LLM stand-in unless --live-llm is given.
+#
+# Usage: python benchmarks/ranking_quality.py --cvs 10000 --indexes "Flat;HNSW32|efSearch=64;IVF256,Flat|nprobe=8" \
+#            --initial 50,150 --pools 10,20 --report quality.md
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import functools
+
+import numpy as np
+import faiss
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import SKILLS, FakeRankingLLM, cv_skills, jd_text, quick_clean, fake_embed, synthetic_corpus
+from src import ranking
+from src.bm25_index import get_bm25_index
+from src.job_cache import JobArtifacts
+from src.skills import encode_skills, decode_skills
+from src.text_chunking import extract_section_spans
+
+
+def synthetic_set(n_cvs, n_jobs, seed=0):
+    """Synthetic corpus plus (job, grades, job skills) triples; a CV's grade is its number of job skills"""
+    metadata = synthetic_corpus(n_cvs)
+    skills = [set(cv_skills(i)) for i in range(n_cvs)]
+    rng = random.Random(seed)
+    jobs = []
+    for q in range(n_jobs):
+        job_skills = rng.sample(SKILLS, 5)
+        raw_text = jd_text(q, job_skills)
+        cleaned = quick_clean(raw_text)
+        job = JobArtifacts(f"synthetic_job_{q}.pdf", f"synthetic-{q}", raw_text, cleaned, fake_embed([cleaned])[0],
+                           extract_section_spans(raw_text))
+        grades = {metadata[i].filename: len(skills[i] & set(job_skills)) for i in range(n_cvs)}
+        jobs.append((job, {name: grade for name, grade in grades.items() if grade}, job_skills))
+    return metadata, jobs
+
+
+def labelled_set(path):
+    """The indexed CVs plus the labelled jobs in path"""
+    from src.vector_db import load_data
+    from src.job_cache import get_job_artifacts
+    _, metadata = load_data()
+    if not metadata:
+        raise SystemExit("No indexed CVs to evaluate")
+    with open(path) as f:
+        entries = json.load(f)
+    jobs = []
+    for entry in entries:
+        job = get_job_artifacts(entry["job"])
+        grades = {name: float(grade) for name, grade in entry["relevant"].items()}
+        jobs.append((job, grades, [name.lower() for name in decode_skills(encode_skills(job.raw_text))]))
+    return metadata, jobs
+
+
+def dcg(gains):
+    return sum(gain / np.log2(i + 2) for i, gain in enumerate(gains))
+
+
+def ndcg_at(ranked, grades, k):
+    """nDCG@k of a ranked list of filenames (gain 2^grade - 1); None when nothing is relevant"""
+    ideal = dcg(sorted((2 ** grade - 1 for grade in grades.values()), reverse=True)[:k])
+    if ideal == 0:
+        return None
+    return dcg([2 ** grades.get(name, 0) - 1 for name in ranked[:k]]) / ideal
+
+
+def build_index(spec, vectors):
+    """FAISS index from an index_factory string, with optional "|"-separated search parameters"""
+    factory, _, params = spec.partition("|")
+    index = faiss.index_factory(vectors.shape[1], factory.strip())
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    if params:
+        faiss.ParameterSpace().set_index_parameters(index, params.strip())
+    return index
+
+
+def mean(values):
+    values = [value for value in values if value is not None]
+    return float(sum(values) / len(values)) if values else float("nan")
+
+
+def evaluate(metadata, jobs, args):
+    vectors = np.vstack([cv.embedding for cv in metadata]).astype(np.float32)
+    queries = np.vstack([job.embedding for job, _, _ in jobs]).astype(np.float32)
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+    get_bm25_index(metadata)
+    ranking.LLM_POOL_SIZING = args.pool_sizing
+
+    # rank_cvs looks jobs up by path and asks ranking_llm() for its model
+    by_path = {job.path: job for job, _, _ in jobs}
+    ranking.get_job_artifacts = by_path.__getitem__
+    retrieve = ranking.retrieve_candidates
+
+    rows = []
+    for spec in [spec.strip() for spec in args.indexes.split(";") if spec.strip()]:
+        start = time.perf_counter()
+        index = build_index(spec, vectors)
+        build_s = time.perf_counter() - start
+        start = time.perf_counter()
+        _, found = index.search(queries, args.k)
+        search_ms = (time.perf_counter() - start) * 1000 / len(jobs)
+        ann_recall = mean([len(set(found[q]) & set(truth[q])) / args.k for q in range(len(jobs))])
+
+        for initial in [int(n) for n in args.initial.split(",")]:
+            ranking.retrieve_candidates = functools.partial(retrieve, limit=initial)
+            label_recall = []
+            for job, grades, _ in jobs:
+                relevant = {name for name, grade in grades.items() if grade >= args.relevant_grade}
+                if relevant:
+                    first = {cv.filename for cv in retrieve(job, index, metadata, limit=initial)}
+                    label_recall.append(len(first & relevant) / min(len(relevant), initial))
+
+            for pool in [int(n) for n in args.pools.split(",")]:
+                ranking.LLM_POOL_SIZE = pool
+                ndcg, rank_ms = [], []
+                for job, grades, job_skills in jobs:
+                    if not args.live_llm:
+                        llm = FakeRankingLLM(job_skills, args.llm_base_ms, args.llm_ms_per_1k_tokens)
+                        ranking.ranking_llm = lambda llm=llm: llm
+                    start = time.perf_counter()
+                    ranked = ranking.rank_cvs(job.path, index, metadata, rerank_mode="single", reranker="llm",
+                                              latency_budget_ms=None)
+                    rank_ms.append((time.perf_counter() - start) * 1000)
+                    ndcg.append(ndcg_at([cv.filename for cv in ranked], grades, args.k))
+                rows.append({"index": spec, "initial": initial, "pool": pool, "build_s": build_s,
+                             "search_ms": search_ms, "ann_recall": ann_recall, "label_recall": mean(label_recall),
+                             "ndcg": mean(ndcg), "rank_ms": mean(rank_ms)})
+    ranking.retrieve_candidates = retrieve
+
+    # Pareto front: no other configuration is both faster and at least as good
+    best = -1.0
+    for row in sorted(rows, key=lambda row: (row["rank_ms"], -row["ndcg"])):
+        row["pareto"] = bool(row["ndcg"] > best)
+        best = max(best, row["ndcg"])
+    return rows
+
+
+def table(rows, k, markdown=False):
+    header = ["index", "initial", "pool", "build s", "search ms", f"ann R@{k}", "label R", f"nDCG@{k}",
+              "rank ms", "front"]
+    lines = []
+    for row in rows:
+        lines.append([row["index"], str(row["initial"]), str(row["pool"]), f"{row['build_s']:.2f}",
+                      f"{row['search_ms']:.3f}", f"{row['ann_recall']:.3f}", f"{row['label_recall']:.3f}",
+                      f"{row['ndcg']:.3f}", f"{row['rank_ms']:.0f}", "*" if row["pareto"] else ""])
+    if markdown:
+        return "\n".join(["| " + " | ".join(header) + " |", "|" + "---|" * len(header)] +
+                         ["| " + " | ".join(line) + " |" for line in lines])
+    widths = [max(len(header[i]), *(len(line[i]) for line in lines)) for i in range(len(header))]
+    return "\n".join(" ".join(cell.rjust(width) for cell, width in zip(line, widths))
+                     for line in [header] + lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ANN recall and ranking quality against latency")
+    parser.add_argument("--cvs", type=int, default=10000, help="Synthetic corpus size")
+    parser.add_argument("--jobs", type=int, default=10, help="Synthetic labelled job posts")
+    parser.add_argument("--labels", help="JSON labels for the indexed CVs, instead of the synthetic set")
+    parser.add_argument("--indexes", default="Flat;HNSW32|efSearch=64;IVF256,Flat|nprobe=8",
+                        help="';'-separated faiss.index_factory strings, search parameters after '|'")
+    parser.add_argument("--initial", default="50,150", help="Comma-separated INITIAL_CANDIDATES values")
+    parser.add_argument("--pools", default="10,20", help="Comma-separated LLM_POOL_SIZE values")
+    parser.add_argument("--pool-sizing", default="fixed", choices=["fixed", "gap", "elbow", "threshold"],
+                        help="LLM pool sizing (LLM_POOL_SIZING)")
+    parser.add_argument("--k", type=int, default=10, help="Cutoff for ann recall and nDCG")
+    parser.add_argument("--relevant-grade", type=float, default=3, help="Lowest grade counted as relevant")
+    parser.add_argument("--live-llm", action="store_true", help="Rank with the configured Azure LLM")
+    parser.add_argument("--llm-base-ms", type=float, default=400, help="Fixed latency per stand-in LLM call")
+    parser.add_argument("--llm-ms-per-1k-tokens", type=float, default=150, help="Stand-in latency per 1k tokens")
+    parser.add_argument("--out", default="ranking_quality.json", help="Where to write the JSON results")
+    parser.add_argument("--report", help="Also write the tradeoff table as Markdown here")
+    args = parser.parse_args()
+
+    metadata, jobs = labelled_set(args.labels) if args.labels else synthetic_set(args.cvs, args.jobs)
+    rows = evaluate(metadata, jobs, args)
+    print(table(rows, args.k))
+
+    with open(args.out, "w") as f:
+        json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "args": vars(args), "cvs": len(metadata),
+                   "jobs": len(jobs), "rows": rows}, f, indent=2)
+    print(f"\nSaved {args.out}")
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(f"# Ranking quality vs latency\n\n{len(metadata)} CVs, {len(jobs)} labelled jobs. "
+                    f"`*` marks the latency / nDCG@{args.k} Pareto front.\n\n{table(rows, args.k, markdown=True)}\n")
+        print(f"Saved {args.report}")
+
+
+if __name__ == "__main__":
+    main()
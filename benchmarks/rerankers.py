@@ -0,0 +1,79 @@
+# Benchmark: re-ranker stage latency and agreement with the LLM ordering
+#
+# Runs every registered re-ranker on the same first-stage candidates of the
+# stored CV corpus and reports its latency and how closely its top-k agrees
+# with the LLM's (overlap@k and Kendall tau over the CVs both placed).
+# Needs the indexed data (db/) and, for the reference ordering, Azure access.
+#
+# Usage: python benchmarks/rerankers.py --job junior_devops_requirements.pdf --top 20 --repeats 3
+import os
+import sys
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.vector_db import load_data
+from src.job_cache import get_job_artifacts
+from src.ranking import retrieve_candidates, RERANKERS
+
+
+def kendall_tau(reference, other):
+    """Kendall tau between two orderings, over the items present in both"""
+    common = [name for name in reference if name in set(other)]
+    position = {name: i for i, name in enumerate(other)}
+    concordant = discordant = 0
+    for i in range(len(common)):
+        for j in range(i + 1, len(common)):
+            if position[common[i]] < position[common[j]]:
+                concordant += 1
+            else:
+                discordant += 1
+    pairs = concordant + discordant
+    return (concordant - discordant) / pairs if pairs else float("nan"), len(common)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare re-rankers against the LLM ordering")
+    parser.add_argument("--job", default="junior_devops_requirements.pdf")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--rerankers", default=",".join(RERANKERS), help="Comma-separated re-ranker names")
+    args = parser.parse_args()
+
+    faiss_index, metadata = load_data()
+    if faiss_index is None:
+        sys.exit("No indexed CVs found, run the app once to build db/")
+    job = get_job_artifacts(args.job)
+    candidates = retrieve_candidates(job, faiss_index, metadata)
+
+    orderings, latencies = {}, {}
+    for name in args.rerankers.split(","):
+        times = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            try:
+                ranked = RERANKERS[name](job, candidates)
+            except Exception as e:
+                print(f"{name}: failed ({str(e)})")
+                break
+            times.append(time.perf_counter() - start)
+        else:
+            orderings[name] = [cv.filename for cv in ranked[:args.top]]
+            # The first run includes model loading and cold caches
+            latencies[name] = (times[0] * 1000, min(times) * 1000)
+
+    reference = orderings.get("llm")
+    print(f"{len(metadata)} CVs, {len(candidates)} first-stage candidates, top {args.top}")
+    print(f"{'re-ranker':>14} {'first ms':>9} {'best ms':>9} {'overlap':>8} {'tau':>6}")
+    for name, (first_ms, best_ms) in latencies.items():
+        if reference is None:
+            overlap, tau = float("nan"), float("nan")
+        else:
+            overlap = len(set(reference) & set(orderings[name])) / max(len(reference), 1)
+            tau, _ = kendall_tau(reference, orderings[name])
+        print(f"{name:>14} {first_ms:>9.1f} {best_ms:>9.1f} {overlap:>8.2f} {tau:>6.2f}")
+
+
+if __name__ == "__main__":
+    main()
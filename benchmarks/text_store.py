@@ -0,0 +1,88 @@
+# Benchmark: CV text kept inline vs in the compressed TextBlobStore
+#
+# Reports disk size, resident memory and per-access latency (cold = decompress,
+# hot = LRU hit).
+#
+# Usage: python benchmarks/text_store.py --cvs 10000 --codec zlib
+import os
+import sys
+import time
+import random
+import pickle
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cv_record_memory import synthetic_cv
+from src.text_store import write_text_blob, TextBlobStore
+
+
+def rss_mb():
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def texts(n, text_chars):
+    for i in range(n):
+        _, raw_text, cleaned, *_ = synthetic_cv(i, text_chars, 1, 1)
+        yield raw_text
+        yield cleaned
+
+
+def time_accesses(get, ids):
+    start = time.perf_counter()
+    for entry_id in ids:
+        get(entry_id)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the compressed CV text store")
+    parser.add_argument("--cvs", type=int, default=10000)
+    parser.add_argument("--text-chars", type=int, default=3000)
+    parser.add_argument("--codec", choices=("zlib", "lzma"), default="zlib")
+    parser.add_argument("--accesses", type=int, default=2000)
+    parser.add_argument("--cache-size", type=int, default=256)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    n_entries = 2 * args.cvs
+
+    with tempfile.TemporaryDirectory() as tmp:
+        blob_path = os.path.join(tmp, "texts.blob")
+        offsets = write_text_blob(blob_path, texts(args.cvs, args.text_chars), codec=args.codec)
+
+        before = rss_mb()
+        store = TextBlobStore(blob_path, offsets, cache_size=args.cache_size)
+        cold_ids = rng.sample(range(n_entries), min(args.accesses, n_entries))
+        cold_us = time_accesses(store.get, cold_ids)
+        hot_ids = [rng.choice(cold_ids[-args.cache_size:]) for _ in range(args.accesses)]
+        hot_us = time_accesses(store.get, hot_ids)
+        # Includes the decompressed LRU entries and the blob pages touched so far
+        store_rss = rss_mb() - before
+        blob_mb = store.disk_size() / 2**20
+        store.close()
+
+        before = rss_mb()
+        inline = list(texts(args.cvs, args.text_chars))
+        inline_rss = rss_mb() - before
+        inline_disk_mb = len(pickle.dumps(inline, protocol=pickle.HIGHEST_PROTOCOL)) / 2**20
+        inline_us = time_accesses(inline.__getitem__, cold_ids)
+
+    print(f"{args.cvs} CVs, codec={args.codec}")
+    print(f"{'layout':>8} {'disk MB':>9} {'RSS MB':>8} {'cold us':>8} {'hot us':>8}")
+    print(f"{'inline':>8} {inline_disk_mb:>9.1f} {inline_rss:>8.1f} {inline_us:>8.2f} {inline_us:>8.2f}")
+    print(f"{'blob':>8} {blob_mb:>9.1f} {store_rss:>8.1f} {cold_us:>8.2f} {hot_us:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
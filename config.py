@@ -13,10 +13,110 @@ embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
 # Update paths to use db directory
 FAISS_INDEX_PATH = os.path.join("db", "cv_index.faiss")
 METADATA_PATH = os.path.join("db", "cv_metadata.pkl")
+
+# Versioned snapshots (memory-mapped, shared between API workers)
+SNAPSHOT_DIR = os.path.join("db", "snapshots")
+SNAPSHOT_KEEP = 3  # Number of old generations kept for workers that still map them
+SNAPSHOT_POLL_SECONDS = 1.0  # How often API workers check for a newer generation
+USE_MMAP = os.getenv("USE_MMAP", "1") == "1"
+TEXT_COMPRESSION = "zlib"  # Codec for CV text in snapshots: "zlib" or "lzma"
+TEXT_CACHE_SIZE = 256  # Decompressed texts kept in memory per worker
+
+# Parsed/embedded job descriptions, keyed by content hash
+JOB_CACHE_DIR = os.path.join("db", "job_cache")
+JOBS_DIR = "jobs"  # Job posts scored together by the batch CVs x jobs pass
+JOB_TOP_K = 200  # CVs kept per job by the batch pass
+SCORE_BLOCK_ROWS = 8192  # CV rows per matmul block in corpus-wide scoring
+# Paging past the LLM-ranked head: "on" serves /candidates pages from a full-corpus vector ordering
+CORPUS_RANKING = os.getenv("CORPUS_RANKING", "on")
+CORPUS_RANKING_DEPTH = None  # CVs kept in that ordering (None: the whole corpus)
+NEIGHBOR_GRAPH_K = 20  # Most similar CVs precomputed per CV for /candidates/{id}/similar
+NEIGHBOR_BLOCK_ELEMENTS = 1 << 24  # Similarity matrix entries per block while building the graph
+
 DEPLOYMENT_NAME = os.getenv("DEPLOYMENT_NAME", "gpt-35-turbo-16k")
 
 INITIAL_CANDIDATES = 150  # Reduced from 150
 FINAL_RANKING = 20
+LLM_POOL_SIZE = 20  # Top vector matches sent to the LLM for re-ranking
+# How many of them (at least LLM_POOL_MIN) go to the LLM: "fixed" (all), "gap" (cut at a standout
+# drop in score), "elbow" (cut at the knee of the score curve) or "threshold" (within a ratio of the best)
+LLM_POOL_SIZING = os.getenv("LLM_POOL_SIZING", "gap")
+LLM_POOL_MIN = 5
+LLM_POOL_GAP_FACTOR = 3.0  # "gap": a drop counts if it is this many times the mean drop
+LLM_POOL_SCORE_RATIO = 0.9  # "threshold": keep candidates scoring at least this share of the best
+RERANK_WINDOW_RADIUS = 3  # Neighbours re-ranked around a newly inserted CV
+
+# First-stage scorer: "faiss" (full-document L2), "chunk_max" or "chunk_topk" (cosine over chunk vectors)
+# or "sections" (job description sections against matching CV sections, weighted)
+RANKING_SCORER = os.getenv("RANKING_SCORER", "faiss")
+CHUNK_TOP_K = 3  # Chunks averaged per CV by the "chunk_topk" scorer
+# Weight of each job description section in the "sections" score; sections left out are ignored
+SECTION_WEIGHTS = {"requirements": 3.0, "skills": 3.0, "responsibilities": 2.0, "experience": 2.0,
+                   "education": 1.0, "nice_to_have": 0.5, "summary": 0.5}
+# Per-job overrides ({job file name: {section: weight}}), shared by all workers
+SECTION_WEIGHTS_PATH = os.getenv("SECTION_WEIGHTS_PATH", os.path.join("db", "section_weights.json"))
+
+# Skill vocabulary (skill name -> aliases) mapped to per-CV bitsets at ingestion
+SKILLS_VOCABULARY_PATH = os.getenv("SKILLS_VOCABULARY_PATH", "skills_vocabulary.json")
+SKILL_NICE_TO_HAVE_BOOST = 0.1  # Relative score boost for having every nice-to-have skill
+
+# Lexical (BM25) retrieval fused with the vector scorer: "rrf", "weighted" or "off"
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "rrf")
+BM25_K1 = 1.5
+BM25_B = 0.75
+RRF_K = 60  # Rank offset in reciprocal rank fusion
+# Maximal marginal relevance over the first-stage candidates before re-ranking: 1 = relevance
+# only, lower = more diverse; empty = off
+_mmr_lambda = os.getenv("MMR_LAMBDA", "")
+MMR_LAMBDA = float(_mmr_lambda) if _mmr_lambda else None
+HYBRID_BM25_WEIGHT = 0.4  # Share of the BM25 score in "weighted" fusion
+
+# LLM re-ranking: "single" (one prompt over LLM_POOL_SIZE), "windows" (overlapping windows in parallel)
+# or "pointwise" (cached per-candidate scores)
+RERANK_MODE = os.getenv("RERANK_MODE", "single")
+WINDOW_POOL_SIZE = 60  # Candidates re-ranked in "windows" mode
+RERANK_WINDOW_SIZE = 12
+RERANK_WINDOW_STEP = 6  # Window start stride; RERANK_WINDOW_SIZE - RERANK_WINDOW_STEP candidates overlap
+LLM_CONCURRENCY = 4  # Concurrent LLM calls per ranking
+
+# Candidate text in ranking prompts: "relevant" (most job-relevant chunks within a token budget)
+# or "sections" (fixed-size education/experience/skills excerpts)
+PROMPT_CONTEXT = os.getenv("PROMPT_CONTEXT", "relevant")
+CANDIDATE_TOKEN_BUDGET = 300  # Tokens of CV text per candidate
+JD_TOKEN_BUDGET = 600  # Tokens of job description per prompt
+PROMPT_TOKEN_ENCODING = "cl100k_base"  # tiktoken encoding used to count prompt tokens
+
+# "pointwise" mode: cached 0-100 LLM scores per (job, CV) pair
+POINTWISE_POOL_SIZE = 40
+POINTWISE_BATCH_SIZE = 5  # Candidates scored per LLM call
+LLM_SCORE_CACHE_PATH = os.path.join("db", "llm_scores.sqlite")
+
+# Shared LLM gateway (src/llm_gateway.py): limits apply per process
+LLM_MAX_CONCURRENCY = 8  # Azure calls in flight at once
+LLM_MAX_CONNECTIONS = 8  # Pooled keep-alive HTTP connections
+LLM_REQUESTS_PER_MINUTE = 120  # 0 disables the request rate limit
+LLM_TOKENS_PER_MINUTE = 90000  # Estimated prompt tokens; 0 disables the token rate limit
+LLM_MAX_RETRIES = 4  # Retries on 429 / 5xx / connection errors
+LLM_RETRY_BASE_SECONDS = 0.5
+LLM_RETRY_MAX_SECONDS = 20
+LLM_TIMEOUT_SECONDS = 60
+
+# Re-ranker after the first stage: "llm", "cross-encoder" (local, CPU) or "none"
+RERANKER = os.getenv("RERANKER", "llm")
+RERANK_LATENCY_BUDGET_MS = None  # Default ranking latency budget; None = unlimited
+RERANK_FAILURE_PENALTY_MS = 5000  # Added to a failed re-ranker's observed latency, so budgets skip it
+# Rankings not re-ranked within this time are served in vector order (marked provisional) and
+# replaced when the re-ranker finishes; empty = always wait
+_ranking_deadline = os.getenv("RANKING_DEADLINE_MS", "3000")
+RANKING_DEADLINE_MS = float(_ranking_deadline) if _ranking_deadline else None
+# Ranking triggers (uploads, removals, applications, job switches) are batched until none has
+# arrived for RANKING_DEBOUNCE_MS, but a burst never delays a ranking more than RANKING_MAX_DELAY_MS
+RANKING_DEBOUNCE_MS = float(os.getenv("RANKING_DEBOUNCE_MS", "500"))
+RANKING_MAX_DELAY_MS = float(os.getenv("RANKING_MAX_DELAY_MS", "5000"))
+CROSS_ENCODER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+CROSS_ENCODER_POOL_SIZE = 50
+CROSS_ENCODER_BATCH_SIZE = 16
+CROSS_ENCODER_CHUNKS = 2  # Best-matching chunks per CV shown to the cross-encoder
 CHUNK_SIZE = 1000  # Reduced from 1000
 CHUNK_OVERLAP = 200  # Reduced from 200
 
@@ -0,0 +1,56 @@
+# snapshot_tool.py
+# Export the current snapshot into a single archive, or import one on a new replica:
+#
+#   python snapshot_tool.py export snapshot.cvsnap
+#   python snapshot_tool.py import snapshot.cvsnap
+#   ssh primary "cd app && python snapshot_tool.py export -" | python snapshot_tool.py import -
+import os
+import sys
+import time
+import argparse
+
+# Add the project root directory to Python's module search path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.snapshot_archive import export_snapshot, import_snapshot, ArchiveError
+from config import SNAPSHOT_DIR
+
+def main():
+    parser = argparse.ArgumentParser(description="Export/import CV ranking snapshots")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = commands.add_parser("export", help="Pack a snapshot generation into an archive")
+    export_cmd.add_argument("archive", help="Output file, or - for stdout")
+    export_cmd.add_argument("--generation", type=int, default=None, help="Defaults to the current generation")
+
+    import_cmd = commands.add_parser("import", help="Verify and unpack an archive as the current generation")
+    import_cmd.add_argument("archive", help="Input file, or - for stdin")
+
+    args = parser.parse_args()
+    start = time.perf_counter()
+
+    try:
+        if args.command == "export":
+            if args.archive == "-":
+                manifest = export_snapshot(sys.stdout.buffer, args.generation, args.snapshot_dir)
+            else:
+                with open(args.archive, "wb") as out:
+                    manifest = export_snapshot(out, args.generation, args.snapshot_dir)
+            size = sum(entry["size"] for entry in manifest["files"])
+            print(f"Exported generation {manifest['generation']} ({len(manifest['files'])} files, "
+                  f"{size / 2**20:.1f} MB) in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        else:
+            if args.archive == "-":
+                generation = import_snapshot(sys.stdin.buffer, args.snapshot_dir)
+            else:
+                with open(args.archive, "rb") as stream:
+                    generation = import_snapshot(stream, args.snapshot_dir)
+            print(f"Imported archive as generation {generation} in {time.perf_counter() - start:.2f}s",
+                  file=sys.stderr)
+    except (ArchiveError, FileNotFoundError) as e:
+        print(f"Snapshot {args.command} failed: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,10 @@
 
 # Import core components for easier access
 from .text_processing import extract_text_from_pdf, clean_text, extract_contact_info
-from .text_chunking import chunk_text, chunk_cv, extract_sections
+from .text_chunking import chunk_text, chunk_cv, extract_sections, extract_section_spans
+from .cv_record import CVRecord, RankedCV
 from .vector_db import process_cvs, initialize_system, save_data, load_data
+from .job_cache import get_job_artifacts, JobArtifacts
 from .ranking import rank_cvs, truncate_text, parse_llm_response
 
 # Version information
@@ -0,0 +1,187 @@
+import math
+import threading
+import numpy as np
+from array import array
+from collections import Counter
+from typing import List, Optional, Tuple
+from config import BM25_K1, BM25_B
+
+# --- Inverted index with BM25 scoring over cleaned CV text ---
+#
+# Documents are tokenised as the lemmas clean_text already produced, so job
+# descriptions cleaned the same way match on exact terms ("kubernetes",
+# "terraform") that dense vectors tend to blur.
+#
+# Every CV gets an integer slot. Postings are append-only typed arrays per
+# term (slot ids and term frequencies), which numpy reads without copying at
+# query time. Removing a CV only marks its slot dead; postings are compacted
+# once enough of them are dead.
+
+COMPACT_DEAD_FRACTION = 0.25
+
+
+def tokenize(cleaned_text: str) -> List[str]:
+    return cleaned_text.split() if cleaned_text else []
+
+
+class BM25Index:
+    """Incrementally maintained BM25 index keyed by CV filename"""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.slots = {}           # filename -> slot
+        self.filenames = []       # slot -> filename (None once removed)
+        self.lengths = array("f")  # slot -> document length in tokens
+        self.postings = {}        # term -> (array("q") slots, array("f") term frequencies)
+        self.total_length = 0.0
+        self.dead = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, filename):
+        return filename in self.slots
+
+    def add(self, filename: str, cleaned_text: str):
+        with self._lock:
+            if filename in self.slots:
+                self._remove(filename)
+            tokens = tokenize(cleaned_text)
+            slot = len(self.filenames)
+            self.slots[filename] = slot
+            self.filenames.append(filename)
+            self.lengths.append(len(tokens))
+            self.total_length += len(tokens)
+            for term, tf in Counter(tokens).items():
+                entry = self.postings.get(term)
+                if entry is None:
+                    entry = self.postings[term] = (array("q"), array("f"))
+                entry[0].append(slot)
+                entry[1].append(tf)
+
+    def remove(self, filename: str) -> bool:
+        with self._lock:
+            return self._remove(filename)
+
+    def _remove(self, filename: str) -> bool:
+        slot = self.slots.pop(filename, None)
+        if slot is None:
+            return False
+        self.filenames[slot] = None
+        self.total_length -= self.lengths[slot]
+        self.lengths[slot] = 0
+        self.dead += 1
+        if self.dead > COMPACT_DEAD_FRACTION * len(self.filenames):
+            self._compact()
+        return True
+
+    def _compact(self):
+        """Drop postings of removed CVs and renumber the remaining slots"""
+        live = np.array([name is not None for name in self.filenames], dtype=bool)
+        new_slot = np.cumsum(live) - 1
+        postings = {}
+        for term, (slots, tfs) in self.postings.items():
+            slots = np.frombuffer(slots, dtype=np.int64)
+            keep = live[slots]
+            if keep.any():
+                postings[term] = (array("q", new_slot[slots[keep]].tobytes()),
+                                  array("f", np.frombuffer(tfs, dtype=np.float32)[keep].tobytes()))
+        self.postings = postings
+        self.filenames = [name for name in self.filenames if name is not None]
+        self.lengths = array("f", np.frombuffer(self.lengths, dtype=np.float32)[live].tobytes())
+        self.slots = {name: slot for slot, name in enumerate(self.filenames)}
+        self.dead = 0
+
+    def search(self, query_text: str, limit: int) -> List[Tuple[str, float]]:
+        """(filename, BM25 score) of the best matching CVs, best first"""
+        terms = set(tokenize(query_text))
+        with self._lock:
+            n_docs = len(self.slots)
+            if not n_docs or not terms:
+                return []
+            lengths = np.frombuffer(self.lengths, dtype=np.float32)
+            live = lengths > 0
+            norm = self.k1 * (1 - self.b + self.b * lengths / max(self.total_length / n_docs, 1.0))
+            scores = np.zeros(len(self.filenames), dtype=np.float32)
+            for term in terms:
+                entry = self.postings.get(term)
+                if entry is None:
+                    continue
+                slots = np.frombuffer(entry[0], dtype=np.int64)
+                tfs = np.frombuffer(entry[1], dtype=np.float32)
+                alive = live[slots]
+                df = int(alive.sum())
+                if not df:
+                    continue
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                # Each slot appears at most once per term, so plain fancy-index addition is safe
+                scores[slots] += np.where(alive, idf * tfs * (self.k1 + 1) / (tfs + norm[slots]), 0)
+
+            limit = min(limit, int((scores > 0).sum()))
+            if limit <= 0:
+                return []
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self.filenames[slot], float(scores[slot])) for slot in top]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+# The index of the corpus this process currently serves
+_index = None
+_registry_lock = threading.Lock()
+
+
+def _in_sync(index: BM25Index, metadata) -> bool:
+    return len(index) == len(metadata) and all(cv.filename in index for cv in metadata)
+
+
+def get_bm25_index(metadata) -> BM25Index:
+    """BM25 index covering exactly the CVs in metadata, built or caught up on demand"""
+    global _index
+    with _registry_lock:
+        if _index is None:
+            _index = BM25Index()
+        if not _in_sync(_index, metadata):
+            current = {cv.filename for cv in metadata}
+            for filename in [name for name in _index.slots if name not in current]:
+                _index.remove(filename)
+            for cv in metadata:
+                if cv.filename not in _index:
+                    _index.add(cv.filename, cv.cleaned_text)
+        return _index
+
+
+def set_bm25_index(index: Optional[BM25Index]):
+    """Adopt an index loaded with a snapshot"""
+    global _index
+    with _registry_lock:
+        _index = index
+
+
+def bm25_index_for(metadata) -> Optional[BM25Index]:
+    """The loaded index if it matches metadata (without building one), for snapshots"""
+    with _registry_lock:
+        if _index is not None and _in_sync(_index, metadata):
+            return _index
+    return None
+
+
+def index_cv(record):
+    """Add a newly stored CV to the loaded index (a missing index is built lazily later)"""
+    if _index is not None:
+        _index.add(record.filename, record.cleaned_text)
+
+
+def unindex_cv(filename: str):
+    if _index is not None:
+        _index.remove(filename)
@@ -1,6 +1,5 @@
-from config import DEPLOYMENT_NAME, AZURE_CONFIG
-from langchain_openai import AzureChatOpenAI
 from .ranking import truncate_text, rank_cvs
+from .llm_gateway import get_llm
 from .cv_management import add_cv, remove_cv_from_system
 import re
 
@@ -37,14 +36,8 @@ def generate_response(user_prompt: str, faiss_index, metadata, job_desc_path: st
     # 2. Build system context
     system_context = build_system_context(ranked_cvs)
 
-    # 3. Create model instance
-    model = AzureChatOpenAI(
-        azure_endpoint=AZURE_CONFIG["azure_endpoint"],
-        api_key=AZURE_CONFIG["api_key"],
-        api_version=AZURE_CONFIG["api_version"],
-        deployment_name=DEPLOYMENT_NAME,
-        temperature=0.3
-    )
+    # 3. Get the shared model client
+    model = get_llm(temperature=0.3, purpose="chat")
 
     # 4. Construct message history
     messages = [
@@ -267,11 +260,10 @@ def generate_response(user_prompt: str, faiss_index, metadata, job_desc_path: st
 # Function to compare two candidates
 def compare_candidates(cv1, cv2, job_desc_path):
     """Compare two candidates against the job description"""
-    from .text_processing import extract_text_from_pdf, clean_text
+    from .job_cache import get_job_artifacts
     
     # Get job description
-    raw_jd = extract_text_from_pdf(job_desc_path)
-    cleaned_jd = clean_text(raw_jd)
+    cleaned_jd = get_job_artifacts(job_desc_path).cleaned_text
     
     # Create comparison prompt
     prompt = f"""Compare these two candidates for the following job position:
@@ -297,14 +289,8 @@ COMPARISON FORMAT INSTRUCTIONS:
 
 Please compare their qualifications relative to the job requirements and determine which candidate is a better fit and why."""
     
-    # Create a new chat model instance
-    comparison_model = AzureChatOpenAI(
-        azure_endpoint=AZURE_CONFIG["azure_endpoint"],
-        api_key=AZURE_CONFIG["api_key"],
-        api_version=AZURE_CONFIG["api_version"],
-        deployment_name=DEPLOYMENT_NAME,
-        temperature=0.3
-    )
+    # Get the shared chat model client
+    comparison_model = get_llm(temperature=0.3, purpose="compare")
     
     # Get comparison
     response = comparison_model.invoke(prompt)
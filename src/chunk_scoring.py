@@ -0,0 +1,116 @@
+import threading
+import numpy as np
+from config import CHUNK_TOP_K
+
+# --- Chunk-level scoring ---
+#
+# Every candidate's chunk vectors are stacked into one L2-normalised matrix,
+# so scoring the job description against the whole corpus is a single
+# matrix-vector product followed by a per-CV reduction.
+
+CHUNK_SCORERS = ("chunk_max", "chunk_topk")
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class ChunkMatrix:
+    """All chunk vectors of a corpus as one contiguous, normalised matrix"""
+
+    __slots__ = ("records", "vectors", "offsets", "padded", "doc_vectors")
+
+    def __init__(self, metadata):
+        self.records = list(metadata)
+        dimension = self.records[0].embedding.shape[0] if self.records else 0
+        counts = np.array([len(cv.chunk_vectors) for cv in self.records], dtype=np.int64)
+        self.offsets = np.zeros(len(self.records) + 1, dtype=np.int64)
+        self.offsets[1:] = np.cumsum(counts)
+        if self.offsets[-1]:
+            self.vectors = _normalize(np.concatenate([cv.chunk_vectors for cv in self.records if len(cv.chunk_vectors)]))
+        else:
+            self.vectors = np.empty((0, dimension), dtype=np.float32)
+        # Full-document vectors score CVs that have no chunks
+        self.doc_vectors = _normalize(np.vstack([cv.embedding for cv in self.records])) if self.records else \
+            np.empty((0, dimension), dtype=np.float32)
+
+        # (n_cvs, max_chunks) chunk row indices, -1 for padding, used by top-k pooling
+        width = int(counts.max()) if len(counts) else 0
+        self.padded = np.full((len(self.records), max(width, 1)), -1, dtype=np.int64)
+        columns = np.arange(width)
+        mask = columns[None, :] < counts[:, None]
+        self.padded[:, :width][mask] = np.arange(self.offsets[-1])
+
+    def matches(self, metadata) -> bool:
+        return len(metadata) == len(self.records) and all(a is b for a, b in zip(metadata, self.records))
+
+
+_cached_matrix = None
+_cache_lock = threading.Lock()
+
+
+def get_chunk_matrix(metadata) -> ChunkMatrix:
+    """Chunk matrix for metadata, rebuilt only when CVs were added or removed"""
+    global _cached_matrix
+    with _cache_lock:
+        if _cached_matrix is None or not _cached_matrix.matches(metadata):
+            _cached_matrix = ChunkMatrix(metadata)
+        return _cached_matrix
+
+
+def chunk_scores(jd_embedding, matrix: ChunkMatrix, scorer: str = "chunk_max", k: int = CHUNK_TOP_K) -> np.ndarray:
+    """
+    Score every CV in matrix against the job description.
+
+    Args:
+        jd_embedding: Job description vector
+        matrix: ChunkMatrix of the corpus
+        scorer: "chunk_max" (best chunk) or "chunk_topk" (mean of the k best chunks)
+        k: Chunks averaged by "chunk_topk"
+
+    Returns:
+        (n_cvs,) cosine-similarity scores, aligned with matrix.records
+    """
+    if scorer not in CHUNK_SCORERS:
+        raise ValueError(f"Unknown chunk scorer: {scorer}")
+    query = _normalize(jd_embedding)
+    n_cvs = len(matrix.records)
+    scores = matrix.doc_vectors @ query if n_cvs else np.empty(0, dtype=np.float32)
+    if not len(matrix.vectors):
+        return scores
+
+    sims = matrix.vectors @ query
+    has_chunks = np.diff(matrix.offsets) > 0
+
+    if scorer == "chunk_max":
+        # Segments of CVs without chunks are empty, so reduce only over the others
+        scores[has_chunks] = np.maximum.reduceat(sims, matrix.offsets[:-1][has_chunks])
+    else:
+        padded = np.where(matrix.padded >= 0, sims[matrix.padded], -np.inf)
+        k = min(k, padded.shape[1])
+        top = -np.partition(-padded, k - 1, axis=1)[:, :k] if k < padded.shape[1] else padded
+        finite = np.isfinite(top)
+        totals = np.where(finite, top, 0).sum(axis=1)
+        counts = finite.sum(axis=1)
+        scores[has_chunks] = totals[has_chunks] / counts[has_chunks]
+    return scores
+
+
+def record_chunk_score(record, jd_embedding, scorer: str = "chunk_max", k: int = CHUNK_TOP_K) -> float:
+    """chunk_scores for a single CV, without building a corpus matrix"""
+    query = _normalize(jd_embedding)
+    if not len(record.chunk_vectors):
+        return float(_normalize(record.embedding) @ query)
+    sims = np.sort(_normalize(record.chunk_vectors) @ query)[::-1]
+    return float(sims[0] if scorer == "chunk_max" else sims[:k].mean())
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
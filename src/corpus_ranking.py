@@ -0,0 +1,172 @@
+import heapq
+import threading
+import numpy as np
+from typing import List, Optional
+from .cv_record import RankedCV
+from .chunk_scoring import CHUNK_SCORERS, get_chunk_matrix, chunk_scores
+from .section_scoring import get_section_matrix, section_scores, section_weights
+from .skills import must_have_mask
+from config import RANKING_SCORER, SCORE_BLOCK_ROWS, CORPUS_RANKING_DEPTH
+
+# --- Full-corpus ranking ---
+#
+# rank_cvs only orders the head of the list (FINAL_RANKING CVs). For paging
+# past it, every CV is scored against the job in blocks of SCORE_BLOCK_ROWS
+# rows, with a bounded heap keeping the best CORPUS_RANKING_DEPTH of them.
+# The LLM-ranked head is then put in front of that vector-ranked tail.
+#
+# The vector ordering depends only on the job, the scorer and the CV set, so
+# it is cached and reused when just the head changes.
+
+
+class CorpusVectors:
+    """Full-document CV embeddings stacked once per CV set"""
+
+    __slots__ = ("records", "rows", "vectors", "norms")
+
+    def __init__(self, metadata):
+        self.records = list(metadata)
+        self.rows = {cv.filename: row for row, cv in enumerate(self.records)}
+        self.vectors = np.vstack([cv.embedding for cv in self.records]).astype(np.float32, copy=False) \
+            if self.records else np.empty((0, 0), dtype=np.float32)
+        self.norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+
+    def matches(self, metadata) -> bool:
+        return len(metadata) == len(self.records) and all(a is b for a, b in zip(metadata, self.records))
+
+
+def _score_blocks(job, corpus: CorpusVectors, scorer: str, block_rows: int, weights=None):
+    """(start row, scores) blocks covering the whole corpus"""
+    if scorer in CHUNK_SCORERS:
+        # Chunk scores already come from one corpus-wide product
+        yield 0, chunk_scores(job.embedding, get_chunk_matrix(corpus.records), scorer)
+        return
+    if scorer == "sections":
+        yield 0, section_scores(job, get_section_matrix(corpus.records), weights)
+        return
+    if scorer != "faiss":
+        raise ValueError(f"Unknown scorer: {scorer}")
+    query = np.asarray(job.embedding, dtype=np.float32)
+    query_norm = float(query @ query)
+    for start in range(0, len(corpus.records), block_rows):
+        block = corpus.vectors[start:start + block_rows]
+        distances = np.maximum(corpus.norms[start:start + block_rows] + query_norm - 2 * (block @ query), 0)
+        yield start, 1 / (1 + distances)
+
+
+def stream_top_k(blocks, k: Optional[int]):
+    """
+    Best k (row, score) pairs over streamed score blocks, best first.
+
+    Only the block's own top k can enter the heap, and only those beating the
+    current k-th best are pushed, so the Python-level work stays at O(k) per
+    block however large the blocks are. Without a k every row is kept and the
+    blocks are simply sorted together.
+
+    Args:
+        blocks: Iterable of (start row, scores array)
+        k: Pairs to keep (None keeps every row)
+
+    Returns:
+        (rows, scores) arrays, best first
+    """
+    if k is None:
+        blocks = list(blocks)
+        if not blocks:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = np.concatenate([block for _, block in blocks]).astype(np.float32, copy=False)
+        rows = np.concatenate([np.arange(start, start + len(block)) for start, block in blocks])
+        order = np.argsort(-scores, kind="stable")
+        return rows[order], scores[order]
+
+    heap = []  # (score, -row) min-heap of the best k so far; earlier rows win ties
+    for start, scores in blocks:
+        if len(scores) <= k:
+            candidates = np.arange(len(scores))
+        else:
+            # argpartition splits ties at the k-th score arbitrarily, so take the earliest tied rows
+            kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+            above = np.flatnonzero(scores > kth)
+            candidates = np.concatenate([above, np.flatnonzero(scores == kth)[:k - len(above)]])
+        if len(heap) >= k:
+            candidates = candidates[scores[candidates] > heap[0][0]]
+        for row in candidates:
+            item = (float(scores[row]), -(start + int(row)))
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+    best = sorted(heap, reverse=True)
+    return (np.array([-row for _, row in best], dtype=np.int64),
+            np.array([score for score, _ in best], dtype=np.float32))
+
+
+class CorpusRanking:
+    """An LLM-ranked head followed by the vector-ranked rest of the corpus"""
+
+    __slots__ = ("records", "head", "tail_rows", "tail_scores")
+
+    def __init__(self, corpus: CorpusVectors, head, rows, scores, allowed=None):
+        self.records = corpus.records
+        self.head = list(head)
+        # The tail is the vector ordering minus everyone already in the head
+        # (and anyone a must-have skill filter excludes)
+        head_rows = [corpus.rows[cv.filename] for cv in self.head if cv.filename in corpus.rows]
+        keep = ~np.isin(rows, head_rows)
+        if allowed is not None:
+            keep &= allowed[rows]
+        self.tail_rows = rows[keep]
+        self.tail_scores = scores[keep]
+
+    def __len__(self):
+        return len(self.head) + len(self.tail_rows)
+
+    def page(self, offset: int = 0, limit: int = 20) -> List[RankedCV]:
+        """Candidates at positions offset..offset+limit-1"""
+        end = min(offset + limit, len(self))
+        page = self.head[offset:end]
+        start = max(offset - len(self.head), 0)
+        stop = max(end - len(self.head), 0)
+        page += [RankedCV(self.records[row], float(score))
+                 for row, score in zip(self.tail_rows[start:stop], self.tail_scores[start:stop])]
+        return page
+
+    def at(self, position: int) -> Optional[RankedCV]:
+        page = self.page(position, 1) if position >= 0 else []
+        return page[0] if page else None
+
+
+_corpus = None
+_ordering = {"key": None, "rows": None, "scores": None}
+_ranking = {"head": None, "rows": None, "must_have": None, "ranking": None}
+_lock = threading.Lock()
+
+
+def vector_ordering(job, metadata, scorer: str = RANKING_SCORER, depth: Optional[int] = CORPUS_RANKING_DEPTH,
+                    block_rows: int = SCORE_BLOCK_ROWS):
+    """(corpus, rows, scores) of the corpus ordered by vector score, cached per job/scorer/weights/CV set"""
+    global _corpus
+    with _lock:
+        if _corpus is None or not _corpus.matches(metadata):
+            _corpus = CorpusVectors(metadata)
+            _ordering["key"] = None
+        weights = section_weights(job.path) if scorer == "sections" else None
+        key = (job.content_hash, scorer, depth, tuple(sorted(weights.items())) if weights else None)
+        if _ordering["key"] != key:
+            rows, scores = stream_top_k(_score_blocks(job, _corpus, scorer, block_rows, weights), depth)
+            _ordering.update(key=key, rows=rows, scores=scores)
+        return _corpus, _ordering["rows"], _ordering["scores"]
+
+
+def corpus_ranking(job, metadata, head, scorer: str = RANKING_SCORER,
+                   depth: Optional[int] = CORPUS_RANKING_DEPTH, must_have=()) -> CorpusRanking:
+    """The merged full ordering for head (the current ranked_cvs list)"""
+    corpus, rows, scores = vector_ordering(job, metadata, scorer, depth)
+    must_have = tuple(must_have)
+    with _lock:
+        if _ranking["head"] is head and _ranking["rows"] is rows and _ranking["must_have"] == must_have:
+            return _ranking["ranking"]
+        allowed = must_have_mask(corpus.records, must_have)
+        ranking = CorpusRanking(corpus, head, rows, scores, allowed)
+        _ranking.update(head=head, rows=rows, must_have=must_have, ranking=ranking)
+        return ranking
@@ -0,0 +1,73 @@
+import time
+import threading
+import numpy as np
+from config import CROSS_ENCODER_MODEL, CROSS_ENCODER_BATCH_SIZE, CROSS_ENCODER_CHUNKS
+
+# --- Local cross-encoder re-ranking ---
+#
+# A small cross-encoder reads the job requirements together with each
+# candidate's best-matching chunks and scores the pair on CPU, in batches.
+# Candidates are scored in first-stage order, so when a deadline cuts the
+# stage short the strongest first-stage candidates have been scored already.
+
+JD_QUERY_CHARS = 1000
+PASSAGE_CHARS = 1500
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_cross_encoder():
+    """Load the cross-encoder once per process"""
+    global _model
+    with _model_lock:
+        if _model is None:
+            from sentence_transformers import CrossEncoder
+            _model = CrossEncoder(CROSS_ENCODER_MODEL, device="cpu")
+        return _model
+
+
+def job_query(job) -> str:
+    """The part of the job post the cross-encoder compares candidates against"""
+    for name in ("requirements", "skills", "responsibilities"):
+        section = job.section(name)
+        if section:
+            return section[:JD_QUERY_CHARS]
+    return job.raw_text[:JD_QUERY_CHARS]
+
+
+def best_chunks_passage(cv, jd_embedding, n_chunks: int = CROSS_ENCODER_CHUNKS) -> str:
+    """The CV's chunks closest to the job vector, in document order"""
+    if not cv.chunks or not len(cv.chunk_vectors) or jd_embedding is None:
+        return cv.raw_text[:PASSAGE_CHARS]
+    sims = np.asarray(cv.chunk_vectors, dtype=np.float32) @ np.asarray(jd_embedding, dtype=np.float32)
+    best = sorted(np.argsort(-sims)[:n_chunks])
+    return " ... ".join(cv.chunks[i] for i in best)[:PASSAGE_CHARS]
+
+
+def cross_encoder_scores(job, candidates, deadline=None, batch_size: int = CROSS_ENCODER_BATCH_SIZE,
+                         model=None):
+    """
+    Cross-encoder relevance of each candidate, None for those not reached before the deadline.
+
+    Args:
+        job: JobArtifacts of the job description
+        candidates: Candidates in first-stage order
+        deadline: time.monotonic() value to stop starting new batches at, or None
+        batch_size: Pairs scored per forward pass
+        model: Cross-encoder to use instead of the shared one
+
+    Returns:
+        List of float scores or None, aligned with candidates
+    """
+    model = model or get_cross_encoder()
+    query = job_query(job)
+    scores = [None] * len(candidates)
+    for start in range(0, len(candidates), batch_size):
+        if deadline is not None and start and time.monotonic() >= deadline:
+            break
+        batch = candidates[start:start + batch_size]
+        pairs = [(query, best_chunks_passage(cv, job.embedding)) for cv in batch]
+        for i, score in enumerate(model.predict(pairs, batch_size=batch_size, show_progress_bar=False)):
+            scores[start + i] = float(score)
+    return scores
@@ -2,6 +2,11 @@ import os
 import numpy as np
 from .text_processing import extract_text_from_pdf, clean_text, extract_contact_info
 from .vector_db import save_data
+from .snapshot import ensure_writable
+from .cv_record import CVRecord
+from .section_scoring import embed_sections
+from .skills import get_vocabulary, encode_skills
+from .bm25_index import index_cv, unindex_cv
 from config import embedding_model
 
 def add_cv(cv_path, faiss_index, metadata, original_filename=None):
@@ -21,49 +26,57 @@ def add_cv(cv_path, faiss_index, metadata, original_filename=None):
         cleaned = clean_text(raw_text)
         contact = extract_contact_info(raw_text)
         
-        # Extract sections from the CV
-        from .text_chunking import extract_sections, chunk_text
+        # Locate sections in the CV (stored as offsets into raw_text)
+        from .text_chunking import extract_section_spans, chunk_text
         from config import CHUNK_SIZE, CHUNK_OVERLAP
         
-        sections = extract_sections(raw_text)
+        section_spans = extract_section_spans(raw_text)
         
         # Create chunks from the raw text
         chunks = chunk_text(raw_text, CHUNK_SIZE, CHUNK_OVERLAP)
         
-        # Create embeddings for each chunk
-        chunk_embeddings = []
-        for chunk in chunks:
-            chunk_embedding = embedding_model.encode([chunk])[0]
-            chunk_embeddings.append({
-                "text": chunk,
-                "embedding": chunk_embedding
-            })
+        # Embed all chunks in one batch into a single matrix
+        chunk_vectors = embedding_model.encode(chunks) if chunks else None
         
         # Also create a full document embedding for backward compatibility
         full_embedding = embedding_model.encode([cleaned])[0]
         
+        # One embedding per section, for section-level scoring
+        section_names, section_vectors = embed_sections(raw_text, section_spans)
+        
+        # Map mentioned skills to vocabulary IDs for must-have filtering
+        vocabulary = get_vocabulary()
+        skill_bits = encode_skills(raw_text, vocabulary)
+        
         # Check if CV already exists
         for cv in metadata:
-            if cv['filename'] == filename:
+            if cv.filename == filename:
                 error_msg = f"CV {filename} already exists in the system"
                 return faiss_index, metadata, False, error_msg
                 
         # Add to metadata
-        new_cv = {
-            "filename": filename,
-            "raw_text": raw_text,
-            "cleaned_text": cleaned,
-            "embedding": full_embedding,
-            "contact": contact,
-            "sections": sections,
-            "chunks": chunks,
-            "chunk_embeddings": chunk_embeddings,
-            "chunk_count": len(chunks)
-        }
+        new_cv = CVRecord(
+            filename=filename,
+            raw_text=raw_text,
+            cleaned_text=cleaned,
+            embedding=full_embedding,
+            contact=contact,
+            section_spans=section_spans,
+            chunks=chunks,
+            chunk_vectors=chunk_vectors,
+            skill_bits=skill_bits,
+            skill_vocabulary=vocabulary.version,
+            section_names=section_names,
+            section_vectors=section_vectors
+        )
         metadata.append(new_cv)
         
-        # Add to FAISS index
-        faiss_index.add(np.array([full_embedding]))
+        # Add to FAISS index (a memory-mapped index must be copied before it can grow)
+        faiss_index = ensure_writable(faiss_index)
+        faiss_index.add(new_cv.embedding.reshape(1, -1))
+        
+        # Keep the lexical index in step
+        index_cv(new_cv)
         
         # Save updated data
         save_data(faiss_index, metadata)
@@ -80,7 +93,7 @@ def remove_cv_from_system(filename, faiss_index, metadata):
         found_index = None
         
         for i, cv in enumerate(metadata):
-            if cv['filename'] == filename:
+            if cv.filename == filename:
                 found_index = i
                 break
                 
@@ -92,10 +105,11 @@ def remove_cv_from_system(filename, faiss_index, metadata):
         # Remove from metadata
         removed_cv = metadata.pop(found_index)
         print(f"Removed CV {filename} from metadata")
+        unindex_cv(filename)
         
         # Rebuild FAISS index (since we can't remove individual vectors)
         if len(metadata) > 0:
-            embeddings = np.array([cv["embedding"] for cv in metadata])
+            embeddings = np.vstack([cv.embedding for cv in metadata])
             dimension = embeddings.shape[1]
             
             new_index = faiss_index.__class__(dimension)
@@ -103,7 +117,7 @@ def remove_cv_from_system(filename, faiss_index, metadata):
             print(f"Rebuilt index with {len(metadata)} vectors")
         else:
             # If there are no CVs left, create an empty index with the same dimension
-            dimension = removed_cv["embedding"].shape[0]
+            dimension = removed_cv.embedding.shape[0]
             new_index = faiss_index.__class__(dimension)
             print("Created empty index (no CVs remaining)")
             
@@ -0,0 +1,229 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class CVRecord:
+    """
+    Compact in-memory representation of a processed CV.
+
+    Every piece of text is stored once: sections are (start, end) offsets into
+    ``raw_text`` and the chunk vectors live in a single contiguous float32
+    matrix whose rows line up with ``chunks``. Records loaded from a snapshot
+    keep ``raw_text`` and ``cleaned_text`` compressed in a TextBlobStore and
+    only decompress them on access.
+
+    Records also support read-only dict-style access (``cv["filename"]``,
+    ``cv.get("summary")``) so code written against the old metadata dicts
+    keeps working.
+    """
+
+    __slots__ = (
+        "filename",
+        "_raw_text",
+        "_cleaned_text",
+        "text_store",
+        "text_id",
+        "embedding",
+        "contact",
+        "section_spans",
+        "chunks",
+        "chunk_vectors",
+        "summary",
+        "skill_bits",
+        "skill_vocabulary",
+        "section_names",
+        "section_vectors",
+    )
+
+    def __init__(self, filename: str, raw_text: str, cleaned_text: str, embedding,
+                 contact: Optional[Dict[str, Optional[str]]] = None,
+                 section_spans: Optional[Dict[str, Sequence[Tuple[int, int]]]] = None,
+                 chunks: Sequence[str] = (), chunk_vectors=None,
+                 summary: Optional[str] = None, skill_bits: Optional[bytes] = None,
+                 skill_vocabulary: Optional[str] = None, section_names: Sequence[str] = (),
+                 section_vectors=None):
+        self.filename = filename
+        self._raw_text = raw_text
+        self._cleaned_text = cleaned_text
+        self.text_store = None
+        self.text_id = None
+        self.embedding = np.ascontiguousarray(embedding, dtype=np.float32)
+        self.contact = contact or {"email": None, "phone": None}
+        self.section_spans = {
+            name: tuple((int(start), int(end)) for start, end in spans)
+            for name, spans in (section_spans or {}).items()
+        }
+        self.chunks = tuple(chunks)
+        if chunk_vectors is None or len(chunk_vectors) == 0:
+            chunk_vectors = np.empty((0, self.embedding.shape[0]), dtype=np.float32)
+        self.chunk_vectors = np.ascontiguousarray(chunk_vectors, dtype=np.float32)
+        self.summary = summary
+        # Skill bitset (see skills.py) and the vocabulary version it was computed with
+        self.skill_bits = skill_bits
+        self.skill_vocabulary = skill_vocabulary
+        # One embedding per section (rows line up with section_names), for section-level scoring
+        self.section_names = tuple(section_names)
+        if section_vectors is None or len(section_vectors) == 0:
+            section_vectors = np.empty((0, self.embedding.shape[0]), dtype=np.float32)
+        self.section_vectors = np.ascontiguousarray(section_vectors, dtype=np.float32)
+
+    @classmethod
+    def from_legacy(cls, cv: dict) -> "CVRecord":
+        """Convert an old-style metadata dict into a CVRecord"""
+        from .text_chunking import extract_section_spans
+
+        raw_text = cv.get("raw_text", "")
+        chunk_vectors = None
+        if cv.get("chunk_embeddings"):
+            chunk_vectors = np.vstack([c["embedding"] for c in cv["chunk_embeddings"]])
+        return cls(
+            filename=cv["filename"],
+            raw_text=raw_text,
+            cleaned_text=cv.get("cleaned_text", ""),
+            embedding=cv["embedding"],
+            contact=cv.get("contact"),
+            section_spans=extract_section_spans(raw_text),
+            chunks=cv.get("chunks", ()),
+            chunk_vectors=chunk_vectors,
+            summary=cv.get("summary"),
+        )
+
+    # --- text, possibly kept compressed in a TextBlobStore ---
+    # Entry 2 * text_id of the store is raw_text, entry 2 * text_id + 1 is cleaned_text
+
+    @property
+    def raw_text(self) -> str:
+        if self._raw_text is not None:
+            return self._raw_text
+        return self.text_store.get(2 * self.text_id)
+
+    @property
+    def cleaned_text(self) -> str:
+        if self._cleaned_text is not None:
+            return self._cleaned_text
+        return self.text_store.get(2 * self.text_id + 1)
+
+    def text_entries(self):
+        """raw_text and cleaned_text for a new blob, reusing compressed bytes when possible"""
+        if self._raw_text is None:
+            yield self.text_store.compressed(2 * self.text_id)
+        else:
+            yield self._raw_text
+        if self._cleaned_text is None:
+            yield self.text_store.compressed(2 * self.text_id + 1)
+        else:
+            yield self._cleaned_text
+
+    # Large arrays that snapshots store in shared, memory-mapped matrices
+    VECTOR_FIELDS = ("embedding", "chunk_vectors", "section_vectors")
+    # Everything a snapshot stores in its own files rather than in the pickle
+    EXTERNAL_FIELDS = VECTOR_FIELDS + ("_raw_text", "_cleaned_text", "text_store", "text_id")
+
+    def to_state(self) -> dict:
+        """Everything except vectors and text, for pickling next to the matrices and text blob"""
+        return {name: getattr(self, name) for name in self.__slots__ if name not in self.EXTERNAL_FIELDS}
+
+    @classmethod
+    def from_state(cls, state: dict, text_store=None, text_id=None, **vectors) -> "CVRecord":
+        """Rebuild a record from to_state() output, its (possibly memory-mapped) vectors and text"""
+        record = cls.__new__(cls)
+        for name in cls.__slots__:
+            if name not in cls.EXTERNAL_FIELDS:
+                setattr(record, name, state.get(name))
+        for name in cls.VECTOR_FIELDS:
+            setattr(record, name, vectors.get(name))
+        # Records saved before section embeddings (or without their vectors) have none
+        if record.section_vectors is None or len(record.section_vectors) != len(record.section_names or ()):
+            record.section_names = ()
+            record.section_vectors = np.empty((0, record.embedding.shape[0]), dtype=np.float32)
+        record.section_names = tuple(record.section_names)
+        # Snapshots written before the text store kept the text in the pickle
+        record._raw_text = state.get("raw_text")
+        record._cleaned_text = state.get("cleaned_text")
+        record.text_store = text_store
+        record.text_id = text_id
+        return record
+
+    def __getstate__(self):
+        # Self-contained pickles: inline the text and copy the vectors out of any mapping
+        state = self.to_state()
+        state.update(raw_text=self.raw_text, cleaned_text=self.cleaned_text,
+                     embedding=np.array(self.embedding), chunk_vectors=np.array(self.chunk_vectors),
+                     section_vectors=np.array(self.section_vectors))
+        return state
+
+    def __setstate__(self, state):
+        rebuilt = CVRecord.from_state(state, embedding=state["embedding"], chunk_vectors=state["chunk_vectors"],
+                                      section_vectors=state.get("section_vectors"))
+        for name in self.__slots__:
+            setattr(self, name, getattr(rebuilt, name))
+
+    def section(self, name: str) -> Optional[str]:
+        """Return the text of a single section, or None if the CV has none"""
+        spans = self.section_spans.get(name)
+        if not spans:
+            return None
+        return "\n".join(self.raw_text[start:end] for start, end in spans)
+
+    @property
+    def sections(self) -> Dict[str, str]:
+        return {name: self.section(name) for name in self.section_spans}
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def chunk_embeddings(self) -> List[dict]:
+        """Legacy view pairing each chunk with its vector (rows are not copied)"""
+        return [{"text": chunk, "embedding": vector}
+                for chunk, vector in zip(self.chunks, self.chunk_vectors)]
+
+    # --- dict-style access for backward compatibility ---
+    _KEYS = frozenset(("filename", "raw_text", "cleaned_text", "embedding", "contact", "section_spans",
+                       "chunks", "chunk_vectors", "summary", "sections", "chunk_count", "chunk_embeddings"))
+
+    def __getitem__(self, key):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._KEYS
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._KEYS else default
+
+    def __repr__(self):
+        return f"CVRecord(filename={self.filename!r}, chunks={len(self.chunks)})"
+
+
+class RankedCV:
+    """A CVRecord paired with its ranking score, without copying the record"""
+
+    __slots__ = ("record", "similarity")
+
+    def __init__(self, record: CVRecord, similarity: float):
+        self.record = record
+        self.similarity = float(similarity)
+
+    def __getattr__(self, name):
+        if name == "record":
+            raise AttributeError(name)
+        return getattr(self.record, name)
+
+    def __getitem__(self, key):
+        if key == "similarity":
+            return self.similarity
+        return self.record[key]
+
+    def __contains__(self, key) -> bool:
+        return key == "similarity" or key in self.record
+
+    def get(self, key, default=None):
+        if key == "similarity":
+            return self.similarity
+        return self.record.get(key, default)
+
+    def __repr__(self):
+        return f"RankedCV(filename={self.record.filename!r}, similarity={self.similarity:.4f})"
@@ -0,0 +1,57 @@
+import numpy as np
+from typing import Optional
+from config import RRF_K
+
+# --- Diversity-aware selection (maximal marginal relevance) ---
+#
+# Template CVs from the same bootcamp cohort embed almost identically, so a
+# plain similarity cut can fill the LLM's pool with near-copies. MMR picks
+# candidates one at a time by
+#
+#     lambda * relevance - (1 - lambda) * max cosine to the ones already picked
+#
+# using one precomputed candidate x candidate similarity matrix, so each pick
+# is a few vector operations and no LLM call is added.
+
+
+def mmr_order(candidates, mmr_lambda: float, k: Optional[int] = None):
+    """
+    Re-order candidates (best first) so the first k are relevant and diverse.
+
+    Relevance comes from the first-stage position (reciprocal rank, scaled to
+    0..1), so lambda = 1 keeps the incoming order, hybrid fusion included;
+    lower values trade relevance for diversity. Candidates past k keep their
+    relative order after the selected ones.
+
+    Args:
+        candidates: First-stage candidates, best first, with .embedding
+        mmr_lambda: Relevance weight in [0, 1]
+        k: Candidates to select (None selects them all)
+
+    Returns:
+        The re-ordered candidate list
+    """
+    n = len(candidates)
+    k = n if k is None else min(k, n)
+    if n < 3 or mmr_lambda >= 1:
+        return list(candidates)
+
+    vectors = np.vstack([cv.embedding for cv in candidates]).astype(np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    sims = vectors @ vectors.T
+
+    relevance = 1.0 / (RRF_K + np.arange(n))
+    relevance = (relevance - relevance[-1]) / (relevance[0] - relevance[-1])
+
+    picked = np.zeros(n, dtype=bool)
+    redundancy = np.zeros(n, dtype=np.float32)  # max cosine to any picked candidate (dissimilar = 0)
+    order = []
+    for _ in range(k):
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        scores[picked] = -np.inf
+        best = int(np.argmax(scores))
+        order.append(best)
+        picked[best] = True
+        np.maximum(redundancy, sims[best], out=redundancy)
+    order += [i for i in range(n) if not picked[i]]
+    return [candidates[i] for i in order]
@@ -0,0 +1,141 @@
+import os
+import pickle
+import hashlib
+import threading
+import numpy as np
+from typing import Dict, Optional
+from .text_processing import extract_text_from_pdf, clean_text
+from .text_chunking import extract_section_spans
+from .section_scoring import JD_SECTION_TARGETS, embed_sections
+from config import embedding_model, JOB_CACHE_DIR
+
+# Requirement sections commonly found in job posts (headers at the start of a line, possibly indented)
+JD_SECTION_PATTERNS = {
+    "summary": r"(?im)^[ \t]*(about the role|about us|overview|job summary|job description|position summary)\b",
+    "responsibilities": r"(?im)^[ \t]*(responsibilities|key responsibilities|duties|what you will do|what you'll do)\b",
+    "requirements": r"(?im)^[ \t]*(requirements|qualifications|must have|what we are looking for)\b",
+    "skills": r"(?im)^[ \t]*(skills|technical skills|competencies|technologies|tech stack)\b",
+    "experience": r"(?im)^[ \t]*(experience|work experience)\b",
+    "education": r"(?im)^[ \t]*(education|degree)\b",
+    "nice_to_have": r"(?im)^[ \t]*(nice to have|preferred|bonus points|good to have)\b",
+    "benefits": r"(?im)^[ \t]*(benefits|what we offer|perks)\b",
+}
+
+
+class JobArtifacts:
+    """Everything derived from a job description file, computed once per content version"""
+
+    __slots__ = ("path", "content_hash", "raw_text", "cleaned_text", "embedding", "section_spans",
+                 "section_names", "section_vectors")
+
+    def __init__(self, path, content_hash, raw_text, cleaned_text, embedding, section_spans,
+                 section_names=None, section_vectors=None):
+        self.path = path
+        self.content_hash = content_hash
+        self.raw_text = raw_text
+        self.cleaned_text = cleaned_text
+        self.embedding = embedding
+        self.section_spans = section_spans
+        # Requirement sections embedded one per row (None until computed, see section_scoring.job_sections)
+        self.section_names = section_names
+        self.section_vectors = section_vectors
+
+    def section(self, name: str) -> Optional[str]:
+        spans = self.section_spans.get(name)
+        if not spans:
+            return None
+        return "\n".join(self.raw_text[start:end] for start, end in spans)
+
+    @property
+    def sections(self) -> Dict[str, str]:
+        return {name: self.section(name) for name in self.section_spans}
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name in self.__slots__:
+            setattr(self, name, state.get(name))
+
+
+# (absolute path, content hash) -> JobArtifacts
+_artifacts = {}
+# absolute path -> ((mtime_ns, size), content hash), to skip re-hashing unchanged files
+_file_hashes = {}
+_lock = threading.Lock()
+
+
+def file_content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _current_hash(abs_path: str) -> str:
+    stat = os.stat(abs_path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    known = _file_hashes.get(abs_path)
+    if known is not None and known[0] == stamp:
+        return known[1]
+    content_hash = file_content_hash(abs_path)
+    _file_hashes[abs_path] = (stamp, content_hash)
+    return content_hash
+
+
+def _compute(abs_path: str, content_hash: str) -> JobArtifacts:
+    raw_text = extract_text_from_pdf(abs_path)
+    cleaned = clean_text(raw_text)
+    embedding = np.asarray(embedding_model.encode([cleaned])[0], dtype=np.float32) if cleaned else None
+    section_spans = extract_section_spans(raw_text, JD_SECTION_PATTERNS)
+    section_names, section_vectors = embed_sections(raw_text, section_spans, JD_SECTION_TARGETS)
+    return JobArtifacts(abs_path, content_hash, raw_text, cleaned, embedding, section_spans,
+                        section_names, section_vectors)
+
+
+def _disk_path(content_hash: str) -> str:
+    return os.path.join(JOB_CACHE_DIR, f"{content_hash}.pkl")
+
+
+def get_job_artifacts(path: str) -> JobArtifacts:
+    """
+    Return the parsed, cleaned and embedded job description at path.
+
+    Artifacts are keyed by file path plus content hash, so they are computed
+    once per version of a file (and shared with other workers through
+    JOB_CACHE_DIR) instead of on every request.
+    """
+    abs_path = os.path.abspath(path)
+    with _lock:
+        content_hash = _current_hash(abs_path)
+        key = (abs_path, content_hash)
+        artifacts = _artifacts.get(key)
+        if artifacts is not None:
+            return artifacts
+
+        artifacts = None
+        try:
+            with open(_disk_path(content_hash), "rb") as f:
+                artifacts = pickle.load(f)
+            artifacts.path = abs_path
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            pass
+
+        if artifacts is None:
+            artifacts = _compute(abs_path, content_hash)
+            if artifacts.cleaned_text:
+                try:
+                    os.makedirs(JOB_CACHE_DIR, exist_ok=True)
+                    tmp_path = f"{_disk_path(content_hash)}.{os.getpid()}.tmp"
+                    with open(tmp_path, "wb") as f:
+                        pickle.dump(artifacts, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    os.replace(tmp_path, _disk_path(content_hash))
+                except OSError as e:
+                    print(f"Error caching job description artifacts: {str(e)}")
+
+        # Drop artifacts of older versions of the same file
+        for stale in [k for k in _artifacts if k[0] == abs_path]:
+            del _artifacts[stale]
+        _artifacts[key] = artifacts
+        return artifacts
@@ -0,0 +1,92 @@
+import os
+import threading
+import faiss
+import numpy as np
+from typing import List
+from .job_cache import get_job_artifacts
+from .job_matrix import list_job_files
+from config import JOBS_DIR
+
+# --- Job-side vector index ---
+#
+# A small FAISS index over the cached embeddings of every job post in
+# JOBS_DIR, answering "which open roles fit this CV?" with one
+# nearest-neighbour query. Uploaded or generated job posts are added as they
+# are created; files added, changed or deleted by other workers are picked up
+# by comparing the directory listing on each query.
+
+
+class JobIndex:
+    def __init__(self, jobs_dir: str = JOBS_DIR):
+        self.jobs_dir = jobs_dir
+        self.index = None
+        self.jobs = []  # position in the index -> JobArtifacts
+        self._lock = threading.Lock()
+
+    def _add(self, job):
+        if job.embedding is None:
+            return
+        if self.index is None:
+            self.index = faiss.IndexFlatL2(job.embedding.shape[0])
+        self.index.add(job.embedding.reshape(1, -1))
+        self.jobs.append(job)
+
+    def _rebuild(self, jobs):
+        self.index, self.jobs = None, []
+        for job in jobs:
+            self._add(job)
+
+    def _sync(self):
+        current = {os.path.abspath(path): path for path in list_job_files(self.jobs_dir)}
+        indexed = {job.path: job for job in self.jobs}
+        stale = [job for job in self.jobs if job.path not in current or not os.path.exists(job.path)]
+        changed = [path for path in indexed if path in current and
+                   get_job_artifacts(current[path]).content_hash != indexed[path].content_hash]
+        if stale or changed:
+            # Flat indexes cannot drop single vectors; there are few jobs, so rebuild
+            self._rebuild([get_job_artifacts(current[path]) for path in current])
+        else:
+            for path in current:
+                if path not in indexed:
+                    self._add(get_job_artifacts(current[path]))
+
+    def add_job(self, path: str):
+        """Index a newly created job post (re-indexes everything if it replaced a file)"""
+        with self._lock:
+            job = get_job_artifacts(path)
+            previous = next((known for known in self.jobs if known.path == job.path), None)
+            if previous is None:
+                self._add(job)
+            elif previous.content_hash != job.content_hash:
+                self._rebuild([known for known in self.jobs if known.path != job.path] + [job])
+
+    def search(self, embedding, top_n: int = 5) -> List[dict]:
+        """Job posts closest to a CV embedding, best first"""
+        with self._lock:
+            self._sync()
+            if self.index is None or not self.jobs or top_n < 1:
+                return []
+            distances, indices = self.index.search(np.asarray(embedding, dtype=np.float32).reshape(1, -1),
+                                                   min(top_n, len(self.jobs)))
+            return [{
+                "path": self.jobs[idx].path,
+                "filename": os.path.basename(self.jobs[idx].path),
+                "similarity": float(1 / (1 + distance)),
+            } for distance, idx in zip(distances[0], indices[0]) if idx >= 0]
+
+
+_job_index = None
+_job_index_lock = threading.Lock()
+
+
+def get_job_index() -> JobIndex:
+    global _job_index
+    with _job_index_lock:
+        if _job_index is None:
+            _job_index = JobIndex()
+        return _job_index
+
+
+def matching_jobs(cv, top_n: int = 5) -> List[dict]:
+    """Best job posts for a CV record"""
+    return get_job_index().search(cv.embedding, top_n)
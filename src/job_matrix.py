@@ -0,0 +1,186 @@
+import os
+import pickle
+import threading
+import numpy as np
+from typing import Dict, List, Optional
+from .cv_record import RankedCV
+from .job_cache import get_job_artifacts
+from .snapshot import current_generation, generation_path
+from config import JOBS_DIR, JOB_TOP_K, SCORE_BLOCK_ROWS, FINAL_RANKING, SNAPSHOT_DIR
+
+# --- All CVs against all job posts in one pass ---
+#
+# Every job post in JOBS_DIR is embedded once (through the job cache) and
+# scored against every CV with one matmul per block of CV rows, keeping a
+# running top-k per job. The per-job lists are stored next to the snapshot
+# generation they were computed on (job_rankings.pkl), keyed by job content
+# hash, so switching the active job is a lookup.
+#
+# Scores are the same 1 / (1 + squared L2 distance) the FAISS first stage uses.
+
+JOB_RANKINGS_FILE = "job_rankings.pkl"
+
+
+def list_job_files(jobs_dir: str = JOBS_DIR) -> List[str]:
+    if not os.path.isdir(jobs_dir):
+        return []
+    return sorted(os.path.join(jobs_dir, name) for name in os.listdir(jobs_dir) if name.lower().endswith(".pdf"))
+
+
+def topk_per_job(cv_vectors: np.ndarray, job_vectors: np.ndarray, k: int,
+                 block_rows: int = SCORE_BLOCK_ROWS):
+    """
+    Best k CVs per job by squared L2 distance, streaming over blocks of CVs.
+
+    Args:
+        cv_vectors: (n_cvs, dim) CV embeddings
+        job_vectors: (n_jobs, dim) job embeddings
+        k: CVs kept per job
+        block_rows: CV rows scored per matmul
+
+    Returns:
+        (indices, distances), each (n_jobs, k') with k' = min(k, n_cvs), best first
+    """
+    job_vectors = np.asarray(job_vectors, dtype=np.float32)
+    job_norms = np.einsum("ij,ij->i", job_vectors, job_vectors)
+    n_jobs = len(job_vectors)
+    best_idx = np.empty((0, n_jobs), dtype=np.int64)
+    best_dist = np.empty((0, n_jobs), dtype=np.float32)
+
+    for start in range(0, len(cv_vectors), block_rows):
+        block = np.asarray(cv_vectors[start:start + block_rows], dtype=np.float32)
+        dist = np.einsum("ij,ij->i", block, block)[:, None] + job_norms[None, :] - 2 * block @ job_vectors.T
+        idx = np.broadcast_to(np.arange(start, start + len(block))[:, None], dist.shape)
+        # Merge the block with the running top-k of every job and keep the k closest
+        dist = np.vstack([best_dist, dist])
+        idx = np.vstack([best_idx, idx])
+        if len(dist) > k:
+            keep = np.argpartition(dist, k - 1, axis=0)[:k]
+            dist = np.take_along_axis(dist, keep, axis=0)
+            idx = np.take_along_axis(idx, keep, axis=0)
+        best_dist, best_idx = dist, idx
+
+    order = np.argsort(best_dist, axis=0, kind="stable")
+    best_dist = np.maximum(np.take_along_axis(best_dist, order, axis=0), 0)
+    best_idx = np.take_along_axis(best_idx, order, axis=0)
+    return best_idx.T, best_dist.T
+
+
+def compute_job_rankings(metadata, job_paths, k: int = JOB_TOP_K) -> Dict[str, dict]:
+    """Vector top-k of every job in job_paths, keyed by job content hash"""
+    jobs = [get_job_artifacts(path) for path in job_paths]
+    jobs = [job for job in jobs if job.embedding is not None]
+    if not jobs or not metadata:
+        return {}
+    cv_vectors = np.vstack([cv.embedding for cv in metadata])
+    indices, distances = topk_per_job(cv_vectors, np.vstack([job.embedding for job in jobs]), k)
+    return {
+        job.content_hash: {
+            "path": job.path,
+            "vector": [(metadata[i].filename, float(1 / (1 + d))) for i, d in zip(indices[j], distances[j])],
+            "refined": None,
+        }
+        for j, job in enumerate(jobs)
+    }
+
+
+# Rankings of the generation this process looked at last
+_store = {"generation": None, "rankings": {}}
+_store_lock = threading.Lock()
+
+
+def _store_path(generation: int, snapshot_dir: str) -> str:
+    return os.path.join(generation_path(generation, snapshot_dir), JOB_RANKINGS_FILE)
+
+
+def _load_store(generation: Optional[int], snapshot_dir: str) -> dict:
+    if _store["generation"] == generation and generation is not None:
+        return _store["rankings"]
+    rankings = {}
+    if generation is not None:
+        try:
+            with open(_store_path(generation, snapshot_dir), "rb") as f:
+                rankings = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+    _store.update(generation=generation, rankings=rankings)
+    return rankings
+
+
+def _save_store(generation: Optional[int], snapshot_dir: str):
+    if generation is None or not os.path.isdir(generation_path(generation, snapshot_dir)):
+        return
+    path = _store_path(generation, snapshot_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(_store["rankings"], f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error saving job rankings: {str(e)}")
+
+
+def _as_ranked(metadata, entries) -> List[RankedCV]:
+    by_filename = {cv.filename: cv for cv in metadata}
+    return [RankedCV(by_filename[filename], similarity) for filename, similarity in entries
+            if filename in by_filename]
+
+
+def get_job_ranking(metadata, job_path: str, generation: Optional[int] = None,
+                    snapshot_dir: str = SNAPSHOT_DIR, limit: int = FINAL_RANKING) -> List[RankedCV]:
+    """
+    Ranking for a job from the batch store: the last refined (LLM) ranking
+    computed for it on this generation, else its vector top-k.
+
+    Jobs not scored yet are scored together with every other unscored job in
+    JOBS_DIR in one pass. The store lock is not held while they are parsed and
+    embedded, only while the results are merged in.
+    """
+    if not metadata:
+        return []
+    if generation is None:
+        generation = current_generation(snapshot_dir)
+    content_hash = get_job_artifacts(job_path).content_hash
+    with _store_lock:
+        rankings = _load_store(generation, snapshot_dir)
+        entry = rankings.get(content_hash)
+        known = {entry["path"] for entry in rankings.values()}
+    if entry is None:
+        paths = [path for path in list_job_files() if os.path.abspath(path) not in known]
+        if os.path.abspath(job_path) not in {os.path.abspath(path) for path in paths}:
+            paths.append(job_path)
+        computed = compute_job_rankings(metadata, paths)
+        with _store_lock:
+            rankings = _load_store(generation, snapshot_dir)
+            # Refined rankings saved meanwhile are kept; they may lack the vector top-k
+            for job_hash, scored in computed.items():
+                existing = rankings.setdefault(job_hash, scored)
+                if not existing["vector"]:
+                    existing["vector"] = scored["vector"]
+            _save_store(generation, snapshot_dir)
+            entry = rankings.get(content_hash)
+    if entry is None:
+        return []
+    return _as_ranked(metadata, entry["refined"] or entry["vector"][:limit])
+
+
+def has_refined_ranking(job_path: str, generation: Optional[int] = None, snapshot_dir: str = SNAPSHOT_DIR) -> bool:
+    if generation is None:
+        generation = current_generation(snapshot_dir)
+    content_hash = get_job_artifacts(job_path).content_hash
+    with _store_lock:
+        entry = _load_store(generation, snapshot_dir).get(content_hash)
+    return bool(entry and entry["refined"])
+
+
+def save_refined_ranking(job_path: str, ranked_cvs, generation: Optional[int] = None,
+                         snapshot_dir: str = SNAPSHOT_DIR):
+    """Remember an LLM-refined ranking so switching back to this job is a lookup too"""
+    if generation is None:
+        generation = current_generation(snapshot_dir)
+    job = get_job_artifacts(job_path)
+    with _store_lock:
+        rankings = _load_store(generation, snapshot_dir)
+        entry = rankings.setdefault(job.content_hash, {"path": job.path, "vector": [], "refined": None})
+        entry["refined"] = [(cv.filename, float(cv.similarity)) for cv in ranked_cvs]
+        _save_store(generation, snapshot_dir)
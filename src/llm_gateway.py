@@ -0,0 +1,218 @@
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+import httpx
+from langchain_openai import AzureChatOpenAI
+from .prompt_context import count_tokens
+from config import (AZURE_CONFIG, DEPLOYMENT_NAME, LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE,
+                    LLM_TOKENS_PER_MINUTE, LLM_MAX_RETRIES, LLM_RETRY_BASE_SECONDS, LLM_RETRY_MAX_SECONDS,
+                    LLM_TIMEOUT_SECONDS, LLM_MAX_CONNECTIONS)
+
+# --- Shared LLM gateway ---
+#
+# Every Azure chat call in the app goes through here:
+#
+#   - one long-lived AzureChatOpenAI per (deployment, temperature), sharing
+#     pooled keep-alive HTTP connections instead of a new client per call
+#   - a process-wide concurrency cap and token-bucket limits on requests and
+#     (estimated) prompt tokens per minute
+#   - retries with jittered exponential backoff on 429, 5xx and connection
+#     errors, honouring Retry-After
+#   - per-purpose latency, error and token metrics
+#
+# invoke() and ainvoke() behave the same; the async path waits on a worker
+# thread without blocking its event loop.
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+LATENCY_WINDOW = 500  # Latest calls kept per purpose for percentiles
+
+
+class TokenBucket:
+    """Thread-safe token bucket; reserve() returns how long to wait before proceeding"""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Requests bigger than the bucket would otherwise wait forever
+            self.tokens -= min(amount, self.capacity)
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+_http_client = None
+
+_semaphore = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+_request_bucket = TokenBucket(LLM_REQUESTS_PER_MINUTE) if LLM_REQUESTS_PER_MINUTE else None
+_token_bucket = TokenBucket(LLM_TOKENS_PER_MINUTE) if LLM_TOKENS_PER_MINUTE else None
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def get_chat_model(temperature: float = 0.3, deployment: str = DEPLOYMENT_NAME) -> AzureChatOpenAI:
+    """The shared client for a deployment and temperature (retries are done by the gateway)"""
+    global _http_client
+    with _clients_lock:
+        model = _clients.get((deployment, temperature))
+        if model is None:
+            if _http_client is None:
+                _http_client = httpx.Client(limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS,
+                                                                max_keepalive_connections=LLM_MAX_CONNECTIONS),
+                                            timeout=LLM_TIMEOUT_SECONDS)
+            model = _clients[(deployment, temperature)] = AzureChatOpenAI(
+                azure_endpoint=AZURE_CONFIG["azure_endpoint"],
+                api_key=AZURE_CONFIG["api_key"],
+                api_version=AZURE_CONFIG["api_version"],
+                deployment_name=deployment,
+                temperature=temperature,
+                max_retries=0,
+                timeout=LLM_TIMEOUT_SECONDS,
+                http_client=_http_client
+            )
+        return model
+
+
+def estimate_tokens(prompt) -> int:
+    """Prompt size in tokens for rate limiting (string or message list)"""
+    if isinstance(prompt, str):
+        return count_tokens(prompt) + 1
+    return sum(count_tokens(str(m.get("content", "")) if isinstance(m, dict) else str(getattr(m, "content", m)))
+               for m in prompt) + 1
+
+
+def _admission_delay(prompt) -> float:
+    delay = 0.0
+    if _request_bucket is not None:
+        delay = max(delay, _request_bucket.reserve(1))
+    if _token_bucket is not None:
+        delay = max(delay, _token_bucket.reserve(estimate_tokens(prompt)))
+    return delay
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None and getattr(error, "response", None) is not None:
+        status = getattr(error.response, "status_code", None)
+    return status
+
+
+def _is_retryable(error) -> bool:
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # Connection resets and timeouts carry no status code
+    return isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError)) or \
+        type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def _retry_delay(error, attempt: int) -> float:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        retry_after = float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        retry_after = None
+    # Full jitter keeps retrying workers from hitting the service in lockstep
+    delay = random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+    return max(delay, retry_after) if retry_after is not None else delay
+
+
+def _record(purpose: str, deployment: str, elapsed: float, response=None, error=None, retries: int = 0):
+    usage = getattr(response, "usage_metadata", None) or {}
+    if not usage:
+        token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+        usage = {"input_tokens": token_usage.get("prompt_tokens", 0),
+                 "output_tokens": token_usage.get("completion_tokens", 0)}
+    with _metrics_lock:
+        entry = _metrics.get((purpose, deployment))
+        if entry is None:
+            entry = _metrics[(purpose, deployment)] = {
+                "calls": 0, "errors": 0, "retries": 0, "input_tokens": 0, "output_tokens": 0,
+                "latencies": deque(maxlen=LATENCY_WINDOW),
+            }
+        entry["calls"] += 1
+        entry["retries"] += retries
+        if error is not None:
+            entry["errors"] += 1
+        else:
+            entry["latencies"].append(elapsed)
+            entry["input_tokens"] += usage.get("input_tokens", 0) or 0
+            entry["output_tokens"] += usage.get("output_tokens", 0) or 0
+
+
+def get_metrics() -> dict:
+    """Per purpose/deployment call counts, token totals and latency percentiles (ms)"""
+    report = {}
+    with _metrics_lock:
+        for (purpose, deployment), entry in _metrics.items():
+            latencies = sorted(entry["latencies"])
+
+            def percentile(p):
+                return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else None
+
+            report[f"{purpose}/{deployment}"] = {
+                "calls": entry["calls"], "errors": entry["errors"], "retries": entry["retries"],
+                "input_tokens": entry["input_tokens"], "output_tokens": entry["output_tokens"],
+                "p50_ms": percentile(0.5), "p95_ms": percentile(0.95),
+            }
+    return report
+
+
+def invoke(prompt, temperature: float = 0.3, deployment: str = DEPLOYMENT_NAME, purpose: str = "default"):
+    """Call the LLM (prompt string or message list) under the gateway's limits and retries"""
+    model = get_chat_model(temperature, deployment)
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        time.sleep(_admission_delay(prompt))
+        with _semaphore:
+            try:
+                response = model.invoke(prompt)
+                _record(purpose, deployment, time.monotonic() - started, response, retries=attempt)
+                return response
+            except Exception as e:
+                error = e
+        if attempt >= LLM_MAX_RETRIES or not _is_retryable(error):
+            _record(purpose, deployment, time.monotonic() - started, error=error, retries=attempt)
+            raise error
+        time.sleep(_retry_delay(error, attempt))
+        attempt += 1
+
+
+async def ainvoke(prompt, temperature: float = 0.3, deployment: str = DEPLOYMENT_NAME,
+                  purpose: str = "default"):
+    """Async invoke(); runs on a worker thread so the caller's event loop is never blocked"""
+    # Ranking fans out on short-lived event loops (see rank_windows.run_sync), and an
+    # async connection pool cannot outlive its loop, so every loop shares the sync pool
+    return await asyncio.to_thread(invoke, prompt, temperature, deployment, purpose)
+
+
+class GatewayLLM:
+    """invoke/ainvoke bound to one deployment, temperature and metrics purpose"""
+
+    def __init__(self, temperature: float = 0.3, deployment: str = DEPLOYMENT_NAME, purpose: str = "default"):
+        self.temperature = temperature
+        self.deployment = deployment
+        self.purpose = purpose
+
+    def invoke(self, prompt):
+        return invoke(prompt, self.temperature, self.deployment, self.purpose)
+
+    async def ainvoke(self, prompt):
+        return await ainvoke(prompt, self.temperature, self.deployment, self.purpose)
+
+
+def get_llm(temperature: float = 0.3, deployment: str = DEPLOYMENT_NAME, purpose: str = "default") -> GatewayLLM:
+    return GatewayLLM(temperature, deployment, purpose)
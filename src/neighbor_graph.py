@@ -0,0 +1,151 @@
+import operator
+import threading
+import numpy as np
+from typing import List
+from .cv_record import RankedCV
+from config import NEIGHBOR_GRAPH_K, NEIGHBOR_BLOCK_ELEMENTS
+
+# --- "Similar candidates" neighbour graph ---
+#
+# Every CV's NEIGHBOR_GRAPH_K nearest CVs (cosine similarity of the document
+# embeddings) are precomputed, so "more like this one" is a lookup of an
+# adjacency list. The graph is built with blocked matrix products and kept in
+# step with the corpus incrementally: an added CV is one product against the
+# corpus, and a removed one only re-searches the CVs that listed it.
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def _top_k(sims: np.ndarray, k: int):
+    """(indices, scores) of the k best columns of each row of sims, best first, -1 / -inf padded"""
+    n_rows, n_cols = sims.shape
+    width = min(k, n_cols)
+    if width == 0:
+        return np.full((n_rows, k), -1, dtype=np.int32), np.full((n_rows, k), -np.inf, dtype=np.float32)
+    idx = np.argpartition(-sims, width - 1, axis=1)[:, :width] if width < n_cols else \
+        np.tile(np.arange(n_cols), (n_rows, 1))
+    part = np.take_along_axis(sims, idx, axis=1)
+    order = np.argsort(-part, axis=1, kind="stable")
+    idx, part = np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
+    idx = np.where(np.isfinite(part), idx, -1)
+    pad = k - width
+    return (np.pad(idx, ((0, 0), (0, pad)), constant_values=-1).astype(np.int32),
+            np.pad(part, ((0, 0), (0, pad)), constant_values=-np.inf).astype(np.float32))
+
+
+class NeighborGraph:
+    """Adjacency lists of each CV's k most similar CVs"""
+
+    __slots__ = ("k", "records", "rows", "vectors", "neighbors", "scores")
+
+    def __init__(self, metadata, k: int = NEIGHBOR_GRAPH_K):
+        self.k = k
+        self.records = list(metadata)
+        self.rows = {cv.filename: row for row, cv in enumerate(self.records)}
+        self.vectors = _normalize(np.vstack([cv.embedding for cv in self.records])) \
+            if self.records else np.empty((0, 0), dtype=np.float32)
+        self.neighbors, self.scores = self._search(np.arange(len(self.records)))
+
+    def _search(self, rows: np.ndarray):
+        """Neighbour lists of the given rows against the whole graph, in blocks of bounded size"""
+        n = len(self.records)
+        neighbors = np.full((len(rows), self.k), -1, dtype=np.int32)
+        scores = np.full((len(rows), self.k), -np.inf, dtype=np.float32)
+        block = max(1, NEIGHBOR_BLOCK_ELEMENTS // max(n, 1))
+        for start in range(0, len(rows), block):
+            batch = rows[start:start + block]
+            sims = self.vectors[batch] @ self.vectors.T
+            sims[np.arange(len(batch)), batch] = -np.inf  # a CV is not its own neighbour
+            neighbors[start:start + block], scores[start:start + block] = _top_k(sims, self.k)
+        return neighbors, scores
+
+    def matches(self, metadata) -> bool:
+        # C-level identity compare: this runs on every query
+        return len(metadata) == len(self.records) and all(map(operator.is_, metadata, self.records))
+
+    def add(self, record):
+        """Add one CV: its own list, plus a place in the lists it now belongs to"""
+        vector = _normalize(np.asarray(record.embedding).reshape(1, -1))
+        sims = self.vectors @ vector[0] if len(self.records) else np.empty(0, dtype=np.float32)
+        new_row = len(self.records)
+
+        # Existing CVs whose weakest neighbour is less similar than the new CV
+        better = np.flatnonzero(sims > self.scores[:, -1])
+        if len(better):
+            merged_idx = np.hstack([self.neighbors[better], np.full((len(better), 1), new_row, dtype=np.int32)])
+            merged = np.hstack([self.scores[better], sims[better, None].astype(np.float32)])
+            order = np.argsort(-merged, axis=1, kind="stable")[:, :self.k]
+            self.neighbors[better] = np.take_along_axis(merged_idx, order, axis=1)
+            self.scores[better] = np.take_along_axis(merged, order, axis=1)
+
+        neighbors, scores = _top_k(sims.reshape(1, -1), self.k)
+        self.records.append(record)
+        self.rows[record.filename] = new_row
+        self.vectors = np.vstack([self.vectors, vector]) if new_row else vector
+        self.neighbors = np.vstack([self.neighbors, neighbors])
+        self.scores = np.vstack([self.scores, scores])
+
+    def remove(self, filename: str):
+        """Drop one CV and re-search only the CVs that had it as a neighbour"""
+        row = self.rows.get(filename)
+        if row is None:
+            return
+        affected = np.flatnonzero((self.neighbors == row).any(axis=1))
+        keep = np.arange(len(self.records)) != row
+        self.records.pop(row)
+        self.rows = {cv.filename: i for i, cv in enumerate(self.records)}
+        self.vectors = self.vectors[keep]
+        self.neighbors = self.neighbors[keep]
+        self.scores = self.scores[keep]
+        # Rows after the removed one move up by one
+        self.neighbors = np.where(self.neighbors > row, self.neighbors - 1, self.neighbors)
+        affected = affected[affected != row]
+        affected = np.where(affected > row, affected - 1, affected)
+        if len(affected):
+            self.neighbors[affected], self.scores[affected] = self._search(affected)
+
+    def similar(self, filename: str, top_n: int = 5) -> List[RankedCV]:
+        """
+        The top_n CVs most similar to filename, most similar first (similarity = cosine).
+        
+        Raises ValueError unless 1 <= top_n <= k (only k neighbours are kept).
+        """
+        if not 1 <= top_n <= self.k:
+            raise ValueError(f"top_n must be between 1 and {self.k}")
+        row = self.rows.get(filename)
+        if row is None:
+            return []
+        return [RankedCV(self.records[neighbor], float(score))
+                for neighbor, score in zip(self.neighbors[row, :top_n], self.scores[row, :top_n])
+                if neighbor >= 0]
+
+
+_graph = None
+_lock = threading.Lock()
+
+
+def get_neighbor_graph(metadata) -> NeighborGraph:
+    """The neighbour graph of metadata, updated incrementally for the CVs added or removed since last time"""
+    global _graph
+    with _lock:
+        if _graph is not None and _graph.matches(metadata):
+            return _graph
+        if _graph is None:
+            _graph = NeighborGraph(metadata)
+            return _graph
+        current = {id(cv) for cv in metadata}
+        known = {id(cv) for cv in _graph.records}
+        removed = [cv.filename for cv in _graph.records if id(cv) not in current]
+        added = [cv for cv in metadata if id(cv) not in known]
+        # Past a quarter of the corpus, one batch build is cheaper than the updates
+        if len(removed) + len(added) > max(16, len(metadata) // 4):
+            _graph = NeighborGraph(metadata)
+            return _graph
+        for filename in removed:
+            _graph.remove(filename)
+        for record in added:
+            _graph.add(record)
+        return _graph
@@ -0,0 +1,148 @@
+import re
+import threading
+import contextvars
+from contextlib import contextmanager
+import numpy as np
+from .skills import record_skills
+from config import PROMPT_TOKEN_ENCODING, CANDIDATE_TOKEN_BUDGET
+
+# --- Token-budgeted prompt context ---
+#
+# Instead of fixed character cuts of a CV's sections, each candidate is shown
+# to the LLM through its chunks most similar to the job vector, packed into a
+# per-candidate token budget (and printed in document order). Tokens are
+# counted with tiktoken when it is installed, otherwise approximated by
+# splitting into words and punctuation.
+#
+# Prompts built inside prompt_meter() are counted, so a ranking can report
+# how many prompt tokens it sent.
+
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def get_encoding():
+    """The tiktoken encoding, or None when tiktoken (or its encoding files) is unavailable"""
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(PROMPT_TOKEN_ENCODING)
+            except Exception as e:
+                print(f"tiktoken unavailable, approximating token counts: {str(e)}")
+                _encoding = False
+        return _encoding or None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(_WORD_PATTERN.findall(text))
+
+
+def truncate_tokens(text: str, budget: int) -> str:
+    """The longest prefix of text within budget tokens"""
+    if budget <= 0 or not text:
+        return ""
+    encoding = get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= budget else encoding.decode(tokens[:budget])
+    for i, match in enumerate(_WORD_PATTERN.finditer(text)):
+        if i == budget:
+            return text[:match.start()].rstrip()
+    return text
+
+
+def relevant_chunk_order(cv, jd_embedding=None):
+    """Indices of the CV's chunks, most similar to the job vector first (document order without one)"""
+    if not cv.chunks:
+        return []
+    if jd_embedding is None or len(cv.chunk_vectors) != len(cv.chunks):
+        return list(range(len(cv.chunks)))
+    vectors = np.asarray(cv.chunk_vectors, dtype=np.float32)
+    sims = vectors @ np.asarray(jd_embedding, dtype=np.float32) / np.maximum(np.linalg.norm(vectors, axis=1), 1e-12)
+    return [int(i) for i in np.argsort(-sims, kind="stable")]
+
+
+def _without_overlap(previous: str, chunk: str) -> str:
+    """chunk minus the text it repeats from the end of the chunk before it"""
+    probe = chunk[:50]
+    start = previous.find(probe, max(0, len(previous) - len(chunk)))
+    while start != -1:
+        if chunk.startswith(previous[start:]):
+            return chunk[len(previous) - start:].lstrip()
+        start = previous.find(probe, start + 1)
+    return chunk
+
+
+def candidate_context(cv, jd_embedding=None, budget: int = CANDIDATE_TOKEN_BUDGET) -> str:
+    """
+    The CV text shown to the LLM: its known skills, then its most job-relevant
+    chunks that fit in budget tokens.
+
+    A chunk that does not fit is skipped in favour of smaller, less relevant
+    ones; if not even the best chunk fits, it is cut to the budget. Text that
+    neighbouring chunks share (the chunking overlap) is shown once.
+    """
+    parts = []
+    skills = record_skills(getattr(cv, "record", cv))
+    if skills:
+        parts.append(f"Skills: {', '.join(skills)}")
+    used = sum(count_tokens(part) for part in parts)
+
+    picked = []
+    for idx in relevant_chunk_order(cv, jd_embedding):
+        tokens = count_tokens(cv.chunks[idx])
+        if used + tokens <= budget:
+            picked.append((idx, cv.chunks[idx]))
+            used += tokens
+        elif not picked:
+            picked.append((idx, truncate_tokens(cv.chunks[idx], budget - used)))
+            used = budget
+        if used >= budget:
+            break
+    if picked:
+        text, last = "", None
+        for idx, chunk in sorted(picked):
+            if last is not None and idx == last + 1:
+                text += " " + _without_overlap(cv.chunks[last], chunk)
+            else:
+                text += ("\n...\n" if text else "") + chunk
+            last = idx
+        parts.append(text)
+    else:
+        parts.append(truncate_tokens(cv.cleaned_text, budget - used))
+    return "\n".join(part for part in parts if part)
+
+
+_prompt_meter = contextvars.ContextVar("prompt_meter", default=None)
+_meter_lock = threading.Lock()
+
+
+@contextmanager
+def prompt_meter():
+    """Count the prompts (and their tokens) recorded with count_prompt inside this block"""
+    meter = {"prompts": 0, "prompt_tokens": 0}
+    token = _prompt_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _prompt_meter.reset(token)
+
+
+def count_prompt(prompt: str) -> str:
+    """Record a prompt on the active meter (if any) and return it unchanged"""
+    meter = _prompt_meter.get()
+    if meter is not None:
+        tokens = count_tokens(prompt)
+        with _meter_lock:
+            meter["prompts"] += 1
+            meter["prompt_tokens"] += tokens
+    return prompt
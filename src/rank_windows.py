@@ -0,0 +1,81 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+# --- Sliding-window re-ranking helpers ---
+#
+# A large candidate pool is split into overlapping windows of consecutive
+# first-stage ranks. Each window is ordered by the LLM independently (so the
+# calls can run concurrently) and the partial orderings are merged back:
+# a candidate placed at position p of a window starting at rank s is
+# estimated at global rank s + p, averaged over every window it appears in.
+# Overlaps let strong candidates climb across window borders; because the
+# windows run in parallel rather than one after another, a candidate can
+# move at most about one window size away from its first-stage rank.
+
+
+def make_windows(n: int, size: int, step: int) -> List[Tuple[int, int]]:
+    """(start, end) ranges of overlapping windows covering range(n)"""
+    if n <= size:
+        return [(0, n)] if n else []
+    windows = []
+    start = 0
+    while start + size < n:
+        windows.append((start, start + size))
+        start += step
+    windows.append((n - size, n))
+    return windows
+
+
+def merge_window_orderings(n: int, windows: Sequence[Tuple[int, int]],
+                           orderings: Sequence[Optional[List[int]]]) -> List[int]:
+    """
+    Merge per-window orderings into one global order of range(n).
+
+    Args:
+        n: Pool size
+        windows: (start, end) ranges from make_windows
+        orderings: Per window, pool indices best first (may omit members), or
+                   None when the window could not be ranked
+
+    Returns:
+        Pool indices, best first
+    """
+    totals = [0.0] * n
+    counts = [0] * n
+    for (start, end), ordering in zip(windows, orderings):
+        members = list(range(start, end))
+        if ordering:
+            # Members the LLM left out keep their first-stage order after the placed ones
+            placed = [i for i in dict.fromkeys(ordering) if start <= i < end]
+            placed_set = set(placed)
+            members = placed + [i for i in members if i not in placed_set]
+        for position, i in enumerate(members):
+            totals[i] += start + position
+            counts[i] += 1
+    estimates = [totals[i] / counts[i] if counts[i] else i for i in range(n)]
+    # Ties go to the better first-stage rank
+    return sorted(range(n), key=lambda i: (estimates[i], i))
+
+
+async def gather_limited(coroutines, concurrency: int, return_exceptions: bool = True):
+    """asyncio.gather with at most concurrency coroutines in flight"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def limited(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(limited(c) for c in coroutines), return_exceptions=return_exceptions)
+
+
+def run_sync(coroutine):
+    """Run a coroutine to completion from synchronous code, even inside a running event loop"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # Carry the caller's context (e.g. an active prompt meter) over to the helper thread
+        return pool.submit(contextvars.copy_context().run, asyncio.run, coroutine).result()
@@ -1,9 +1,28 @@
 import re
+import json
+import time
 import faiss
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 import numpy as np
-from .text_processing import extract_text_from_pdf, clean_text
-from config import embedding_model, INITIAL_CANDIDATES, FINAL_RANKING, AZURE_CONFIG, DEPLOYMENT_NAME
-from langchain_openai import AzureChatOpenAI
+from .cv_record import RankedCV
+from .job_cache import get_job_artifacts
+from .diversity import mmr_order
+from .chunk_scoring import CHUNK_SCORERS, get_chunk_matrix, chunk_scores, record_chunk_score, top_k_indices
+from .section_scoring import get_section_matrix, section_scores, record_section_score
+from .bm25_index import get_bm25_index
+from .skills import must_have_mask, has_skills, boost_nice_to_have
+from .rank_windows import make_windows, merge_window_orderings, gather_limited, run_sync
+from .score_cache import get_score_cache, text_hash
+from .cross_encoder import cross_encoder_scores
+from .llm_gateway import get_llm
+from .prompt_context import candidate_context, truncate_tokens, count_prompt, prompt_meter, get_encoding
+from config import (INITIAL_CANDIDATES, FINAL_RANKING, LLM_POOL_SIZE, RERANK_WINDOW_RADIUS, RANKING_SCORER,
+                    HYBRID_RETRIEVAL, RRF_K, HYBRID_BM25_WEIGHT, RERANK_MODE, WINDOW_POOL_SIZE,
+                    RERANK_WINDOW_SIZE, RERANK_WINDOW_STEP, LLM_CONCURRENCY, POINTWISE_POOL_SIZE,
+                    POINTWISE_BATCH_SIZE, RERANKER, RERANK_LATENCY_BUDGET_MS, RERANK_FAILURE_PENALTY_MS,
+                    CROSS_ENCODER_POOL_SIZE, DEPLOYMENT_NAME, PROMPT_CONTEXT, JD_TOKEN_BUDGET, RANKING_DEADLINE_MS,
+                    MMR_LAMBDA, CANDIDATE_TOKEN_BUDGET, PROMPT_TOKEN_ENCODING,
+                    LLM_POOL_SIZING, LLM_POOL_MIN, LLM_POOL_GAP_FACTOR, LLM_POOL_SCORE_RATIO)
 
 def truncate_text(text, max_length=1000):
     return text[:max_length] + '...' if len(text) > max_length else text
@@ -16,76 +35,385 @@ def parse_llm_response(response, max_candidates):
     except:
         return []
 
-def rank_cvs(job_description_path, faiss_index, metadata, top_n=50):
-    raw_jd = extract_text_from_pdf(job_description_path)
-    cleaned_jd = clean_text(raw_jd)
-    if not cleaned_jd:
-        raise ValueError("Invalid job description")
+def dense_candidates(job, faiss_index, metadata, scorer=RANKING_SCORER, limit=INITIAL_CANDIDATES, allowed=None):
+    """
+    Candidates (best first) as RankedCV views, scored by the selected vector scorer.
+    
+    allowed is an optional (n_cvs,) bool mask (e.g. from a must-have skill
+    filter); CVs outside it are never returned.
+    """
+    if allowed is not None:
+        limit = min(limit, int(allowed.sum()))
+        if limit == 0:
+            return []
+    if scorer in CHUNK_SCORERS or scorer == "sections":
+        if scorer == "sections":
+            # Job description sections against matching CV sections, weighted, in one pass over the corpus
+            matrix = get_section_matrix(metadata)
+            scores = section_scores(job, matrix)
+        else:
+            # Best-matching chunks of every CV, scored in one matmul over the whole corpus
+            matrix = get_chunk_matrix(metadata)
+            scores = chunk_scores(job.embedding, matrix, scorer)
+        if allowed is not None:
+            scores = np.where(allowed, scores, -np.inf)
+        return [RankedCV(matrix.records[idx], float(scores[idx])) for idx in top_k_indices(scores, limit)]
+    if scorer != "faiss":
+        raise ValueError(f"Unknown scorer: {scorer}")
 
-    # First, get initial candidates using the full document embedding for efficiency
-    jd_embedding = embedding_model.encode([cleaned_jd])[0]
-    distances, indices = faiss_index.search(np.array([jd_embedding]), INITIAL_CANDIDATES)
+    # Full document embedding search, restricted to the allowed rows inside FAISS
+    params = None
+    if allowed is not None:
+        params = faiss.SearchParameters(sel=faiss.IDSelectorBitmap(np.packbits(allowed, bitorder="little")))
+    distances, indices = faiss_index.search(job.embedding.reshape(1, -1), limit, params=params)
 
-    # Create initial candidate list with basic similarity scores
+    # Create initial candidate list with basic similarity scores (records are shared, not copied)
     initial_candidates = []
     for i, idx in enumerate(indices[0]):
         if 0 <= idx < len(metadata):
-            initial_candidates.append({
-                **metadata[idx],
-                "similarity": 1 / (1 + distances[0][i])
-            })
+            initial_candidates.append(RankedCV(metadata[idx], 1 / (1 + distances[0][i])))
+    return initial_candidates
+
+def fuse_rankings(dense, lexical, mode=HYBRID_RETRIEVAL):
+    """
+    Combine a dense and a BM25 ranking into one order.
+    
+    Args:
+        dense: RankedCV list, best first
+        lexical: (filename, BM25 score) list, best first
+        mode: "rrf" (reciprocal rank fusion) or "weighted" (min-max normalised score blend)
+    
+    Returns:
+        Filenames ordered by fused score, best first
+    """
+    fused = {}
+    if mode == "rrf":
+        for rank, cv in enumerate(dense):
+            fused[cv.filename] = fused.get(cv.filename, 0) + 1 / (RRF_K + rank + 1)
+        for rank, (filename, _) in enumerate(lexical):
+            fused[filename] = fused.get(filename, 0) + 1 / (RRF_K + rank + 1)
+    elif mode == "weighted":
+        def normalized(pairs):
+            if not pairs:
+                return []
+            scores = [score for _, score in pairs]
+            low, high = min(scores), max(scores)
+            return [(name, (score - low) / (high - low) if high > low else 1.0) for name, score in pairs]
+        for filename, score in normalized([(cv.filename, cv.similarity) for cv in dense]):
+            fused[filename] = fused.get(filename, 0) + (1 - HYBRID_BM25_WEIGHT) * score
+        for filename, score in normalized(lexical):
+            fused[filename] = fused.get(filename, 0) + HYBRID_BM25_WEIGHT * score
+    else:
+        raise ValueError(f"Unknown fusion mode: {mode}")
+    return sorted(fused, key=fused.get, reverse=True)
+
+def retrieve_candidates(job, faiss_index, metadata, scorer=RANKING_SCORER, limit=INITIAL_CANDIDATES,
+                        hybrid=HYBRID_RETRIEVAL, must_have=(), nice_to_have=()):
+    """
+    First-stage candidates (best first) as RankedCV views.
+    
+    With hybrid retrieval, dense hits are fused with BM25 hits over the cleaned
+    text, so CVs naming the job's exact terms are not lost to a small pool.
+    Candidates keep their dense similarity, so scores stay comparable with
+    job_similarity whichever way they were found.
+    
+    CVs missing any must_have skill are filtered out before either search;
+    nice_to_have skills move dense hits up before fusion (see skills.boost_nice_to_have).
+    """
+    allowed = must_have_mask(metadata, must_have) if metadata else None
+    dense = boost_nice_to_have(dense_candidates(job, faiss_index, metadata, scorer, limit, allowed),
+                               metadata, nice_to_have)
+    if hybrid == "off" or not metadata:
+        return dense
+    
+    lexical = get_bm25_index(metadata).search(job.cleaned_text, limit)
+    if allowed is not None:
+        permitted = {cv.filename for cv, ok in zip(metadata, allowed) if ok}
+        lexical = [(filename, score) for filename, score in lexical if filename in permitted]
+    by_filename = {cv.filename: cv for cv in dense}
+    records = {cv.filename: cv for cv in metadata} if lexical else {}
+    candidates = []
+    for filename in fuse_rankings(dense, lexical, hybrid)[:limit]:
+        candidate = by_filename.get(filename)
+        if candidate is None:
+            record = records[filename]
+            candidate = RankedCV(record, job_similarity(record, job, scorer))
+        candidates.append(candidate)
+    return candidates
+
+def first_stage(job_description_path, faiss_index, metadata, scorer=RANKING_SCORER, must_have=(), nice_to_have=(),
+                mmr_lambda=MMR_LAMBDA):
+    """The job's artifacts and its first-stage candidates"""
+    job = get_job_artifacts(job_description_path)
+    if not job.cleaned_text:
+        raise ValueError("Invalid job description")
+
+    # Get initial candidates cheaply (vector scorer fused with BM25, skill filters applied)
+    candidates = retrieve_candidates(job, faiss_index, metadata, scorer, must_have=must_have, nice_to_have=nice_to_have)
+    # Optionally spread near-identical CVs out, so they don't fill the re-ranker's pool
+    if mmr_lambda is not None:
+        candidates = mmr_order(candidates, mmr_lambda)
+    return job, candidates
+
+def rank_cvs(job_description_path, faiss_index, metadata, top_n=50, scorer=RANKING_SCORER,
+             rerank_mode=RERANK_MODE, reranker=RERANKER, latency_budget_ms=RERANK_LATENCY_BUDGET_MS,
+             stats=None, must_have=(), nice_to_have=(), mmr_lambda=MMR_LAMBDA):
+    started = time.monotonic()
+    job, initial_candidates = first_stage(job_description_path, faiss_index, metadata, scorer, must_have, nice_to_have,
+                                          mmr_lambda)
     
     if not initial_candidates:
         return []
     
-    # Now perform a more detailed analysis using chunks and LLM
+    # Then re-order the head of the list with the selected re-ranker
+    deadline = started + latency_budget_ms / 1000 if latency_budget_ms is not None else None
+    ranked = rerank(job, initial_candidates, reranker, deadline, stats, rerank_mode=rerank_mode)
+    return ranked[:FINAL_RANKING]
+
+# Re-rankings that outlive their request's deadline finish here
+_rerank_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rerank")
+
+def rank_cvs_progressive(job_description_path, faiss_index, metadata, deadline_ms=RANKING_DEADLINE_MS,
+                         scorer=RANKING_SCORER, rerank_mode=RERANK_MODE, reranker=RERANKER,
+                         latency_budget_ms=RERANK_LATENCY_BUDGET_MS, stats=None, must_have=(), nice_to_have=(),
+                         mmr_lambda=MMR_LAMBDA):
+    """
+    rank_cvs that answers within deadline_ms (None waits for the re-ranker).
+    
+    Returns (ranking, pending). When the re-ranker finishes in time, pending is
+    None. Otherwise ranking is the first-stage (vector) order, to be shown as
+    provisional, and pending is a Future that resolves to the re-ranked list
+    (stats, if given, is filled in when it does).
+    """
+    started = time.monotonic()
+    job, initial_candidates = first_stage(job_description_path, faiss_index, metadata, scorer, must_have, nice_to_have,
+                                          mmr_lambda)
+    if not initial_candidates:
+        return [], None
+    
+    deadline = started + latency_budget_ms / 1000 if latency_budget_ms is not None else None
+    pending = _rerank_executor.submit(
+        lambda: rerank(job, initial_candidates, reranker, deadline, stats, rerank_mode=rerank_mode)[:FINAL_RANKING])
+    timeout = None if deadline_ms is None else max(0.0, started + deadline_ms / 1000 - time.monotonic())
+    try:
+        return pending.result(timeout=timeout), None
+    except FutureTimeout:
+        return initial_candidates[:FINAL_RANKING], pending
+
+# --- Pluggable re-rankers ---
+#
+# A re-ranker is a function (job, candidates, deadline=None, **options) that
+# takes the first-stage candidates (best first) and returns them re-ordered,
+# best first. deadline is a time.monotonic() value it should try to finish by.
+
+POOL_SIZINGS = ("fixed", "gap", "elbow", "threshold")
+
+def adaptive_pool_size(candidates, max_size=LLM_POOL_SIZE, min_size=LLM_POOL_MIN, method=LLM_POOL_SIZING):
+    """
+    How many of the first-stage candidates to send to the LLM, judged from how
+    their scores fall off: when a few CVs clearly stand out, the rest are not
+    worth the prompt tokens.
+    
+    Args:
+        candidates: First-stage candidates, best first
+        max_size: Largest pool (what "fixed" always uses)
+        min_size: Smallest pool
+        method: "fixed", "gap", "elbow" or "threshold" (see LLM_POOL_SIZING)
+    
+    Returns:
+        The pool size, within [min_size, max_size] (and the number of candidates)
+    """
+    if method not in POOL_SIZINGS:
+        raise ValueError(f"Unknown pool sizing: {method}")
+    size = min(max_size, len(candidates))
+    if method == "fixed" or size <= min_size:
+        return size
+    # Scores in candidate order: hybrid fusion and MMR move candidates away from
+    # similarity order, and the cut is applied to the list as given
+    scores = np.array([cv.similarity for cv in candidates], dtype=np.float64)
+    
+    if method == "gap":
+        # The largest drop after one of candidates min_size..size, if it stands out
+        drops = -np.diff(scores[:min(size, len(scores) - 1) + 1])
+        if len(drops) < min_size:
+            return size
+        cut = min_size - 1 + int(np.argmax(drops[min_size - 1:]))
+        if drops[cut] > 0 and drops[cut] >= LLM_POOL_GAP_FACTOR * np.abs(drops).mean():
+            size = cut + 1
+    elif method == "elbow":
+        # Kneedle: the point of the normalised score curve furthest below its
+        # chord; a curve that stays within 0.1 of the chord has no knee
+        if scores[0] > scores[-1]:
+            normalised = (scores - scores[-1]) / (scores[0] - scores[-1])
+            below = np.linspace(1, 0, len(scores)) - normalised
+            if below.max() > 0.1:
+                size = int(np.argmax(below)) + 1
+    else:
+        # The leading run of candidates within the ratio of the best score
+        low = scores < scores.max() * LLM_POOL_SCORE_RATIO
+        size = int(np.argmax(low)) if low.any() else len(scores)
+    return max(min_size, min(size, max_size, len(candidates)))
+
+def llm_rerank(job, candidates, deadline=None, rerank_mode=RERANK_MODE, **options):
+    """Azure LLM re-ranking in the configured mode (single prompt, windows or pointwise)"""
+    max_size = {"windows": WINDOW_POOL_SIZE, "pointwise": POINTWISE_POOL_SIZE}.get(rerank_mode, LLM_POOL_SIZE)
+    size = adaptive_pool_size(candidates, max_size, method=LLM_POOL_SIZING)
+    print(f"LLM pool: {size} of {len(candidates)} candidates ({LLM_POOL_SIZING} sizing, at most {max_size})")
+    pool, rest = candidates[:size], candidates[size:]
+    
+    if rerank_mode == "windows":
+        # Larger pool, ordered by concurrent LLM calls over overlapping windows
+        ranked = llm_order_windows(job.raw_text, pool, jd_embedding=job.embedding)
+    elif rerank_mode == "pointwise":
+        # Absolute per-candidate scores, reused across rankings through the score cache
+        ranked = llm_order_pointwise(job, pool)
+    else:
+        # Use the LLM to rank the top candidates based on detailed analysis
+        ranked = llm_order_candidates(job.raw_text, pool, jd_embedding=job.embedding)
+    
+    # Fallback to initial ranking if LLM doesn't provide valid indices; anyone
+    # it left out keeps their first-stage order after the ones it placed
+    ranked = ranked or pool
+    placed = {cv.filename for cv in ranked}
+    return ranked + [cv for cv in pool if cv.filename not in placed] + rest
+
+def cross_encoder_rerank(job, candidates, deadline=None, **options):
+    """Local CPU cross-encoder over (job requirements, best chunks) pairs"""
+    pool = candidates[:CROSS_ENCODER_POOL_SIZE]
+    return order_by_scores(pool, cross_encoder_scores(job, pool, deadline))
+
+def no_rerank(job, candidates, deadline=None, **options):
+    """Keep the first-stage order"""
+    return candidates
+
+RERANKERS = {"llm": llm_rerank, "cross-encoder": cross_encoder_rerank, "none": no_rerank}
+# Most to least expensive: a re-ranker expected to overrun the budget hands over to the next one
+RERANKER_FALLBACKS = ("llm", "cross-encoder", "none")
+
+# Smoothed observed latency per re-ranker, in ms
+_observed_latency_ms = {}
+LATENCY_SMOOTHING = 0.3
+
+def register_reranker(name, reranker):
+    """Make a re-ranker selectable by name"""
+    RERANKERS[name] = reranker
+
+def reranker_chain(requested):
+    """requested followed by the cheaper re-rankers it can hand over to"""
+    if requested not in RERANKERS:
+        raise ValueError(f"Unknown re-ranker: {requested}")
+    if requested in RERANKER_FALLBACKS:
+        return RERANKER_FALLBACKS[RERANKER_FALLBACKS.index(requested):]
+    return (requested, "none")
+
+def observe_latency(name, elapsed_ms):
+    previous = _observed_latency_ms.get(name)
+    _observed_latency_ms[name] = elapsed_ms if previous is None else \
+        (1 - LATENCY_SMOOTHING) * previous + LATENCY_SMOOTHING * elapsed_ms
+
+def select_reranker(requested, budget_ms=None):
+    """The requested re-ranker, or the first cheaper one expected to fit the budget"""
+    chain = reranker_chain(requested)
+    if budget_ms is None:
+        return requested
+    for name in chain:
+        expected = _observed_latency_ms.get(name)
+        if expected is None or expected <= budget_ms:
+            return name
+    return "none"
+
+def rerank(job, candidates, reranker=RERANKER, deadline=None, stats=None, **options):
+    """
+    Re-order candidates with the named re-ranker within an optional deadline.
+    
+    A re-ranker that fails (e.g. no network for the LLM, no local model) hands
+    over to the next cheaper one, down to the first-stage order. stats, if
+    given, receives the re-ranker used, its latency and the prompt tokens it sent.
+    """
+    budget_ms = (deadline - time.monotonic()) * 1000 if deadline is not None else None
+    chain = reranker_chain(reranker)
+    chain = chain[chain.index(select_reranker(reranker, budget_ms)):]
+    with prompt_meter() as meter:
+        for name in chain:
+            started = time.monotonic()
+            try:
+                ranked = RERANKERS[name](job, candidates, deadline=deadline, **options)
+                break
+            except Exception as e:
+                print(f"Re-ranker {name} failed: {str(e)}")
+                # The time lost (retries included) plus a penalty, so budgets stop trying it first
+                observe_latency(name, (time.monotonic() - started) * 1000 + RERANK_FAILURE_PENALTY_MS)
+        else:
+            name, ranked = "none", candidates
+    elapsed_ms = (time.monotonic() - started) * 1000
+    
+    observe_latency(name, elapsed_ms)
+    if stats is not None:
+        stats.update({"reranker": name, "requested_reranker": reranker, "rerank_ms": elapsed_ms,
+                      "prompts": meter["prompts"], "prompt_tokens": meter["prompt_tokens"]})
+    return ranked
+
+def job_prompt_text(raw_jd):
+    """The job description as shown in ranking prompts"""
+    if PROMPT_CONTEXT == "relevant":
+        return truncate_tokens(raw_jd, JD_TOKEN_BUDGET)
+    return raw_jd[:2000]
+
+def build_candidate_profile(cv, number, jd_embedding=None):
+    """Prompt text describing one candidate, numbered for the LLM to refer to"""
+    if PROMPT_CONTEXT == "relevant":
+        # The CV's most job-relevant chunks, within a token budget
+        return profile_header(cv, number) + f"\nProfile:\n{candidate_context(cv, jd_embedding)}\n"
+    
+    # Extract the most relevant sections/chunks from the CV
+    relevant_sections = ""
+    
+    # Include education section if available
+    education = cv.section("education")
+    if education:
+        relevant_sections += f"Education:\n{truncate_text(education, 500)}\n\n"
+    
+    # Include experience section if available
+    experience = cv.section("experience")
+    if experience:
+        relevant_sections += f"Experience:\n{truncate_text(experience, 1000)}\n\n"
+    
+    # Include skills section if available
+    skills = cv.section("skills")
+    if skills:
+        relevant_sections += f"Skills:\n{truncate_text(skills, 500)}\n\n"
+    
+    # If no sections were found, use the most relevant chunks
+    if not relevant_sections and cv.chunks:
+        # Use the first 2-3 chunks as a fallback
+        for j, chunk in enumerate(cv.chunks[:3]):
+            relevant_sections += f"Chunk {j+1}:\n{truncate_text(chunk, 500)}\n\n"
+    
+    # If still no relevant content, use the cleaned text
+    if not relevant_sections:
+        relevant_sections = truncate_text(cv.cleaned_text, 2000)
+    
+    return profile_header(cv, number) + f"\nProfile:\n{relevant_sections}"
+
+def profile_header(cv, number):
+    candidate_info = f"[Candidate {number}]\nFile: {cv.filename}\n"
+    if cv.contact:
+        candidate_info += f"Contact: {cv.contact.get('email', 'N/A')} | {cv.contact.get('phone', 'N/A')}\n"
+    return candidate_info
+
+def build_ranking_prompt(raw_jd, candidates, limit=FINAL_RANKING, jd_embedding=None):
+    """Listwise prompt asking for the best candidates' numbers, best first"""
     # Prepare a more detailed prompt with relevant chunks from each candidate
-    detailed_candidate_info = []
-    
-    # Take top candidates from initial screening for detailed analysis
-    top_initial_candidates = initial_candidates[:min(20, len(initial_candidates))]
-    
-    for i, cv in enumerate(top_initial_candidates):
-        # Extract the most relevant sections/chunks from the CV
-        relevant_sections = ""
-        
-        # Include education section if available
-        if "sections" in cv and "education" in cv["sections"]:
-            relevant_sections += f"Education:\n{truncate_text(cv['sections']['education'], 500)}\n\n"
-        
-        # Include experience section if available
-        if "sections" in cv and "experience" in cv["sections"]:
-            relevant_sections += f"Experience:\n{truncate_text(cv['sections']['experience'], 1000)}\n\n"
-        
-        # Include skills section if available
-        if "sections" in cv and "skills" in cv["sections"]:
-            relevant_sections += f"Skills:\n{truncate_text(cv['sections']['skills'], 500)}\n\n"
-        
-        # If no sections were found, use the most relevant chunks
-        if not relevant_sections and "chunks" in cv and cv["chunks"]:
-            # Use the first 2-3 chunks as a fallback
-            for j, chunk in enumerate(cv["chunks"][:3]):
-                relevant_sections += f"Chunk {j+1}:\n{truncate_text(chunk, 500)}\n\n"
-        
-        # If still no relevant content, use the cleaned text
-        if not relevant_sections:
-            relevant_sections = truncate_text(cv["cleaned_text"], 2000)
-        
-        candidate_info = f"[Candidate {i+1}]\nFile: {cv['filename']}\n"
-        if "contact" in cv and cv["contact"]:
-            candidate_info += f"Contact: {cv['contact'].get('email', 'N/A')} | {cv['contact'].get('phone', 'N/A')}\n"
-        candidate_info += f"\nProfile:\n{relevant_sections}"
-        
-        detailed_candidate_info.append(candidate_info)
+    detailed_candidate_info = [build_candidate_profile(cv, i + 1, jd_embedding) for i, cv in enumerate(candidates)]
     
     # Create a detailed prompt for the LLM to analyze candidates
     # Fix the backslash issue by preparing the joined string separately
     candidate_profiles = "\n\n".join(detailed_candidate_info)
     
-    detailed_prompt = f"""You are an expert recruiter tasked with finding the best candidates for a job position.
+    return count_prompt(f"""You are an expert recruiter tasked with finding the best candidates for a job position.
 
 Job Requirements:
-{raw_jd[:2000]}
+{job_prompt_text(raw_jd)}
 
 Candidate Profiles:
 {candidate_profiles}
@@ -93,25 +421,205 @@ Candidate Profiles:
 Analyze each candidate's qualifications, experience, and skills in relation to the job requirements.
 Consider factors such as relevant experience, technical skills, education, and overall fit for the position.
 
-Rank the top {FINAL_RANKING} most suitable candidates by their numbers (1-{len(detailed_candidate_info)}).
+Rank the top {min(limit, len(candidates))} most suitable candidates by their numbers (1-{len(detailed_candidate_info)}).
 Provide your ranking as a comma-separated list of candidate numbers in order of suitability (best first).
-Only output the numbers, separated by commas."""
-
-    # Use the LLM to rank candidates based on detailed analysis
-    llm = AzureChatOpenAI(
-        azure_endpoint=AZURE_CONFIG["azure_endpoint"],
-        api_key=AZURE_CONFIG["api_key"],
-        api_version=AZURE_CONFIG["api_version"],
-        deployment_name=DEPLOYMENT_NAME,
-        temperature=0
-    )
-
-    response = llm.invoke(detailed_prompt)
-    selected_indices = parse_llm_response(response, len(top_initial_candidates))
-    
-    # Return the ranked candidates
-    if selected_indices:
-        return [top_initial_candidates[i] for i in selected_indices]
-    else:
-        # Fallback to initial ranking if LLM doesn't provide valid indices
-        return top_initial_candidates[:FINAL_RANKING]
\ No newline at end of file
+Only output the numbers, separated by commas.""")
+
+def ranking_llm():
+    return get_llm(temperature=0, purpose="rank")
+
+def _selected_indices(response, candidates):
+    selected_indices = parse_llm_response(response.content, len(candidates))
+    return list(dict.fromkeys(selected_indices)) or None
+
+def llm_order_candidates(raw_jd, candidates, limit=FINAL_RANKING, llm=None, jd_embedding=None):
+    """Ask the LLM to order candidates (best first); returns None if it gives no usable answer"""
+    llm = llm or ranking_llm()
+    response = llm.invoke(build_ranking_prompt(raw_jd, candidates, limit, jd_embedding))
+    selected_indices = _selected_indices(response, candidates)
+    if not selected_indices:
+        return None
+    return [candidates[i] for i in selected_indices][:limit]
+
+async def _order_window(llm, raw_jd, window, jd_embedding=None):
+    response = await llm.ainvoke(build_ranking_prompt(raw_jd, window, len(window), jd_embedding))
+    return _selected_indices(response, window)
+
+def llm_order_windows(raw_jd, candidates, llm=None, window_size=RERANK_WINDOW_SIZE,
+                      step=RERANK_WINDOW_STEP, concurrency=LLM_CONCURRENCY, jd_embedding=None):
+    """
+    Order a candidate pool of any size with concurrent LLM calls over overlapping windows.
+    
+    Windows that fail or give no usable answer keep their first-stage order,
+    so this always returns every candidate.
+    """
+    llm = llm or ranking_llm()
+    windows = make_windows(len(candidates), window_size, step)
+    results = run_sync(gather_limited(
+        [_order_window(llm, raw_jd, candidates[start:end], jd_embedding) for start, end in windows], concurrency))
+    
+    orderings = []
+    for (start, end), result in zip(windows, results):
+        if isinstance(result, BaseException):
+            print(f"Window {start}-{end} re-ranking failed: {str(result)}")
+            result = None
+        orderings.append([start + i for i in result] if result else None)
+    return [candidates[i] for i in merge_window_orderings(len(candidates), windows, orderings)]
+
+# --- Pointwise scoring with a persistent score cache ---
+
+# Bump whenever build_scoring_prompt changes, so old cached scores stop applying;
+# the prompt settings are part of it for the same reason
+POINTWISE_PROMPT_VERSION = (f"pointwise-v2-{PROMPT_CONTEXT}-cv{CANDIDATE_TOKEN_BUDGET}-jd{JD_TOKEN_BUDGET}"
+                            f"-{PROMPT_TOKEN_ENCODING}")
+
+def pointwise_prompt_version():
+    """POINTWISE_PROMPT_VERSION, marked when token counts are approximated (without tiktoken the prompts differ)"""
+    return POINTWISE_PROMPT_VERSION if get_encoding() is not None else f"{POINTWISE_PROMPT_VERSION}-approx"
+
+def build_scoring_prompt(raw_jd, candidates, jd_embedding=None):
+    """Prompt asking for an independent 0-100 relevance score per numbered candidate"""
+    candidate_profiles = "\n\n".join(build_candidate_profile(cv, i + 1, jd_embedding)
+                                     for i, cv in enumerate(candidates))
+    return count_prompt(f"""You are an expert recruiter scoring candidates for a job position.
+
+Job Requirements:
+{job_prompt_text(raw_jd)}
+
+Candidate Profiles:
+{candidate_profiles}
+
+Score each candidate independently from 0 to 100 for how well their qualifications, experience,
+skills and education fit the job requirements (100 = ideal fit, 0 = unrelated).
+Judge every candidate on its own against the requirements, not relative to the others.
+
+Respond with JSON only, in the form:
+{{"scores": [{{"candidate": 1, "score": 85}}, {{"candidate": 2, "score": 40}}]}}""")
+
+def parse_llm_scores(content, max_candidates):
+    """Map candidate index (0-based) to score from a scoring response"""
+    scores = {}
+    match = re.search(r'\{.*\}', content or "", re.S)
+    try:
+        for entry in json.loads(match.group(0))["scores"] if match else []:
+            scores[int(entry["candidate"]) - 1] = float(entry["score"])
+    except (ValueError, KeyError, TypeError):
+        scores = {}
+    if not scores:
+        # Fall back to "1: 85" style pairs
+        for number, score in re.findall(r'(\d+)\D{1,20}?(\d+(?:\.\d+)?)', content or ""):
+            scores.setdefault(int(number) - 1, float(score))
+    return {i: min(max(score, 0.0), 100.0) for i, score in scores.items() if 0 <= i < max_candidates}
+
+def score_key(job, cv, deployment=DEPLOYMENT_NAME):
+    return (job.content_hash, text_hash(cv.raw_text), pointwise_prompt_version(), deployment)
+
+async def _score_batch(llm, raw_jd, batch, jd_embedding=None):
+    response = await llm.ainvoke(build_scoring_prompt(raw_jd, batch, jd_embedding))
+    return parse_llm_scores(response.content, len(batch))
+
+def llm_score_candidates(job, candidates, llm=None, cache=None, batch_size=POINTWISE_BATCH_SIZE,
+                         concurrency=LLM_CONCURRENCY):
+    """
+    Pointwise LLM relevance scores (0-100) for candidates, None where none could be obtained.
+    
+    Scores come from the cache when this (JD, CV, prompt version, deployment)
+    pair was scored before; only the remaining candidates are sent to the LLM,
+    a few per call, with the calls running concurrently.
+    """
+    cache = cache or get_score_cache()
+    keys = [score_key(job, cv) for cv in candidates]
+    cached = cache.get_many(keys)
+    scores = [cached.get(key) for key in keys]
+    
+    missing = [i for i, score in enumerate(scores) if score is None]
+    if not missing:
+        return scores
+    batches = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+    llm = llm or ranking_llm()
+    results = run_sync(gather_limited(
+        [_score_batch(llm, job.raw_text, [candidates[i] for i in batch], job.embedding) for batch in batches],
+        concurrency))
+    
+    fresh = {}
+    for batch, result in zip(batches, results):
+        if isinstance(result, BaseException):
+            print(f"Candidate scoring failed: {str(result)}")
+            continue
+        for j, score in result.items():
+            scores[batch[j]] = score
+            fresh[keys[batch[j]]] = score
+    cache.put_many(fresh)
+    return scores
+
+def order_by_scores(candidates, scores):
+    """Order candidates by score, best first; unscored (None) ones follow in their current order"""
+    order = sorted(range(len(candidates)),
+                   key=lambda i: (scores[i] is None, -(scores[i] or 0), i))
+    return [candidates[i] for i in order]
+
+def llm_order_pointwise(job, candidates, llm=None, cache=None):
+    """Order candidates by pointwise LLM score; unscored ones follow in first-stage order"""
+    return order_by_scores(candidates, llm_score_candidates(job, candidates, llm, cache))
+
+# --- Incremental ranking updates ---
+
+def job_similarity(record, job, scorer=RANKING_SCORER):
+    """Same score rank_cvs gives a CV in its first stage, for a single CV"""
+    if scorer in CHUNK_SCORERS:
+        return record_chunk_score(record, job.embedding, scorer)
+    if scorer == "sections":
+        return record_section_score(record, job)
+    distance = float(np.sum((record.embedding - job.embedding) ** 2))
+    return 1 / (1 + distance)
+
+def insert_candidate(ranked_cvs, record, job_description_path, must_have=()):
+    """
+    Provisionally place a newly added CV into an existing ranking by vector similarity.
+    
+    Returns (new_ranking, position); position is None when the CV does not
+    make it into the ranked pool (or lacks a must-have skill), in which case
+    the ranking is returned unchanged.
+    """
+    job = get_job_artifacts(job_description_path)
+    if not job.cleaned_text:
+        raise ValueError("Invalid job description")
+    if not has_skills(record, must_have):
+        return ranked_cvs, None
+    
+    candidate = RankedCV(record, job_similarity(record, job))
+    ranked_cvs = [cv for cv in ranked_cvs if cv.filename != record.filename]
+    
+    # A full ranking only changes if the new CV beats the weakest candidate in it
+    if len(ranked_cvs) >= FINAL_RANKING and candidate.similarity <= min(cv.similarity for cv in ranked_cvs):
+        return ranked_cvs, None
+    
+    # The ranking is in re-ranker order, not score order: go after the last
+    # candidate scoring higher, so the new CV never jumps ahead of one the
+    # first stage already preferred (refine_window then moves it up if deserved)
+    position = max((i + 1 for i, cv in enumerate(ranked_cvs) if cv.similarity > candidate.similarity), default=0)
+    if position >= FINAL_RANKING:
+        return ranked_cvs, None
+    ranked_cvs = ranked_cvs[:position] + [candidate] + ranked_cvs[position:]
+    return ranked_cvs[:FINAL_RANKING], position
+
+def refine_window(ranked_cvs, position, job_description_path, radius=RERANK_WINDOW_RADIUS):
+    """Re-order only the candidates around position with one small LLM call"""
+    start = max(0, position - radius)
+    end = min(len(ranked_cvs), position + radius + 1)
+    window = ranked_cvs[start:end]
+    if len(window) < 2:
+        return ranked_cvs
+    
+    job = get_job_artifacts(job_description_path)
+    ordered = llm_order_candidates(job.raw_text, window, len(window), jd_embedding=job.embedding)
+    if not ordered:
+        return ranked_cvs
+    # Keep anyone the LLM left out, in their previous order, after the ones it placed
+    placed = {cv.filename for cv in ordered}
+    ordered += [cv for cv in window if cv.filename not in placed]
+    return ranked_cvs[:start] + ordered + ranked_cvs[end:]
+
+def remove_candidate(ranked_cvs, filename):
+    """Drop a removed CV from the current ordering"""
+    return [cv for cv in ranked_cvs if cv.filename != filename]
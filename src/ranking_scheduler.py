@@ -0,0 +1,144 @@
+import time
+import threading
+from concurrent.futures import Future
+from typing import Optional, Sequence, Tuple
+from config import RANKING_DEBOUNCE_MS, RANKING_MAX_DELAY_MS
+
+# --- Ranking scheduler ---
+#
+# Uploads, removals, applications and job switches each ask for the ranking
+# to be brought up to date. Instead of one LLM ranking per event, requests are
+# merged into a single pending batch that runs once no new request has come
+# in for RANKING_DEBOUNCE_MS (or RANKING_MAX_DELAY_MS after the first one).
+# Requests made while a batch is running are merged into the next batch, so
+# at most one ranking runs at a time and at most one waits behind it. A batch
+# that publishes a provisional ranking hands its background re-ranking to
+# hold(); the next batch waits for that to settle too, so a slow LLM is never
+# asked for a second ranking while the first is still running.
+#
+# Results are published as immutable RankingSnapshots tagged with the index
+# generation and job description hash they were computed from. A ranking
+# whose inputs changed while it ran is discarded instead of overwriting the
+# newer state; the scheduler then runs the batch again on the new inputs.
+
+
+class RankingSnapshot:
+    """An immutable ranking and the inputs it was computed from"""
+
+    __slots__ = ("candidates", "version", "generation", "job_hash", "provisional")
+
+    def __init__(self, candidates, version: int, generation: Optional[int], job_hash: Optional[str],
+                 provisional: bool = False):
+        object.__setattr__(self, "candidates", tuple(candidates))
+        object.__setattr__(self, "version", version)
+        object.__setattr__(self, "generation", generation)
+        object.__setattr__(self, "job_hash", job_hash)
+        object.__setattr__(self, "provisional", provisional)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("RankingSnapshot is immutable; publish a new one instead")
+
+    @property
+    def tag(self) -> Tuple[Optional[int], Optional[str]]:
+        return self.generation, self.job_hash
+
+
+class RankingScheduler:
+    """
+    Debounces ranking requests and runs them one batch at a time.
+
+    A batch is a dict: "full" (re-rank everyone), "added" (filenames of new
+    CVs to place) and "options" (rank_cvs options; later requests win). run
+    returns a stats dict; {"discarded": True} re-queues the batch.
+    """
+
+    def __init__(self, run, debounce_ms: float = RANKING_DEBOUNCE_MS, max_delay_ms: float = RANKING_MAX_DELAY_MS):
+        self.run = run
+        self.debounce = debounce_ms / 1000
+        self.max_delay = max_delay_ms / 1000
+        self.pending = None
+        self.future = None
+        self.first_request = self.last_request = 0.0
+        self.immediate = False
+        self.outstanding = None  # background work of the last batch, see hold()
+        self.counters = {"requests": 0, "runs": 0, "failures": 0, "requeued": 0}
+        self._condition = threading.Condition()
+        self._worker = None
+
+    def request(self, full: bool = False, added: Sequence[str] = (), options: Optional[dict] = None,
+                immediate: bool = False) -> Future:
+        """
+        Ask for a ranking update; returns a Future for the run that will include it.
+
+        immediate skips the debounce wait (for callers waiting on the result).
+        """
+        with self._condition:
+            now = time.monotonic()
+            if self.pending is None:
+                self.pending = {"full": False, "added": [], "options": {}}
+                self.future = Future()
+                self.first_request = now
+                self.immediate = False
+            self.pending["full"] |= full
+            self.pending["added"] += [name for name in added if name not in self.pending["added"]]
+            self.pending["options"].update(options or {})
+            self.last_request = now
+            self.immediate |= immediate
+            self.counters["requests"] += 1
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._loop, name="ranking-scheduler", daemon=True)
+                self._worker.start()
+            self._condition.notify()
+            return self.future
+
+    def hold(self, future: Future):
+        """Keep the next batch waiting until future (e.g. a pending re-ranking) is done"""
+        with self._condition:
+            self.outstanding = future
+        # Callbacks run in the order they were added, so work chained on future
+        # (publishing the re-ranked list) finishes before the next batch starts
+        future.add_done_callback(self._settled)
+
+    def _settled(self, future: Future):
+        with self._condition:
+            if self.outstanding is future:
+                self.outstanding = None
+            self._condition.notify_all()
+
+    def _next_batch(self):
+        with self._condition:
+            while True:
+                if self.pending is None or self.outstanding is not None:
+                    self._condition.wait()
+                    continue
+                if self.immediate:
+                    break
+                due = min(self.last_request + self.debounce, self.first_request + self.max_delay)
+                remaining = due - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch, future = self.pending, self.future
+            self.pending = self.future = None
+            return batch, future
+
+    def _loop(self):
+        while True:
+            batch, future = self._next_batch()
+            self.counters["runs"] += 1
+            try:
+                result = self.run(batch)
+            except Exception as e:
+                self.counters["failures"] += 1
+                print(f"Error running scheduled ranking: {str(e)}")
+                future.set_exception(e)
+                continue
+            if isinstance(result, dict) and result.get("discarded"):
+                # The inputs changed while ranking; run again on the new ones
+                self.counters["requeued"] += 1
+                self.request(batch["full"], batch["added"], batch["options"])
+            future.set_result(result)
+
+    def status(self) -> dict:
+        with self._condition:
+            return dict(self.counters, pending=self.pending is not None, settling=self.outstanding is not None)
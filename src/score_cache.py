@@ -0,0 +1,89 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+from config import LLM_SCORE_CACHE_PATH
+
+# --- Persistent cache of pointwise LLM relevance scores ---
+#
+# One row per (JD content hash, CV content hash, prompt version, deployment).
+# Any of these changing means the score no longer applies, so rows are never
+# updated in place, only added. SQLite in WAL mode lets every API worker read
+# and add scores concurrently.
+
+ScoreKey = Tuple[str, str, str, str]
+
+_QUERY_BATCH = 500
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+class ScoreCache:
+    def __init__(self, path: str = LLM_SCORE_CACHE_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS scores (
+                    jd_hash TEXT NOT NULL,
+                    cv_hash TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    deployment TEXT NOT NULL,
+                    score REAL NOT NULL,
+                    created REAL NOT NULL,
+                    PRIMARY KEY (jd_hash, cv_hash, prompt_version, deployment)
+                )""")
+
+    def get_many(self, keys: Iterable[ScoreKey]) -> Dict[ScoreKey, float]:
+        """Cached scores for the keys that have one"""
+        # Group by everything but the CV so each lookup is one indexed IN query
+        groups = {}
+        for jd_hash, cv_hash, prompt_version, deployment in keys:
+            groups.setdefault((jd_hash, prompt_version, deployment), set()).add(cv_hash)
+
+        found = {}
+        with self._lock:
+            for (jd_hash, prompt_version, deployment), cv_hashes in groups.items():
+                cv_hashes = list(cv_hashes)
+                for start in range(0, len(cv_hashes), _QUERY_BATCH):
+                    batch = cv_hashes[start:start + _QUERY_BATCH]
+                    rows = self._conn.execute(
+                        f"SELECT cv_hash, score FROM scores WHERE jd_hash = ? AND prompt_version = ? "
+                        f"AND deployment = ? AND cv_hash IN ({','.join('?' * len(batch))})",
+                        (jd_hash, prompt_version, deployment, *batch))
+                    for cv_hash, score in rows:
+                        found[(jd_hash, cv_hash, prompt_version, deployment)] = score
+        return found
+
+    def put_many(self, scores: Dict[ScoreKey, float]):
+        if not scores:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?)",
+                [(*key, float(score), now) for key, score in scores.items()])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[ScoreCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_score_cache() -> ScoreCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ScoreCache()
+        return _cache
@@ -0,0 +1,185 @@
+import os
+import json
+import threading
+import numpy as np
+from typing import Dict, Optional
+from .text_chunking import SECTION_PATTERNS
+from config import embedding_model, SECTION_WEIGHTS, SECTION_WEIGHTS_PATH
+
+# --- Section-level scoring ---
+#
+# Every CV section (education, experience, skills, ...) is embedded on its own
+# at ingestion, and the job description is split into its requirement
+# sections the same way. A CV's score is the weighted mean, over the job's
+# sections, of the best cosine between that section and the CV sections it is
+# compared with (JD_SECTION_TARGETS); a CV without any of those sections falls
+# back to its full-document vector. All section vectors of the corpus are
+# stacked into one normalised matrix, so scoring is a single product with the
+# job's section matrix plus a gather per job section.
+
+# CV sections (see text_chunking.SECTION_PATTERNS) each job description section is compared with
+JD_SECTION_TARGETS = {
+    "summary": ("summary", "experience"),
+    "responsibilities": ("experience", "projects"),
+    "requirements": ("experience", "skills", "education", "certifications"),
+    "skills": ("skills", "projects", "experience"),
+    "experience": ("experience", "projects"),
+    "education": ("education", "certifications"),
+    "nice_to_have": ("skills", "projects", "certifications"),
+}
+
+# Column of each CV section in SectionMatrix.rows
+CV_SECTION_COLUMNS = {name: column for column, name in enumerate(SECTION_PATTERNS)}
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+def embed_sections(raw_text: str, section_spans, names=SECTION_PATTERNS):
+    """(section names, (n_sections, dim) vectors) of the non-empty sections among names, in one batch"""
+    texts = {}
+    for name in names:
+        text = "\n".join(raw_text[start:end] for start, end in section_spans.get(name, ())).strip()
+        if text and name != "contact":
+            texts[name] = text
+    if not texts:
+        return (), None
+    return tuple(texts), np.asarray(embedding_model.encode(list(texts.values())), dtype=np.float32)
+
+
+def job_sections(job):
+    """The job's section names and vectors, embedded on first use for artifacts cached without them"""
+    if job.section_names is None:
+        job.section_names, job.section_vectors = embed_sections(job.raw_text, job.section_spans, JD_SECTION_TARGETS)
+    return job.section_names, job.section_vectors
+
+
+# --- Per-job weight overrides ---
+
+_overrides = {"stamp": None, "jobs": {}}
+_overrides_lock = threading.Lock()
+
+
+def _load_overrides(path: str) -> dict:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {}
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    if _overrides["stamp"] != stamp:
+        try:
+            with open(path) as f:
+                _overrides["jobs"] = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading section weights: {str(e)}")
+            _overrides["jobs"] = {}
+        _overrides["stamp"] = stamp
+    return _overrides["jobs"]
+
+
+def section_weights(job_path: str, path: str = SECTION_WEIGHTS_PATH) -> Dict[str, float]:
+    """SECTION_WEIGHTS with the overrides stored for this job applied"""
+    with _overrides_lock:
+        overrides = _load_overrides(path).get(os.path.basename(job_path), {})
+    return dict(SECTION_WEIGHTS, **overrides)
+
+
+def set_section_weights(job_path: str, weights: Optional[Dict[str, float]], path: str = SECTION_WEIGHTS_PATH):
+    """Store weight overrides for a job (None clears them); unknown sections or negative weights raise ValueError"""
+    for name, weight in (weights or {}).items():
+        if name not in JD_SECTION_TARGETS:
+            raise ValueError(f"Unknown job description section: {name}")
+        if weight < 0:
+            raise ValueError(f"Section weights must not be negative: {name}")
+    with _overrides_lock:
+        jobs = dict(_load_overrides(path))
+        if weights:
+            jobs[os.path.basename(job_path)] = {name: float(weight) for name, weight in weights.items()}
+        else:
+            jobs.pop(os.path.basename(job_path), None)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(jobs, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+# --- Corpus matrix ---
+
+class SectionMatrix:
+    """All section vectors of a corpus as one normalised matrix, indexed by (CV, section)"""
+
+    __slots__ = ("records", "vectors", "rows", "doc_vectors")
+
+    def __init__(self, metadata):
+        self.records = list(metadata)
+        dimension = self.records[0].embedding.shape[0] if self.records else 0
+        # (n_cvs, n_sections) row of each CV section in vectors, -1 where the CV has none
+        self.rows = np.full((len(self.records), len(CV_SECTION_COLUMNS)), -1, dtype=np.int64)
+        blocks, offset = [], 0
+        for i, cv in enumerate(self.records):
+            if len(cv.section_names):
+                self.rows[i, [CV_SECTION_COLUMNS[name] for name in cv.section_names]] = \
+                    offset + np.arange(len(cv.section_names))
+                blocks.append(cv.section_vectors)
+                offset += len(cv.section_names)
+        self.vectors = _normalize(np.concatenate(blocks)) if blocks else np.empty((0, dimension), dtype=np.float32)
+        self.doc_vectors = _normalize(np.vstack([cv.embedding for cv in self.records])) if self.records else \
+            np.empty((0, dimension), dtype=np.float32)
+
+    def matches(self, metadata) -> bool:
+        return len(metadata) == len(self.records) and all(a is b for a, b in zip(metadata, self.records))
+
+
+_cached_matrix = None
+_cache_lock = threading.Lock()
+
+
+def get_section_matrix(metadata) -> SectionMatrix:
+    """Section matrix for metadata, rebuilt only when CVs were added or removed"""
+    global _cached_matrix
+    with _cache_lock:
+        if _cached_matrix is None or not _cached_matrix.matches(metadata):
+            _cached_matrix = SectionMatrix(metadata)
+        return _cached_matrix
+
+
+def section_scores(job, matrix: SectionMatrix, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """
+    Score every CV in matrix against the job description, section by section.
+
+    Args:
+        job: JobArtifacts of the job description
+        matrix: SectionMatrix of the corpus
+        weights: Weight per job description section (default: section_weights for the job)
+
+    Returns:
+        (n_cvs,) weighted cosine-similarity scores, aligned with matrix.records;
+        the full-document cosine when the job has no weighted sections
+    """
+    weights = section_weights(job.path) if weights is None else weights
+    names, vectors = job_sections(job)
+    used = [j for j, name in enumerate(names) if weights.get(name, 0) > 0]
+    if not used or not len(matrix.records):
+        return matrix.doc_vectors @ _normalize(job.embedding)
+
+    queries = _normalize(vectors[used])
+    # The extra -inf row is where the -1 of a missing section points
+    sims = np.vstack([matrix.vectors @ queries.T, np.full((1, len(used)), -np.inf, dtype=np.float32)])
+    fallback = matrix.doc_vectors @ queries.T
+    total = np.zeros(len(matrix.records), dtype=np.float32)
+    weight_sum = 0.0
+    for column, j in enumerate(used):
+        name = names[j]
+        targets = matrix.rows[:, [CV_SECTION_COLUMNS[target] for target in JD_SECTION_TARGETS[name]]]
+        best = sims[targets, column].max(axis=1)
+        total += weights[name] * np.where(np.isfinite(best), best, fallback[:, column])
+        weight_sum += weights[name]
+    return total / weight_sum
+
+
+def record_section_score(record, job, weights: Optional[Dict[str, float]] = None) -> float:
+    """section_scores for a single CV"""
+    return float(section_scores(job, SectionMatrix([record]), weights)[0])
@@ -0,0 +1,174 @@
+import re
+import json
+import hashlib
+import threading
+import numpy as np
+from typing import Iterable, List, Optional
+from config import SKILLS_VOCABULARY_PATH, SKILL_NICE_TO_HAVE_BOOST
+
+# --- Skill bitsets ---
+#
+# Every CV is mapped at ingestion to the IDs of the skills it mentions, using
+# a configurable vocabulary (SKILLS_VOCABULARY_PATH, skill name -> aliases).
+# A skill's ID is its position in the file, so new skills should be appended.
+# The IDs are stored per record as a bitset of whole 64-bit words, and the
+# corpus is stacked into one (n_cvs, n_words) matrix, so a must-have filter
+# over every CV is a single bitwise AND and compare.
+#
+# Records remember which vocabulary version their bits were computed with;
+# bits from another version are recomputed from the text on first use.
+
+
+class SkillVocabulary:
+    """Skill names, their aliases and one compiled pattern matching all of them"""
+
+    __slots__ = ("names", "ids", "aliases", "pattern", "version", "n_bytes")
+
+    def __init__(self, entries: dict):
+        self.names = list(entries)
+        self.ids = {name.lower(): i for i, name in enumerate(self.names)}
+        self.aliases = {}
+        for i, name in enumerate(self.names):
+            for alias in [name] + list(entries[name] or []):
+                self.aliases.setdefault(" ".join(alias.lower().split()), i)
+        # Longest aliases first, so "google cloud platform" wins over "google cloud"
+        alternatives = "|".join(re.escape(alias).replace(r"\ ", r"\s+")
+                                for alias in sorted(self.aliases, key=len, reverse=True))
+        self.pattern = re.compile(rf"(?<![\w+#.])({alternatives})(?![\w+#])", re.IGNORECASE) \
+            if self.aliases else None
+        self.version = hashlib.sha1(json.dumps([[name, entries[name]] for name in self.names]).encode()).hexdigest()[:16]
+        self.n_bytes = 8 * ((len(self.names) + 63) // 64)
+
+    def skill_ids(self, names: Iterable[str]) -> List[int]:
+        """IDs for skill names (or aliases); unknown names raise ValueError"""
+        ids = []
+        for name in names:
+            key = " ".join(name.lower().split())
+            skill_id = self.ids.get(key, self.aliases.get(key))
+            if skill_id is None:
+                raise ValueError(f"Unknown skill: {name}")
+            ids.append(skill_id)
+        return ids
+
+
+_vocabulary = None
+_vocabulary_lock = threading.Lock()
+
+
+def get_vocabulary(path: str = SKILLS_VOCABULARY_PATH) -> SkillVocabulary:
+    global _vocabulary
+    with _vocabulary_lock:
+        if _vocabulary is None:
+            try:
+                with open(path) as f:
+                    entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error loading skills vocabulary: {str(e)}")
+                entries = {}
+            _vocabulary = SkillVocabulary(entries)
+        return _vocabulary
+
+
+def encode_ids(ids: Iterable[int], n_bytes: int) -> bytes:
+    bits = np.zeros(n_bytes * 8, dtype=bool)
+    bits[list(ids)] = True
+    return np.packbits(bits, bitorder="little").tobytes()
+
+
+def encode_skills(text: str, vocabulary: Optional[SkillVocabulary] = None) -> bytes:
+    """Bitset of the vocabulary skills mentioned in text"""
+    vocabulary = vocabulary or get_vocabulary()
+    if vocabulary.pattern is None or not text:
+        return bytes(vocabulary.n_bytes)
+    ids = {vocabulary.aliases[" ".join(match.lower().split())] for match in vocabulary.pattern.findall(text)}
+    return encode_ids(ids, vocabulary.n_bytes)
+
+
+def decode_skills(bits: bytes, vocabulary: Optional[SkillVocabulary] = None) -> List[str]:
+    vocabulary = vocabulary or get_vocabulary()
+    flags = np.unpackbits(np.frombuffer(bits, dtype=np.uint8), bitorder="little")[:len(vocabulary.names)]
+    return [vocabulary.names[i] for i in np.flatnonzero(flags)]
+
+
+def record_skill_bits(record, vocabulary: Optional[SkillVocabulary] = None) -> bytes:
+    """A record's skill bitset, recomputed (and kept) if it predates the current vocabulary"""
+    vocabulary = vocabulary or get_vocabulary()
+    if record.skill_vocabulary != vocabulary.version or record.skill_bits is None:
+        record.skill_bits = encode_skills(record.raw_text, vocabulary)
+        record.skill_vocabulary = vocabulary.version
+    return record.skill_bits
+
+
+def record_skills(record) -> List[str]:
+    return decode_skills(record_skill_bits(record))
+
+
+class SkillMatrix:
+    """Skill bitsets of a corpus as one (n_cvs, n_words) uint64 matrix"""
+
+    __slots__ = ("records", "version", "words")
+
+    def __init__(self, metadata, vocabulary: SkillVocabulary):
+        self.records = list(metadata)
+        self.version = vocabulary.version
+        packed = b"".join(record_skill_bits(cv, vocabulary) for cv in self.records)
+        self.words = np.frombuffer(packed, dtype=np.uint64).reshape(len(self.records), vocabulary.n_bytes // 8)
+
+    def matches(self, metadata, vocabulary: SkillVocabulary) -> bool:
+        return self.version == vocabulary.version and len(metadata) == len(self.records) and \
+            all(a is b for a, b in zip(metadata, self.records))
+
+
+_cached_matrix = None
+_cache_lock = threading.Lock()
+
+
+def get_skill_matrix(metadata) -> SkillMatrix:
+    global _cached_matrix
+    vocabulary = get_vocabulary()
+    with _cache_lock:
+        if _cached_matrix is None or not _cached_matrix.matches(metadata, vocabulary):
+            _cached_matrix = SkillMatrix(metadata, vocabulary)
+        return _cached_matrix
+
+
+def _query_words(names, vocabulary: SkillVocabulary) -> np.ndarray:
+    return np.frombuffer(encode_ids(vocabulary.skill_ids(names), vocabulary.n_bytes), dtype=np.uint64)
+
+
+def must_have_mask(metadata, must_have) -> Optional[np.ndarray]:
+    """(n_cvs,) bool mask of CVs with every must-have skill, or None when there is no filter"""
+    if not must_have:
+        return None
+    required = _query_words(must_have, get_vocabulary())
+    return ((get_skill_matrix(metadata).words & required) == required).all(axis=1)
+
+
+def has_skills(record, must_have) -> bool:
+    """must_have_mask for a single CV"""
+    if not must_have:
+        return True
+    vocabulary = get_vocabulary()
+    required = _query_words(must_have, vocabulary)
+    words = np.frombuffer(record_skill_bits(record, vocabulary), dtype=np.uint64)
+    return bool(((words & required) == required).all())
+
+
+def nice_to_have_counts(metadata, nice_to_have) -> np.ndarray:
+    """(n_cvs,) number of nice-to-have skills each CV has"""
+    wanted = _query_words(nice_to_have, get_vocabulary())
+    common = get_skill_matrix(metadata).words & wanted
+    return np.unpackbits(common.view(np.uint8), axis=1).sum(axis=1)
+
+
+def boost_nice_to_have(candidates, metadata, nice_to_have, boost: float = SKILL_NICE_TO_HAVE_BOOST):
+    """
+    Re-order candidates, raising each score by up to boost (relative) for the
+    share of nice-to-have skills it has. Reported similarities are unchanged.
+    """
+    if not nice_to_have or not candidates:
+        return candidates
+    counts = nice_to_have_counts(metadata, nice_to_have)
+    matched = {cv.filename: int(count) for cv, count in zip(metadata, counts)}
+    share = {cv.filename: matched.get(cv.filename, 0) / len(nice_to_have) for cv in candidates}
+    return sorted(candidates, key=lambda cv: cv.similarity * (1 + boost * share[cv.filename]), reverse=True)
@@ -0,0 +1,269 @@
+import os
+import json
+import shutil
+import pickle
+import weakref
+import faiss
+import numpy as np
+from typing import List, Optional, Tuple
+from .cv_record import CVRecord, RankedCV
+from .text_store import write_text_blob, TextBlobStore
+from .bm25_index import bm25_index_for, set_bm25_index
+from config import SNAPSHOT_DIR, SNAPSHOT_KEEP, USE_MMAP
+
+# --- Versioned on-disk snapshots ---
+#
+# Each save creates a new generation directory under SNAPSHOT_DIR:
+#
+#   gen-000042/
+#       index.faiss          FAISS index
+#       embeddings.npy       (n_cvs, dim) float32 full-document vectors
+#       chunk_vectors.npy    (n_chunks, dim) float32, all CVs concatenated
+#       chunk_offsets.npy    (n_cvs + 1,) int64 row offsets into chunk_vectors
+#       section_vectors.npy  (n_sections, dim) float32, all CVs concatenated
+#       section_offsets.npy  (n_cvs + 1,) int64 row offsets into section_vectors
+#       texts.blob           compressed raw_text / cleaned_text of every CV
+#       text_offsets.npy     (2 * n_cvs + 1,) int64 entry offsets into texts.blob
+#       records.pkl          CVRecord states without the vectors and text
+#       bm25.pkl             optional, BM25 inverted index over the cleaned texts
+#       ranking.json         optional, latest ranking computed on this generation
+#
+# and then atomically points CURRENT at it. Readers memory-map the index and
+# the matrices, so every API worker shares the same pages in the OS page cache
+# instead of holding a private copy.
+
+CURRENT_FILE = "CURRENT"
+RANKING_FILE = "ranking.json"
+
+# Indexes loaded as read-only views of a mapped file
+_mmapped_indexes = weakref.WeakSet()
+
+
+def generation_path(generation: int, snapshot_dir: str = SNAPSHOT_DIR) -> str:
+    return os.path.join(snapshot_dir, f"gen-{generation:06d}")
+
+
+def current_generation(snapshot_dir: str = SNAPSHOT_DIR) -> Optional[int]:
+    """Return the generation CURRENT points at, or None if there is no snapshot yet"""
+    try:
+        with open(os.path.join(snapshot_dir, CURRENT_FILE)) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _set_current(generation: int, snapshot_dir: str):
+    tmp_path = os.path.join(snapshot_dir, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(str(generation))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(snapshot_dir, CURRENT_FILE))
+
+
+def _existing_generations(snapshot_dir: str) -> List[int]:
+    generations = []
+    for name in os.listdir(snapshot_dir):
+        if name.startswith("gen-") and not name.endswith(".tmp"):
+            try:
+                generations.append(int(name[4:]))
+            except ValueError:
+                pass
+    return sorted(generations)
+
+
+def _prune(snapshot_dir: str, keep: int):
+    # Workers that still map an old generation keep working: unlinked files
+    # stay valid for as long as they are mapped.
+    for generation in _existing_generations(snapshot_dir)[:-keep]:
+        shutil.rmtree(generation_path(generation, snapshot_dir), ignore_errors=True)
+
+
+def _concatenate(matrices, dimension: int):
+    """Per-CV matrices as one matrix plus (n_cvs + 1,) row offsets"""
+    offsets = np.zeros(len(matrices) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(matrix) for matrix in matrices])
+    stacked = np.concatenate(matrices) if offsets[-1] else np.empty((0, dimension), dtype=np.float32)
+    return stacked, offsets
+
+
+def write_snapshot(faiss_index, metadata, snapshot_dir: str = SNAPSHOT_DIR) -> int:
+    """Write index and metadata as a new generation and make it current"""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    tmp_dir = os.path.join(snapshot_dir, f"gen-{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    dimension = faiss_index.d
+    embeddings = np.vstack([cv.embedding for cv in metadata]) if metadata else \
+        np.empty((0, dimension), dtype=np.float32)
+    chunk_vectors, chunk_offsets = _concatenate([cv.chunk_vectors for cv in metadata], dimension)
+    section_vectors, section_offsets = _concatenate([cv.section_vectors for cv in metadata], dimension)
+
+    faiss.write_index(faiss_index, os.path.join(tmp_dir, "index.faiss"))
+    np.save(os.path.join(tmp_dir, "embeddings.npy"), embeddings.astype(np.float32, copy=False))
+    np.save(os.path.join(tmp_dir, "chunk_vectors.npy"), chunk_vectors.astype(np.float32, copy=False))
+    np.save(os.path.join(tmp_dir, "chunk_offsets.npy"), chunk_offsets)
+    np.save(os.path.join(tmp_dir, "section_vectors.npy"), section_vectors.astype(np.float32, copy=False))
+    np.save(os.path.join(tmp_dir, "section_offsets.npy"), section_offsets)
+    text_offsets = write_text_blob(os.path.join(tmp_dir, "texts.blob"),
+                                   (entry for cv in metadata for entry in cv.text_entries()))
+    np.save(os.path.join(tmp_dir, "text_offsets.npy"), text_offsets)
+    with open(os.path.join(tmp_dir, "records.pkl"), "wb") as f:
+        pickle.dump([cv.to_state() for cv in metadata], f, protocol=pickle.HIGHEST_PROTOCOL)
+    # Only an index already kept up to date in this process is saved, never built here
+    bm25_index = bm25_index_for(metadata)
+    if bm25_index is not None:
+        with open(os.path.join(tmp_dir, "bm25.pkl"), "wb") as f:
+            pickle.dump(bm25_index, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    return publish_generation(tmp_dir, snapshot_dir)
+
+
+def publish_generation(tmp_dir: str, snapshot_dir: str = SNAPSHOT_DIR) -> int:
+    """Move a fully written generation directory into place and make it current"""
+    # Claim the next free generation number (another worker may be saving too)
+    generation = max(_existing_generations(snapshot_dir) + [current_generation(snapshot_dir) or 0]) + 1
+    while True:
+        try:
+            os.rename(tmp_dir, generation_path(generation, snapshot_dir))
+            break
+        except OSError:
+            if os.path.exists(generation_path(generation, snapshot_dir)):
+                generation += 1
+            else:
+                raise
+
+    _set_current(generation, snapshot_dir)
+    _prune(snapshot_dir, SNAPSHOT_KEEP)
+    return generation
+
+
+def _read_index(path: str, mmap: bool):
+    if mmap and hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+        try:
+            index = faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC)
+            _mmapped_indexes.add(index)
+            return index
+        except RuntimeError as e:
+            print(f"Memory-mapped index load failed, reading into memory: {str(e)}")
+    return faiss.read_index(path)
+
+
+def read_snapshot(generation: Optional[int] = None, mmap: bool = USE_MMAP,
+                  snapshot_dir: str = SNAPSHOT_DIR) -> Tuple[object, List[CVRecord], int]:
+    """Load a generation (CURRENT by default), memory-mapping index and vectors"""
+    if generation is None:
+        generation = current_generation(snapshot_dir)
+        if generation is None:
+            raise FileNotFoundError(f"No snapshot found in {snapshot_dir}")
+    path = generation_path(generation, snapshot_dir)
+    mmap_mode = "r" if mmap else None
+
+    faiss_index = _read_index(os.path.join(path, "index.faiss"), mmap)
+    embeddings = np.load(os.path.join(path, "embeddings.npy"), mmap_mode=mmap_mode)
+    chunk_vectors = np.load(os.path.join(path, "chunk_vectors.npy"), mmap_mode=mmap_mode)
+    chunk_offsets = np.load(os.path.join(path, "chunk_offsets.npy"))
+    # Generations written before section embeddings have none
+    section_vectors, section_offsets = None, None
+    if os.path.exists(os.path.join(path, "section_offsets.npy")):
+        section_vectors = np.load(os.path.join(path, "section_vectors.npy"), mmap_mode=mmap_mode)
+        section_offsets = np.load(os.path.join(path, "section_offsets.npy"))
+    with open(os.path.join(path, "records.pkl"), "rb") as f:
+        states = pickle.load(f)
+    text_store = None
+    if os.path.exists(os.path.join(path, "texts.blob")):
+        text_store = TextBlobStore(os.path.join(path, "texts.blob"),
+                                   np.load(os.path.join(path, "text_offsets.npy")))
+
+    # Records hold views into the shared matrices, not copies
+    metadata = [
+        CVRecord.from_state(
+            state,
+            text_store=text_store,
+            text_id=i if text_store is not None else None,
+            embedding=embeddings[i],
+            chunk_vectors=chunk_vectors[chunk_offsets[i]:chunk_offsets[i + 1]],
+            section_vectors=section_vectors[section_offsets[i]:section_offsets[i + 1]]
+            if section_offsets is not None else None,
+        )
+        for i, state in enumerate(states)
+    ]
+
+    if os.path.exists(os.path.join(path, "bm25.pkl")):
+        with open(os.path.join(path, "bm25.pkl"), "rb") as f:
+            set_bm25_index(pickle.load(f))
+    return faiss_index, metadata, generation
+
+
+def ensure_writable(faiss_index):
+    """Return a modifiable copy of a memory-mapped index (mapped indexes are read-only views)"""
+    if faiss_index in _mmapped_indexes:
+        return faiss.deserialize_index(faiss.serialize_index(faiss_index))
+    return faiss_index
+
+
+def load_if_changed(loaded_generation: Optional[int], snapshot_dir: str = SNAPSHOT_DIR):
+    """Return (index, metadata, generation) if a newer generation is current, else None"""
+    generation = current_generation(snapshot_dir)
+    if generation is None or generation == loaded_generation:
+        return None
+    return read_snapshot(generation, snapshot_dir=snapshot_dir)
+
+
+# --- Ranking persisted next to the generation it was computed on ---
+
+def save_ranking(ranked_cvs, job_desc_path: str, generation: Optional[int] = None,
+                 snapshot_dir: str = SNAPSHOT_DIR, provisional: bool = False):
+    """Store a ranking so other workers can adopt it without re-ranking"""
+    if generation is None:
+        generation = current_generation(snapshot_dir)
+    if generation is None or ranked_cvs is None:
+        return
+    path = generation_path(generation, snapshot_dir)
+    if not os.path.isdir(path):
+        return
+    tmp_path = os.path.join(path, f"{RANKING_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "job_desc_path": job_desc_path,
+            "provisional": provisional,
+            "ranking": [{"filename": cv.filename, "similarity": cv.similarity} for cv in ranked_cvs],
+        }, f)
+    os.replace(tmp_path, os.path.join(path, RANKING_FILE))
+
+
+def ranking_mtime(generation: Optional[int], snapshot_dir: str = SNAPSHOT_DIR) -> Optional[float]:
+    if generation is None:
+        return None
+    try:
+        return os.path.getmtime(os.path.join(generation_path(generation, snapshot_dir), RANKING_FILE))
+    except OSError:
+        return None
+
+
+def load_ranking(metadata, job_desc_path: str, generation: Optional[int] = None,
+                 snapshot_dir: str = SNAPSHOT_DIR) -> Optional[List[RankedCV]]:
+    """Rebuild a stored ranking against metadata, or None if there is none for this job"""
+    state = load_ranking_state(metadata, job_desc_path, generation, snapshot_dir)
+    return state[0] if state is not None else None
+
+
+def load_ranking_state(metadata, job_desc_path: str, generation: Optional[int] = None,
+                       snapshot_dir: str = SNAPSHOT_DIR) -> Optional[Tuple[List[RankedCV], bool]]:
+    """load_ranking plus whether the stored ranking is provisional (not re-ranked yet)"""
+    if generation is None:
+        generation = current_generation(snapshot_dir)
+    if generation is None:
+        return None
+    try:
+        with open(os.path.join(generation_path(generation, snapshot_dir), RANKING_FILE)) as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if stored.get("job_desc_path") != job_desc_path:
+        return None
+    by_filename = {cv.filename: cv for cv in metadata}
+    ranking = [RankedCV(by_filename[entry["filename"]], entry["similarity"])
+               for entry in stored["ranking"] if entry["filename"] in by_filename]
+    return ranking, bool(stored.get("provisional"))
@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import shutil
+import struct
+import hashlib
+from typing import BinaryIO, Optional
+from .snapshot import current_generation, generation_path, publish_generation
+from config import SNAPSHOT_DIR
+
+# --- Single-file snapshot archives for bootstrapping replicas ---
+#
+# An archive is a header followed by a stream of frames:
+#
+#   header:  MAGIC | format version (u16)
+#   frame:   kind (u8) | payload length (u32) | sha256(payload) (32 bytes) | payload
+#
+# Frame kinds, in stream order:
+#
+#   MANIFEST    json: format version, source generation, file names and sizes
+#   FILE_START  json: name, size
+#   DATA        up to ARCHIVE_CHUNK_SIZE bytes of the current file
+#   FILE_END    json: name, sha256 of the whole file
+#   END         json: number of files
+#
+# Every frame carries its own checksum, so an archive can be produced on the
+# fly (e.g. piped over ssh) and is verified chunk by chunk while it is read.
+# Nothing becomes visible to readers until the whole archive has been
+# verified and the generation is published.
+
+MAGIC = b"CVSNAP\x00\x01"
+FORMAT_VERSION = 1
+ARCHIVE_CHUNK_SIZE = 4 * 1024 * 1024
+
+MANIFEST, FILE_START, DATA, FILE_END, END = 1, 2, 3, 4, 5
+_FRAME_HEADER = struct.Struct(">BI32s")
+
+
+class ArchiveError(Exception):
+    """Raised when an archive is malformed or fails verification"""
+
+
+def _write_frame(out: BinaryIO, kind: int, payload: bytes):
+    out.write(_FRAME_HEADER.pack(kind, len(payload), hashlib.sha256(payload).digest()))
+    out.write(payload)
+
+
+def _write_json_frame(out: BinaryIO, kind: int, obj: dict):
+    _write_frame(out, kind, json.dumps(obj).encode("utf-8"))
+
+
+def _read_exact(stream: BinaryIO, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        part = stream.read(size - len(data))
+        if not part:
+            raise ArchiveError("Archive is truncated")
+        data += part
+    return bytes(data)
+
+
+def _read_frame(stream: BinaryIO):
+    kind, length, digest = _FRAME_HEADER.unpack(_read_exact(stream, _FRAME_HEADER.size))
+    payload = _read_exact(stream, length)
+    if hashlib.sha256(payload).digest() != digest:
+        raise ArchiveError(f"Checksum mismatch in frame of kind {kind}")
+    return kind, payload
+
+
+def _json_payload(payload: bytes, what: str, fields: dict) -> dict:
+    """A frame's JSON object, checked to have fields (name -> type); anything else is an ArchiveError"""
+    try:
+        obj = json.loads(payload)
+    except ValueError:
+        raise ArchiveError(f"Malformed {what}: not valid JSON") from None
+    return _check_fields(obj, what, fields)
+
+
+def _check_fields(obj, what: str, fields: dict) -> dict:
+    if not isinstance(obj, dict):
+        raise ArchiveError(f"Malformed {what}: not a JSON object")
+    for field, kind in fields.items():
+        if not isinstance(obj.get(field), kind) or isinstance(obj.get(field), bool):
+            raise ArchiveError(f"Malformed {what}: missing or invalid {field!r}")
+    return obj
+
+
+def export_snapshot(out: BinaryIO, generation: Optional[int] = None,
+                    snapshot_dir: str = SNAPSHOT_DIR) -> dict:
+    """Stream a snapshot generation (CURRENT by default) into an archive, returns the manifest"""
+    if generation is None:
+        generation = current_generation(snapshot_dir)
+        if generation is None:
+            raise FileNotFoundError(f"No snapshot found in {snapshot_dir}")
+    path = generation_path(generation, snapshot_dir)
+    names = sorted(name for name in os.listdir(path)
+                   if os.path.isfile(os.path.join(path, name)) and not name.endswith(".tmp"))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "generation": generation,
+        "created": time.time(),
+        "files": [{"name": name, "size": os.path.getsize(os.path.join(path, name))} for name in names],
+    }
+    out.write(MAGIC)
+    out.write(struct.pack(">H", FORMAT_VERSION))
+    _write_json_frame(out, MANIFEST, manifest)
+
+    for entry in manifest["files"]:
+        _write_json_frame(out, FILE_START, entry)
+        file_hash = hashlib.sha256()
+        with open(os.path.join(path, entry["name"]), "rb") as f:
+            while True:
+                chunk = f.read(ARCHIVE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                file_hash.update(chunk)
+                _write_frame(out, DATA, chunk)
+        _write_json_frame(out, FILE_END, {"name": entry["name"], "sha256": file_hash.hexdigest()})
+
+    _write_json_frame(out, END, {"files": len(manifest["files"])})
+    out.flush()
+    return manifest
+
+
+def import_snapshot(stream: BinaryIO, snapshot_dir: str = SNAPSHOT_DIR) -> int:
+    """Verify an archive while unpacking it and publish it as the new current generation"""
+    if _read_exact(stream, len(MAGIC)) != MAGIC:
+        raise ArchiveError("Not a snapshot archive")
+    (version,) = struct.unpack(">H", _read_exact(stream, 2))
+    if version > FORMAT_VERSION:
+        raise ArchiveError(f"Unsupported archive format version {version}")
+
+    kind, payload = _read_frame(stream)
+    if kind != MANIFEST:
+        raise ArchiveError("Archive does not start with a manifest")
+    manifest = _json_payload(payload, "manifest", {"files": list})
+    entries = [_check_fields(entry, "manifest entry", {"name": str, "size": int}) for entry in manifest["files"]]
+    expected = {entry["name"]: entry["size"] for entry in entries}
+    for name in expected:
+        if os.path.basename(name) != name or name.startswith("."):
+            raise ArchiveError(f"Unsafe file name in archive: {name}")
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    tmp_dir = os.path.join(snapshot_dir, f"gen-{os.getpid()}.import.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        received = set()
+        current = None  # (name, file, running hash, bytes written)
+        while True:
+            kind, payload = _read_frame(stream)
+            if kind == FILE_START:
+                entry = _json_payload(payload, "file start", {"name": str})
+                if current is not None or entry["name"] not in expected or entry["name"] in received:
+                    raise ArchiveError(f"Unexpected file {entry['name']}")
+                current = [entry["name"], open(os.path.join(tmp_dir, entry["name"]), "wb"), hashlib.sha256(), 0]
+            elif kind == DATA:
+                if current is None:
+                    raise ArchiveError("Data outside of a file")
+                current[1].write(payload)
+                current[2].update(payload)
+                current[3] += len(payload)
+            elif kind == FILE_END:
+                entry = _json_payload(payload, "file end", {"name": str, "sha256": str})
+                if current is None or entry["name"] != current[0]:
+                    raise ArchiveError("Mismatched end of file")
+                name, f, file_hash, size = current
+                f.close()
+                if size != expected[name] or file_hash.hexdigest() != entry["sha256"]:
+                    raise ArchiveError(f"Verification failed for {name}")
+                received.add(name)
+                current = None
+            elif kind == END:
+                break
+            else:
+                raise ArchiveError(f"Unknown frame kind {kind}")
+        if current is not None or received != set(expected):
+            raise ArchiveError("Archive is missing files")
+    except BaseException:
+        if current is not None and not current[1].closed:
+            current[1].close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    return publish_generation(tmp_dir, snapshot_dir)
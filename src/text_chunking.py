@@ -1,9 +1,21 @@
 import re
 import spacy
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
 nlp = spacy.load("en_core_web_sm")
 
+# Common section headers in CVs
+SECTION_PATTERNS = {
+    "education": r"(?i)\b(education|academic|qualification|degree)s?\b",
+    "experience": r"(?i)\b(experience|employment|work history|professional)\b",
+    "skills": r"(?i)\b(skills|technical skills|competencies|expertise)\b",
+    "projects": r"(?i)\b(projects|portfolio|works)\b",
+    "summary": r"(?i)\b(summary|profile|objective|about me)\b",
+    "certifications": r"(?i)\b(certifications|certificates|accreditations)\b",
+    "languages": r"(?i)\b(languages|language proficiency)\b",
+    "contact": r"(?i)\b(contact|personal details|personal information)\b"
+}
+
 def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
     """
     Split text into overlapping chunks of approximately chunk_size characters.
@@ -88,53 +100,62 @@ def chunk_cv(cv_data: Dict[str, Any], chunk_size: int = 1000, chunk_overlap: int
     
     return cv_data
 
-def extract_sections(text: str) -> Dict[str, str]:
+def extract_section_spans(text: str, section_patterns: Dict[str, str] = None) -> Dict[str, List[Tuple[int, int]]]:
     """
-    Attempt to extract common CV sections like education, experience, skills, etc.
+    Locate common CV sections like education, experience, skills, etc.
     
     Args:
         text: The CV text to analyze
+        section_patterns: Section name -> header regex (defaults to SECTION_PATTERNS)
         
     Returns:
-        Dictionary of section names and their content
+        Dictionary of section names and the (start, end) offsets of their
+        content in ``text``, in the order they were found
     """
-    # Common section headers in CVs
-    section_patterns = {
-        "education": r"(?i)\b(education|academic|qualification|degree)s?\b",
-        "experience": r"(?i)\b(experience|employment|work history|professional)\b",
-        "skills": r"(?i)\b(skills|technical skills|competencies|expertise)\b",
-        "projects": r"(?i)\b(projects|portfolio|works)\b",
-        "summary": r"(?i)\b(summary|profile|objective|about me)\b",
-        "certifications": r"(?i)\b(certifications|certificates|accreditations)\b",
-        "languages": r"(?i)\b(languages|language proficiency)\b",
-        "contact": r"(?i)\b(contact|personal details|personal information)\b"
-    }
+    section_patterns = section_patterns or SECTION_PATTERNS
+    spans = {}
     
-    sections = {}
+    compiled = {section_name: re.compile(pattern) for section_name, pattern in section_patterns.items()}
     
     # Try to find each section in the text
-    for section_name, pattern in section_patterns.items():
-        matches = re.finditer(pattern, text)
+    for section_name, pattern in compiled.items():
+        matches = pattern.finditer(text)
         
         for match in matches:
             start_pos = match.start()
             
-            # Find the next section header after this one
+            # Find the next section header after this one. The search starts
+            # past the header so it cannot find the header again (a "^\s*"
+            # header can match from a preceding blank line), and '^' still only
+            # matches at real line starts when searching from a position.
             next_section_pos = len(text)
-            for other_pattern in section_patterns.values():
-                other_matches = re.finditer(other_pattern, text[start_pos + 1:])
-                for other_match in other_matches:
-                    next_pos = start_pos + 1 + other_match.start()
-                    if next_pos < next_section_pos:
-                        next_section_pos = next_pos
+            for other_pattern in compiled.values():
+                other_match = other_pattern.search(text, max(match.end(), start_pos + 1))
+                if other_match is not None and other_match.start() < next_section_pos:
+                    next_section_pos = other_match.start()
             
-            # Extract the section content
-            section_content = text[start_pos:next_section_pos].strip()
+            # Trim surrounding whitespace without copying the content
+            segment = text[start_pos:next_section_pos]
+            end_pos = start_pos + len(segment.rstrip())
+            start_pos += len(segment) - len(segment.lstrip())
+            if end_pos <= start_pos:
+                continue
             
-            # Store or append to the section
-            if section_name in sections:
-                sections[section_name] += "\n" + section_content
-            else:
-                sections[section_name] = section_content
+            spans.setdefault(section_name, []).append((start_pos, end_pos))
     
-    return sections
\ No newline at end of file
+    return spans
+
+def extract_sections(text: str) -> Dict[str, str]:
+    """
+    Attempt to extract common CV sections like education, experience, skills, etc.
+    
+    Args:
+        text: The CV text to analyze
+        
+    Returns:
+        Dictionary of section names and their content
+    """
+    return {
+        section_name: "\n".join(text[start:end] for start, end in section_spans)
+        for section_name, section_spans in extract_section_spans(text).items()
+    }
@@ -0,0 +1,99 @@
+import os
+import mmap
+import zlib
+import lzma
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Iterable, Tuple
+from config import TEXT_COMPRESSION, TEXT_CACHE_SIZE
+
+# --- Compressed text blob store ---
+#
+# CV texts are written one compressed entry after another into a single blob
+# file, with an offsets array saying where entry i starts and ends. Readers map
+# the blob and only decompress what they actually touch, keeping a small LRU
+# of decompressed hot entries.
+
+_CODECS = {
+    b"ZLB1": (lambda data: zlib.compress(data, 6), zlib.decompress),
+    b"LZM1": (lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+_CODEC_BY_NAME = {"zlib": b"ZLB1", "lzma": b"LZM1"}
+HEADER_SIZE = 4
+
+
+def write_text_blob(path: str, entries: Iterable, codec: str = TEXT_COMPRESSION) -> np.ndarray:
+    """
+    Write text entries to a blob file and return their offsets.
+
+    Args:
+        path: Blob file to create
+        entries: Strings to compress, or (magic, compressed_bytes) tuples that
+                 are copied as-is when the codec matches
+        codec: "zlib" or "lzma"
+
+    Returns:
+        int64 array of len(entries) + 1 offsets; entry i is blob[offsets[i]:offsets[i+1]]
+    """
+    magic = _CODEC_BY_NAME[codec]
+    compress = _CODECS[magic][0]
+    offsets = [HEADER_SIZE]
+    with open(path, "wb") as f:
+        f.write(magic)
+        for entry in entries:
+            if isinstance(entry, tuple) and entry[0] == magic:
+                data = entry[1]
+            else:
+                if isinstance(entry, tuple):
+                    entry = TextBlobStore.decode(*entry)
+                data = compress((entry or "").encode("utf-8"))
+            f.write(data)
+            offsets.append(offsets[-1] + len(data))
+    return np.array(offsets, dtype=np.int64)
+
+
+class TextBlobStore:
+    """Read-only access to a blob written by write_text_blob"""
+
+    def __init__(self, path: str, offsets: np.ndarray, cache_size: int = TEXT_CACHE_SIZE):
+        self.path = path
+        self.offsets = offsets
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        with open(path, "rb") as f:
+            self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.magic = self._blob[:HEADER_SIZE]
+        if self.magic not in _CODECS:
+            raise ValueError(f"Unknown text blob format in {path}")
+
+    @staticmethod
+    def decode(magic: bytes, data: bytes) -> str:
+        return _CODECS[magic][1](data).decode("utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def compressed(self, entry_id: int) -> Tuple[bytes, bytes]:
+        """Raw (magic, compressed bytes) of an entry, for copying into a new blob"""
+        return self.magic, self._blob[self.offsets[entry_id]:self.offsets[entry_id + 1]]
+
+    def get(self, entry_id: int) -> str:
+        with self._lock:
+            text = self._cache.get(entry_id)
+            if text is not None:
+                self._cache.move_to_end(entry_id)
+                return text
+        text = self.decode(*self.compressed(entry_id))
+        with self._lock:
+            self._cache[entry_id] = text
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return text
+
+    def disk_size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def close(self):
+        self._blob.close()
@@ -1,11 +1,15 @@
 import os
 from .text_processing import extract_text_from_pdf, clean_text, extract_contact_info
-from .text_chunking import chunk_text, chunk_cv, extract_sections
+from .text_chunking import chunk_text, chunk_cv, extract_section_spans
+from .cv_record import CVRecord
+from .section_scoring import embed_sections
+from .skills import get_vocabulary, encode_skills
+from .snapshot import write_snapshot, read_snapshot, current_generation
 import faiss
 import numpy as np
 import pickle
 from config import FAISS_INDEX_PATH, METADATA_PATH, embedding_model, CHUNK_SIZE, CHUNK_OVERLAP
-from utils import generate_cv_summary 
+from utils.generate_cv_summary import generate_cv_summary
 
 
 # --- Vector DB Management ---
@@ -26,55 +30,69 @@ def process_cvs(cv_directory):
 
                     contact = extract_contact_info(raw_text)
                     
-                    # Extract sections from the CV
-                    sections = extract_sections(raw_text)
+                    # Locate sections in the CV (stored as offsets into raw_text)
+                    section_spans = extract_section_spans(raw_text)
                     
                     # Create chunks from the raw text
                     chunks = chunk_text(raw_text, CHUNK_SIZE, CHUNK_OVERLAP)
                     
-                    # Create embeddings for each chunk
-                    chunk_embeddings = []
-                    for chunk in chunks:
-                        chunk_embedding = embedding_model.encode([chunk])[0]
-                        chunk_embeddings.append({
-                            "text": chunk,
-                            "embedding": chunk_embedding
-                        })
+                    # Embed all chunks in one batch into a single matrix
+                    chunk_vectors = embedding_model.encode(chunks) if chunks else None
                     
                     # Also create a full document embedding for fallback
                     full_embedding = embedding_model.encode([cleaned])[0]
                     
-                    cv_data.append({
-                        "filename": filename,
-                        "raw_text": raw_text,
-                        "cleaned_text": cleaned,
-                        "embedding": full_embedding,  # Keep the full embedding for backward compatibility
-                        "contact": contact,
-                        "sections": sections,
-                        "chunks": chunks,
-                        "chunk_embeddings": chunk_embeddings,
-                        "chunk_count": len(chunks),
-                        "summary": summary # added by Sheded
-                    })
+                    # One embedding per section, for section-level scoring
+                    section_names, section_vectors = embed_sections(raw_text, section_spans)
+                    
+                    # Map mentioned skills to vocabulary IDs for must-have filtering
+                    vocabulary = get_vocabulary()
+                    skill_bits = encode_skills(raw_text, vocabulary)
+                    
+                    cv_data.append(CVRecord(
+                        filename=filename,
+                        raw_text=raw_text,
+                        cleaned_text=cleaned,
+                        embedding=full_embedding,
+                        contact=contact,
+                        section_spans=section_spans,
+                        chunks=chunks,
+                        chunk_vectors=chunk_vectors,
+                        summary=summary, # added by Sheded
+                        skill_bits=skill_bits,
+                        skill_vocabulary=vocabulary.version,
+                        section_names=section_names,
+                        section_vectors=section_vectors
+                    ))
                 except Exception as e:
                     print(f"Error processing {filename}: {str(e)}")
     return cv_data
 
 
 def save_data(index, metadata):
-    """Safe data serialization"""
+    """Safe data serialization, returns the new snapshot generation"""
     try:
-        faiss.write_index(index, FAISS_INDEX_PATH)
-        with open(METADATA_PATH, 'wb') as f:
-            pickle.dump(metadata, f)
+        return write_snapshot(index, metadata)
     except Exception as e:
         print(f"Error saving data: {str(e)}")
+        return None
 
 def load_data():
-    """Robust data loading"""
+    """Robust data loading (memory-mapped from the current snapshot when there is one)"""
     try:
+        if current_generation() is not None:
+            faiss_index, metadata, _ = read_snapshot()
+            return faiss_index, metadata
+        
+        # Fall back to the single-file layout written by older versions
         if os.path.exists(FAISS_INDEX_PATH) and os.path.exists(METADATA_PATH):
-            return faiss.read_index(FAISS_INDEX_PATH), pickle.load(open(METADATA_PATH, 'rb'))
+            with open(METADATA_PATH, 'rb') as f:
+                metadata = pickle.load(f)
+            # Migrate metadata saved as plain dicts by older versions
+            metadata = [cv if isinstance(cv, CVRecord) else CVRecord.from_legacy(cv) for cv in metadata]
+            faiss_index = faiss.read_index(FAISS_INDEX_PATH)
+            save_data(faiss_index, metadata)
+            return faiss_index, metadata
     except Exception as e:
         print(f"Error loading data: {str(e)}")
     return None, None
@@ -87,7 +105,7 @@ def initialize_system(cv_directory):
         if not cv_data:
             raise ValueError("No valid CVs processed")
 
-        embeddings = np.array([cv["embedding"] for cv in cv_data])
+        embeddings = np.vstack([cv.embedding for cv in cv_data])
         dimension = embeddings.shape[1]
 
         faiss_index = faiss.IndexFlatL2(dimension)
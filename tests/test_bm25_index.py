@@ -0,0 +1,142 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src import bm25_index
+from src.bm25_index import BM25Index, get_bm25_index
+from src.cv_record import CVRecord, RankedCV
+from src.ranking import fuse_rankings
+
+VOCABULARY = "python java kubernetes terraform docker aws sql react rust go linux spark".split()
+
+
+def documents(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {f"cv_{i}.pdf": " ".join(rng.choice(VOCABULARY, size=rng.integers(3, 30))) for i in range(n)}
+
+
+def brute_force(docs, query, k1=1.5, b=0.75):
+    """Textbook BM25 over every document, recomputed from scratch"""
+    tokens = {name: text.split() for name, text in docs.items()}
+    n_docs = len(tokens)
+    avg_length = max(sum(len(t) for t in tokens.values()) / n_docs, 1.0)
+    scores = {}
+    for name, doc in tokens.items():
+        counts = Counter(doc)
+        score = 0.0
+        for term in set(query.split()):
+            df = sum(term in t for t in tokens.values())
+            if not counts[term]:
+                continue
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            tf = counts[term]
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / avg_length))
+        if score > 0:
+            scores[name] = score
+    return scores
+
+
+def build(docs):
+    index = BM25Index()
+    for name, text in docs.items():
+        index.add(name, text)
+    return index
+
+
+def assert_matches(index, docs, query):
+    expected = brute_force(docs, query)
+    results = index.search(query, len(docs))
+    assert {name for name, _ in results} == set(expected)
+    for name, score in results:
+        assert score == pytest.approx(expected[name], rel=1e-5)
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+
+@pytest.mark.parametrize("query", ["python", "kubernetes terraform", "rust go linux spark", "cobol"])
+def test_scores_match_brute_force(query):
+    docs = documents(40)
+    assert_matches(build(docs), docs, query)
+
+
+def test_search_limit_keeps_the_best():
+    docs = documents(40)
+    expected = sorted(brute_force(docs, "docker aws").items(), key=lambda item: -item[1])[:5]
+    results = build(docs).search("docker aws", 5)
+    assert [score for _, score in results] == pytest.approx([score for _, score in expected], rel=1e-5)
+
+
+def test_readding_a_cv_replaces_its_text():
+    docs = documents(10)
+    index = build(docs)
+    index.add("cv_3.pdf", "cobol cobol")
+    docs["cv_3.pdf"] = "cobol cobol"
+    assert_matches(index, docs, "cobol python")
+
+
+def test_remove_and_compact_drop_dead_postings():
+    docs = documents(20)
+    index = build(docs)
+    removed = [f"cv_{i}.pdf" for i in range(6)]
+    for name in removed:
+        assert index.remove(name)
+        del docs[name]
+    assert not index.remove("cv_0.pdf")
+
+    # Six of twenty slots dead crosses COMPACT_DEAD_FRACTION, so slots were renumbered
+    assert index.dead == 0
+    assert index.filenames == list(docs)
+    assert index.slots == {name: slot for slot, name in enumerate(docs)}
+    assert len(index.lengths) == len(docs)
+    for term, (slots, tfs) in index.postings.items():
+        assert len(slots) == len(tfs)
+        for slot, tf in zip(slots, tfs):
+            assert tf == docs[index.filenames[slot]].split().count(term)
+    assert index.total_length == pytest.approx(sum(len(text.split()) for text in docs.values()))
+    assert_matches(index, docs, "python kubernetes sql")
+
+
+def test_removed_cvs_are_not_returned_before_compaction():
+    docs = documents(20)
+    index = build(docs)
+    index.remove("cv_0.pdf")
+    del docs["cv_0.pdf"]
+    assert index.dead == 1
+    assert_matches(index, docs, "python java react")
+
+
+def test_get_bm25_index_catches_up_with_metadata(monkeypatch):
+    monkeypatch.setattr(bm25_index, "_index", None)
+    docs = documents(10)
+    records = [CVRecord(name, text, text, np.zeros(4)) for name, text in docs.items()]
+    index = get_bm25_index(records)
+    assert len(index) == 10
+
+    records = records[2:] + [CVRecord("cv_new.pdf", "cobol", "cobol", np.zeros(4))]
+    assert get_bm25_index(records) is index
+    assert set(index.slots) == {cv.filename for cv in records}
+    assert index.search("cobol", 5)[0][0] == "cv_new.pdf"
+
+
+def ranked(names_and_scores):
+    return [RankedCV(CVRecord(name, "", "", np.zeros(4)), score) for name, score in names_and_scores]
+
+
+def test_rrf_fusion_order():
+    dense = ranked([("a", 0.9), ("b", 0.8), ("c", 0.7)])
+    lexical = [("d", 12.0), ("c", 9.0), ("a", 1.0)]
+    # RRF_K = 60: a 1/61 + 1/63, c 1/63 + 1/62, d 1/61, b 1/62
+    assert fuse_rankings(dense, lexical, mode="rrf") == ["a", "c", "d", "b"]
+
+
+def test_weighted_fusion_order():
+    dense = ranked([("a", 0.9), ("b", 0.5), ("c", 0.1)])
+    lexical = [("c", 10.0), ("b", 6.0), ("d", 0.0)]
+    # HYBRID_BM25_WEIGHT = 0.4: a 0.6, b 0.3 + 0.24, c 0 + 0.4, d 0
+    assert fuse_rankings(dense, lexical, mode="weighted") == ["a", "b", "c", "d"]
+
+
+def test_fusion_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        fuse_rankings([], [], mode="max")
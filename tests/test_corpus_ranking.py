@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from src import corpus_ranking
+from src.corpus_ranking import CorpusRanking, CorpusVectors, stream_top_k, vector_ordering
+from src.cv_record import CVRecord, RankedCV
+
+
+def blocks_of(scores, block_rows):
+    return [(start, scores[start:start + block_rows]) for start in range(0, len(scores), block_rows)]
+
+
+def full_argsort(scores, k=None):
+    order = np.argsort(-scores, kind="stable")[:k]
+    return order, scores[order]
+
+
+@pytest.mark.parametrize("k", [None, 1, 3, 10, 50, 500])
+@pytest.mark.parametrize("block_rows", [7, 64, 1000])
+def test_stream_top_k_matches_full_argsort(k, block_rows):
+    # Rounded scores make plenty of ties, which must go to the earlier row
+    scores = np.round(np.random.default_rng(k or 0).random(300), 2).astype(np.float32)
+    rows, top = stream_top_k(blocks_of(scores, block_rows), k)
+    expected_rows, expected_scores = full_argsort(scores, k)
+    np.testing.assert_array_equal(rows, expected_rows)
+    np.testing.assert_array_equal(top, expected_scores)
+
+
+def test_stream_top_k_without_blocks():
+    for k in (None, 5):
+        rows, scores = stream_top_k([], k)
+        assert len(rows) == 0 and len(scores) == 0
+
+
+def corpus(n, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return [CVRecord(f"cv_{i}.pdf", "", "", rng.standard_normal(dim)) for i in range(n)]
+
+
+class Job:
+    def __init__(self, embedding):
+        self.embedding = embedding
+        self.content_hash = "job"
+        self.path = "job.txt"
+
+
+def test_vector_ordering_matches_brute_force_across_blocks(monkeypatch):
+    monkeypatch.setattr(corpus_ranking, "_corpus", None)
+    monkeypatch.setattr(corpus_ranking, "_ordering", {"key": None, "rows": None, "scores": None})
+    records = corpus(50)
+    job = Job(np.random.default_rng(1).standard_normal(8))
+    _, rows, scores = vector_ordering(job, records, "faiss", depth=12, block_rows=8)
+
+    vectors = np.vstack([cv.embedding for cv in records])
+    expected = 1 / (1 + ((vectors - job.embedding) ** 2).sum(axis=1))
+    np.testing.assert_array_equal(rows, np.argsort(-expected, kind="stable")[:12])
+    np.testing.assert_allclose(scores, expected[rows], rtol=1e-5)
+
+
+def ranking_with_head(n_records=30, head_rows=(4, 0, 9), allowed=None):
+    records = corpus(n_records)
+    vectors = CorpusVectors(records)
+    scores = np.linspace(1, 0, n_records, dtype=np.float32)
+    rows = np.arange(n_records)
+    head = [RankedCV(records[row], 2.0) for row in head_rows]
+    return records, head, CorpusRanking(vectors, head, rows, scores, allowed)
+
+
+def test_tail_excludes_head_cvs():
+    records, head, ranking = ranking_with_head()
+    assert len(ranking) == len(records)
+    assert not {0, 4, 9} & set(ranking.tail_rows.tolist())
+    assert [cv.filename for cv in ranking.page(0, len(ranking))] == \
+        [cv.filename for cv in head] + [records[row].filename for row in range(30) if row not in (0, 4, 9)]
+
+
+@pytest.mark.parametrize("offset,limit", [(0, 2), (1, 2), (2, 4), (3, 3), (5, 10), (25, 10), (30, 5), (40, 5)])
+def test_page_across_head_tail_boundary(offset, limit):
+    _, _, ranking = ranking_with_head()
+    everything = ranking.page(0, len(ranking))
+    page = ranking.page(offset, limit)
+    assert [cv.filename for cv in page] == [cv.filename for cv in everything[offset:offset + limit]]
+    assert [cv.similarity for cv in page] == [cv.similarity for cv in everything[offset:offset + limit]]
+
+
+def test_page_keeps_head_and_tail_scores():
+    _, head, ranking = ranking_with_head()
+    page = ranking.page(2, 2)
+    assert page[0] is head[2]
+    assert page[1].filename == "cv_1.pdf"
+    assert page[1].similarity == pytest.approx(1 - 1 / 29)
+
+
+def test_allowed_mask_filters_tail_only():
+    allowed = np.arange(30) % 2 == 1
+    _, head, ranking = ranking_with_head(allowed=allowed)
+    assert ranking.tail_rows.tolist() == [row for row in range(30) if row % 2 == 1 and row != 9]
+    assert ranking.page(0, 3) == head
+
+
+def test_at():
+    _, head, ranking = ranking_with_head()
+    assert ranking.at(1) is head[1]
+    assert ranking.at(3).filename == "cv_1.pdf"
+    assert ranking.at(-1) is None
+    assert ranking.at(len(ranking)) is None
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from src import ranking
+from src.cv_record import CVRecord, RankedCV
+
+
+class Job:
+    cleaned_text = "job"
+
+
+@pytest.fixture
+def new_cv_scoring(monkeypatch):
+    """Insert with the new CV's first-stage score fixed to the given value"""
+    monkeypatch.setattr(ranking, "get_job_artifacts", lambda path: Job())
+
+    def insert(ranked, score):
+        monkeypatch.setattr(ranking, "job_similarity", lambda record, job: score)
+        return ranking.insert_candidate(ranked, record("new"), "job.pdf")
+    return insert
+
+
+def record(name):
+    return CVRecord(f"{name}.pdf", "", "", np.zeros(4))
+
+
+def ranked(*scores):
+    # LLM order, so the scores are deliberately not sorted
+    return [RankedCV(record(f"cv_{i}"), score) for i, score in enumerate(scores)]
+
+
+def names(ranking_list):
+    return [cv.filename for cv in ranking_list]
+
+
+def test_goes_after_the_last_higher_scored_candidate(new_cv_scoring):
+    current = ranked(0.6, 0.9, 0.5, 0.8, 0.3)
+    new_ranking, position = new_cv_scoring(current, 0.7)
+    assert position == 4
+    assert names(new_ranking) == ["cv_0.pdf", "cv_1.pdf", "cv_2.pdf", "cv_3.pdf", "new.pdf", "cv_4.pdf"]
+
+
+def test_beating_everyone_goes_first(new_cv_scoring):
+    new_ranking, position = new_cv_scoring(ranked(0.6, 0.9, 0.5), 0.95)
+    assert position == 0 and names(new_ranking)[0] == "new.pdf"
+
+
+def test_beating_only_the_weakest_stays_low(new_cv_scoring, monkeypatch):
+    monkeypatch.setattr(ranking, "FINAL_RANKING", 5)
+    current = ranked(0.2, 0.9, 0.8, 0.7, 0.6)
+    new_ranking, position = new_cv_scoring(current, 0.3)
+    assert position is None and new_ranking == current
+
+
+def test_full_ranking_keeps_its_length(new_cv_scoring, monkeypatch):
+    monkeypatch.setattr(ranking, "FINAL_RANKING", 5)
+    new_ranking, position = new_cv_scoring(ranked(0.9, 0.5, 0.8, 0.7, 0.6), 0.75)
+    assert position == 3
+    assert names(new_ranking) == ["cv_0.pdf", "cv_1.pdf", "cv_2.pdf", "new.pdf", "cv_3.pdf"]
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+
+from src import job_matrix
+from src.cv_record import CVRecord, RankedCV
+from src.snapshot import generation_path
+
+
+class Job:
+    def __init__(self, path, embedding):
+        self.path = path
+        self.content_hash = f"hash-{os.path.basename(path)}"
+        self.embedding = embedding
+
+
+def setup_store(tmp_path, monkeypatch, dim=8):
+    rng = np.random.default_rng(0)
+    metadata = [CVRecord(f"cv_{i}.pdf", "", "", rng.standard_normal(dim)) for i in range(30)]
+    jobs = {path: Job(path, rng.standard_normal(dim).astype(np.float32)) for path in ("a.pdf", "b.pdf")}
+    monkeypatch.setattr(job_matrix, "get_job_artifacts", lambda path: jobs[path])
+    monkeypatch.setattr(job_matrix, "list_job_files", lambda: ["a.pdf", "b.pdf"])
+    monkeypatch.setattr(job_matrix, "_store", {"generation": None, "rankings": {}})
+    os.makedirs(generation_path(1, str(tmp_path)))
+    return metadata, jobs
+
+
+def test_vector_ranking_is_the_closest_cvs(tmp_path, monkeypatch):
+    metadata, jobs = setup_store(tmp_path, monkeypatch)
+    ranked = job_matrix.get_job_ranking(metadata, "a.pdf", 1, str(tmp_path), limit=5)
+    distances = [float(np.sum((cv.embedding - jobs["a.pdf"].embedding) ** 2)) for cv in metadata]
+    assert [cv.filename for cv in ranked] == [metadata[i].filename for i in np.argsort(distances)[:5]]
+
+
+def test_jobs_are_scored_outside_the_store_lock(tmp_path, monkeypatch):
+    metadata, _ = setup_store(tmp_path, monkeypatch)
+    compute = job_matrix.compute_job_rankings
+
+    def compute_and_save_refined(metadata, paths):
+        # Another thread saving a refined ranking meanwhile must not block, nor be overwritten
+        assert job_matrix._store_lock.acquire(blocking=False)
+        job_matrix._store_lock.release()
+        job_matrix.save_refined_ranking("b.pdf", [RankedCV(metadata[3], 0.9)], 1, str(tmp_path))
+        return compute(metadata, paths)
+
+    monkeypatch.setattr(job_matrix, "compute_job_rankings", compute_and_save_refined)
+    assert job_matrix.get_job_ranking(metadata, "a.pdf", 1, str(tmp_path))
+    assert [cv.filename for cv in job_matrix.get_job_ranking(metadata, "b.pdf", 1, str(tmp_path))] == ["cv_3.pdf"]
+    assert job_matrix.has_refined_ranking("b.pdf", 1, str(tmp_path))
+    assert job_matrix._store["rankings"]["hash-b.pdf"]["vector"]
+
+
+def test_no_metadata_no_ranking(tmp_path, monkeypatch):
+    setup_store(tmp_path, monkeypatch)
+    assert job_matrix.get_job_ranking(None, "a.pdf", 1, str(tmp_path)) == []
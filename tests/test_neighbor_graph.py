@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from src.cv_record import CVRecord
+from src.neighbor_graph import NeighborGraph
+
+
+def corpus(n, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    return [CVRecord(f"cv_{i}.pdf", "", "", rng.standard_normal(dim)) for i in range(n)]
+
+
+def brute_force(records, filename, top_n):
+    vectors = np.vstack([cv.embedding for cv in records])
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    row = [cv.filename for cv in records].index(filename)
+    sims = vectors @ vectors[row]
+    sims[row] = -np.inf
+    return [records[i].filename for i in np.argsort(-sims)[:top_n]]
+
+
+def test_similar_matches_brute_force_after_updates():
+    records = corpus(60)
+    graph = NeighborGraph(records[:50], k=5)
+    for record in records[50:]:
+        graph.add(record)
+    graph.remove("cv_7.pdf")
+    remaining = [cv for cv in records if cv.filename != "cv_7.pdf"]
+    for filename in ("cv_0.pdf", "cv_8.pdf", "cv_55.pdf"):
+        assert [cv.filename for cv in graph.similar(filename, 5)] == brute_force(remaining, filename, 5)
+
+
+@pytest.mark.parametrize("top_n", [0, -1, 6])
+def test_similar_rejects_top_n_outside_1_to_k(top_n):
+    graph = NeighborGraph(corpus(10), k=5)
+    with pytest.raises(ValueError):
+        graph.similar("cv_0.pdf", top_n)
@@ -0,0 +1,65 @@
+import pytest
+
+from src.ranking import adaptive_pool_size, POOL_SIZINGS
+
+
+class Candidate:
+    def __init__(self, similarity):
+        self.similarity = similarity
+
+
+def scored(*scores):
+    return [Candidate(score) for score in scores]
+
+
+def falling(n, start=0.9, step=0.01):
+    return scored(*(start - i * step for i in range(n)))
+
+
+@pytest.mark.parametrize("method", POOL_SIZINGS)
+def test_at_most_min_size_keeps_everyone(method):
+    assert adaptive_pool_size(falling(3), max_size=20, min_size=5, method=method) == 3
+    assert adaptive_pool_size(falling(5), max_size=20, min_size=5, method=method) == 5
+    assert adaptive_pool_size([], max_size=20, min_size=5, method=method) == 0
+
+
+@pytest.mark.parametrize("method", POOL_SIZINGS)
+def test_between_min_and_max_stays_in_bounds(method):
+    for n in (6, 15, 20):
+        size = adaptive_pool_size(falling(n), max_size=20, min_size=5, method=method)
+        assert 5 <= size <= n
+
+
+@pytest.mark.parametrize("method", POOL_SIZINGS)
+def test_more_than_max_is_capped(method):
+    size = adaptive_pool_size(falling(150), max_size=20, min_size=5, method=method)
+    assert 5 <= size <= 20
+
+
+def test_fixed_takes_max():
+    assert adaptive_pool_size(falling(15), max_size=20, min_size=5, method="fixed") == 15
+    assert adaptive_pool_size(falling(150), max_size=20, min_size=5, method="fixed") == 20
+
+
+def test_cuts_at_a_standout_drop():
+    candidates = scored(0.9, 0.89, 0.88, 0.87, 0.86, 0.85, 0.84, *(0.5 - i * 0.01 for i in range(8)))
+    assert adaptive_pool_size(candidates, max_size=20, min_size=5, method="gap") == 7
+    assert adaptive_pool_size(candidates, max_size=20, min_size=5, method="threshold") == 7
+    assert adaptive_pool_size(candidates, max_size=20, min_size=5, method="elbow") in (7, 8)
+
+
+def test_even_fall_off_keeps_max():
+    assert adaptive_pool_size(falling(150, step=0.004), max_size=20, min_size=5, method="gap") == 20
+    assert adaptive_pool_size(falling(150, step=0.004), max_size=20, min_size=5, method="elbow") == 20
+
+
+def test_cut_follows_candidate_order():
+    # Fusion moved a weaker dense match up: the cut is where the list drops, not where sorted scores would
+    candidates = scored(0.9, 0.89, 0.88, 0.87, 0.86, 0.85, 0.4, 0.84, 0.39, 0.38, 0.37, 0.36)
+    assert adaptive_pool_size(candidates, max_size=20, min_size=5, method="gap") == 6
+    assert adaptive_pool_size(candidates, max_size=20, min_size=5, method="threshold") == 6
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        adaptive_pool_size(falling(3), method="median")
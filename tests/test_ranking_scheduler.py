@@ -0,0 +1,122 @@
+import time
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from src.ranking_scheduler import RankingScheduler, RankingSnapshot
+
+
+class Recorder:
+    """A run function that records its batches and how many runs overlap"""
+
+    def __init__(self, result=None):
+        self.batches = []
+        self.result = result
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, batch):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.batches.append(batch)
+        time.sleep(0.01)
+        with self.lock:
+            self.running -= 1
+        return self.result(batch) if callable(self.result) else {"run": len(self.batches)}
+
+
+def test_burst_is_debounced_into_one_run():
+    run = Recorder()
+    scheduler = RankingScheduler(run, debounce_ms=50, max_delay_ms=5000)
+    futures = [scheduler.request(added=[f"cv_{i}.pdf"]) for i in range(20)]
+    futures[-1].result(timeout=2)
+    assert len({id(future) for future in futures}) == 1
+    assert len(run.batches) == 1
+    assert scheduler.status()["requests"] == 20
+
+
+def test_requests_are_coalesced():
+    run = Recorder()
+    scheduler = RankingScheduler(run, debounce_ms=50, max_delay_ms=5000)
+    scheduler.request(added=["a.pdf"], options={"reranker": "llm", "mmr_lambda": 0.5})
+    scheduler.request(full=True, added=["b.pdf", "a.pdf"])
+    scheduler.request(options={"reranker": "none"}).result(timeout=2)
+    assert run.batches == [{"full": True, "added": ["a.pdf", "b.pdf"],
+                            "options": {"reranker": "none", "mmr_lambda": 0.5}}]
+
+
+def test_max_delay_flushes_a_steady_trickle():
+    run = Recorder()
+    scheduler = RankingScheduler(run, debounce_ms=100, max_delay_ms=200)
+    future = scheduler.request()
+    deadline = time.monotonic() + 2
+    while not future.done() and time.monotonic() < deadline:
+        scheduler.request()
+        time.sleep(0.02)
+    assert future.done()
+
+
+def test_immediate_skips_the_debounce():
+    run = Recorder()
+    scheduler = RankingScheduler(run, debounce_ms=10000, max_delay_ms=10000)
+    assert scheduler.request(full=True, immediate=True).result(timeout=2) == {"run": 1}
+
+
+def test_discarded_batch_is_requeued():
+    # The first run finds its inputs changed (a stale tag) and is discarded
+    run = Recorder(lambda batch: {"discarded": True} if len(run.batches) == 1 else {"ok": True})
+    scheduler = RankingScheduler(run, debounce_ms=20, max_delay_ms=1000)
+    assert scheduler.request(full=True, added=["a.pdf"]).result(timeout=2) == {"discarded": True}
+    deadline = time.monotonic() + 2
+    while len(run.batches) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert run.batches[1] == run.batches[0] == {"full": True, "added": ["a.pdf"], "options": {}}
+    assert scheduler.status()["requeued"] == 1
+
+
+def test_next_batch_waits_for_held_work():
+    pending = Future()
+    run = Recorder()
+
+    def run_and_hold(batch):
+        result = run(batch)
+        if len(run.batches) == 1:
+            # Like a provisional ranking whose LLM re-ranking is still running
+            scheduler.hold(pending)
+        return result
+
+    scheduler = RankingScheduler(run_and_hold, debounce_ms=10, max_delay_ms=100)
+    scheduler.request(full=True).result(timeout=2)
+    assert scheduler.status()["settling"]
+
+    second = scheduler.request(full=True, immediate=True)
+    time.sleep(0.2)
+    assert not second.done() and len(run.batches) == 1
+
+    pending.set_result(["re-ranked"])
+    second.result(timeout=2)
+    assert len(run.batches) == 2
+    assert not scheduler.status()["settling"]
+
+
+def test_runs_never_overlap():
+    run = Recorder()
+    scheduler = RankingScheduler(run, debounce_ms=1, max_delay_ms=5)
+    threads = [threading.Thread(target=lambda: [scheduler.request(immediate=True) for _ in range(20)])
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    scheduler.request(immediate=True).result(timeout=5)
+    assert run.max_running == 1
+
+
+def test_snapshot_is_immutable():
+    snapshot = RankingSnapshot(["a", "b"], 3, 7, "hash", provisional=True)
+    assert snapshot.candidates == ("a", "b") and snapshot.tag == (7, "hash")
+    with pytest.raises(AttributeError):
+        snapshot.version = 4
@@ -0,0 +1,37 @@
+import pytest
+
+from src import ranking
+
+
+@pytest.fixture
+def rerankers(monkeypatch):
+    monkeypatch.setattr(ranking, "_observed_latency_ms", {})
+    calls = []
+
+    def failing_llm(job, candidates, deadline=None, **options):
+        calls.append("llm")
+        raise ConnectionError("no network")
+
+    def reverse(job, candidates, deadline=None, **options):
+        calls.append("cross-encoder")
+        return list(reversed(candidates))
+
+    monkeypatch.setitem(ranking.RERANKERS, "llm", failing_llm)
+    monkeypatch.setitem(ranking.RERANKERS, "cross-encoder", reverse)
+    return calls
+
+
+def test_failure_falls_back_and_is_remembered(rerankers):
+    stats = {}
+    assert ranking.rerank(None, [1, 2, 3], "llm", stats=stats) == [3, 2, 1]
+    assert stats["reranker"] == "cross-encoder" and stats["requested_reranker"] == "llm"
+    assert ranking._observed_latency_ms["llm"] >= ranking.RERANK_FAILURE_PENALTY_MS
+    assert "cross-encoder" in ranking._observed_latency_ms
+
+
+def test_budget_skips_a_reranker_that_failed(rerankers):
+    ranking.rerank(None, [1, 2, 3], "llm")
+    assert rerankers == ["llm", "cross-encoder"]
+    deadline = ranking.time.monotonic() + ranking.RERANK_FAILURE_PENALTY_MS / 2000
+    assert ranking.rerank(None, [1, 2, 3], "llm", deadline=deadline) == [3, 2, 1]
+    assert rerankers == ["llm", "cross-encoder", "cross-encoder"]
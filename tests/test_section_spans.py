@@ -0,0 +1,40 @@
+from src.job_cache import JD_SECTION_PATTERNS
+from src.text_chunking import extract_section_spans
+
+
+def sections(text, patterns=None):
+    return {name: [text[start:end] for start, end in spans]
+            for name, spans in extract_section_spans(text, patterns).items()}
+
+
+def test_job_headers_after_blank_lines():
+    text = "Intro\n\nRequirements\n- Docker\n\nSkills\n- AWS\n"
+    assert sections(text, JD_SECTION_PATTERNS) == {"requirements": ["Requirements\n- Docker"],
+                                                   "skills": ["Skills\n- AWS"]}
+
+
+def test_job_headers_indented():
+    text = "Intro\n  Requirements\n  - Docker\n\n\tSkills\n  - AWS\n"
+    assert sections(text, JD_SECTION_PATTERNS) == {"requirements": ["Requirements\n  - Docker"],
+                                                   "skills": ["Skills\n  - AWS"]}
+
+
+def test_job_headers_without_blank_lines():
+    text = "Intro\nRequirements\n- Docker\nSkills\n- AWS\n"
+    assert sections(text, JD_SECTION_PATTERNS) == {"requirements": ["Requirements\n- Docker"],
+                                                   "skills": ["Skills\n- AWS"]}
+
+
+def test_header_words_mid_line_are_not_headers():
+    text = "Requirements\n- Docker skills and education in\nBenefits\n- Remote\n"
+    found = sections(text, JD_SECTION_PATTERNS)
+    assert found["requirements"] == ["Requirements\n- Docker skills and education in"]
+    assert "skills" not in found and "education" not in found
+
+
+def test_cv_sections():
+    text = "Summary\nBackend engineer.\n\nExperience\nAcme, 2019-2024\n\nEducation\nBSc Computer Science\n"
+    found = sections(text)
+    assert found["summary"] == ["Summary\nBackend engineer."]
+    assert found["experience"] == ["Experience\nAcme, 2019-2024"]
+    assert found["education"] == ["Education\nBSc Computer Science"]
@@ -0,0 +1,135 @@
+import faiss
+import numpy as np
+import pytest
+
+from src import skills
+from src.cv_record import CVRecord
+from src.ranking import dense_candidates
+from src.skills import SkillVocabulary, decode_skills, encode_skills, has_skills, must_have_mask
+
+# Filler skills push Kubernetes past the first 64-bit word of the bitset
+ENTRIES = {
+    "C": [],
+    "C++": ["cpp"],
+    "C#": ["csharp"],
+    "Python": [],
+    "Go": ["golang"],
+    "Google Cloud Platform": ["GCP", "google cloud"],
+    "Machine Learning": ["ML"],
+    **{f"Skill{i}": [] for i in range(60)},
+    "Kubernetes": ["k8s"],
+}
+
+
+@pytest.fixture
+def vocabulary(monkeypatch):
+    vocabulary = SkillVocabulary(ENTRIES)
+    monkeypatch.setattr(skills, "_vocabulary", vocabulary)
+    monkeypatch.setattr(skills, "_cached_matrix", None)
+    return vocabulary
+
+
+def found(text, vocabulary):
+    return decode_skills(encode_skills(text, vocabulary), vocabulary)
+
+
+def test_bitset_spans_whole_words(vocabulary):
+    assert vocabulary.ids["kubernetes"] >= 64
+    assert vocabulary.n_bytes == 16
+    assert len(encode_skills("Python and k8s", vocabulary)) == 16
+    assert found("Python and k8s", vocabulary) == ["Python", "Kubernetes"]
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("Wrote C++ services", ["C++"]),
+    ("Embedded C and some C#", ["C", "C#"]),
+    ("C, C++ and cpp", ["C", "C++"]),
+    ("Objective-C", ["C"]),
+    ("CSS and Cobol", []),
+    ("Deployed on Google   Cloud\nPlatform", ["Google Cloud Platform"]),
+    ("google cloud functions", ["Google Cloud Platform"]),
+    ("machine learning (ML) pipelines", ["Machine Learning"]),
+    ("Go, golang and Google", ["Go"]),
+    ("HTML5 and XML", []),
+    ("", []),
+])
+def test_alias_matching(vocabulary, text, expected):
+    assert found(text, vocabulary) == expected
+
+
+def test_skill_ids_accept_names_and_aliases(vocabulary):
+    assert vocabulary.skill_ids(["python", "GCP", "Google  Cloud Platform", "c++"]) == [3, 5, 5, 1]
+    with pytest.raises(ValueError):
+        vocabulary.skill_ids(["cobol"])
+
+
+def test_empty_vocabulary_matches_nothing():
+    vocabulary = SkillVocabulary({})
+    assert encode_skills("Python", vocabulary) == b""
+    assert decode_skills(b"", vocabulary) == []
+
+
+def test_version_changes_with_entries():
+    assert SkillVocabulary(ENTRIES).version == SkillVocabulary(dict(ENTRIES)).version
+    assert SkillVocabulary(ENTRIES).version != SkillVocabulary(dict(ENTRIES, Rust=[])).version
+
+
+TEXTS = [
+    "Python and C++ on GCP",
+    "C developer, some golang",
+    "Python, k8s, machine learning",
+    "Python and Kubernetes on google cloud",
+    "Nothing relevant",
+]
+
+
+def records(dim=4, seed=0):
+    rng = np.random.default_rng(seed)
+    return [CVRecord(f"cv_{i}.pdf", text, text.lower(), rng.standard_normal(dim)) for i, text in enumerate(TEXTS)]
+
+
+def test_must_have_mask(vocabulary):
+    metadata = records()
+    assert must_have_mask(metadata, []) is None
+    assert must_have_mask(metadata, ["Python"]).tolist() == [True, False, True, True, False]
+    assert must_have_mask(metadata, ["python", "kubernetes"]).tolist() == [False, False, True, True, False]
+    assert must_have_mask(metadata, ["C"]).tolist() == [False, True, False, False, False]
+    with pytest.raises(ValueError):
+        must_have_mask(metadata, ["cobol"])
+
+
+def test_has_skills_agrees_with_mask(vocabulary):
+    metadata = records()
+    for must_have in ([], ["Python"], ["GCP", "Python"], ["k8s"], ["Go", "C"]):
+        mask = must_have_mask(metadata, must_have)
+        expected = [True] * len(metadata) if mask is None else mask.tolist()
+        assert [has_skills(cv, must_have) for cv in metadata] == expected
+
+
+def test_stale_bits_are_recomputed(vocabulary):
+    record = records()[0]
+    record.skill_bits, record.skill_vocabulary = bytes(vocabulary.n_bytes), "old"
+    assert has_skills(record, ["C++"])
+    assert record.skill_vocabulary == vocabulary.version
+
+
+class Job:
+    def __init__(self, embedding):
+        self.embedding = np.asarray(embedding, dtype=np.float32)
+
+
+def test_dense_candidates_restricted_to_allowed_rows(vocabulary):
+    metadata = records()
+    index = faiss.IndexFlatL2(4)
+    index.add(np.vstack([cv.embedding for cv in metadata]))
+    job = Job(metadata[1].embedding + 0.01)
+    allowed = must_have_mask(metadata, ["Python"])
+
+    candidates = dense_candidates(job, index, metadata, "faiss", limit=10, allowed=allowed)
+    distances = ((np.vstack([cv.embedding for cv in metadata]) - job.embedding) ** 2).sum(axis=1)
+    expected = [i for i in np.argsort(distances) if allowed[i]]
+    assert [cv.filename for cv in candidates] == [metadata[i].filename for i in expected]
+    assert [cv.similarity for cv in candidates] == pytest.approx([1 / (1 + distances[i]) for i in expected], rel=1e-5)
+
+    assert dense_candidates(job, index, metadata, "faiss", limit=10,
+                            allowed=must_have_mask(metadata, ["C#"])) == []
@@ -0,0 +1,76 @@
+import io
+import os
+import struct
+
+import pytest
+
+from src.snapshot_archive import (ArchiveError, MAGIC, FORMAT_VERSION, MANIFEST, FILE_START, DATA, FILE_END, END,
+                                  _write_frame, _write_json_frame, export_snapshot, import_snapshot)
+from src.snapshot import current_generation, generation_path
+
+
+def write_generation(snapshot_dir, files):
+    path = generation_path(1, snapshot_dir)
+    os.makedirs(path)
+    for name, data in files.items():
+        with open(os.path.join(path, name), "wb") as f:
+            f.write(data)
+    with open(os.path.join(snapshot_dir, "CURRENT"), "w") as f:
+        f.write("1")
+
+
+def archive(*frames):
+    out = io.BytesIO()
+    out.write(MAGIC)
+    out.write(struct.pack(">H", FORMAT_VERSION))
+    for kind, payload in frames:
+        if isinstance(payload, (dict, list)):
+            _write_json_frame(out, kind, payload)
+        else:
+            _write_frame(out, kind, payload)
+    out.seek(0)
+    return out
+
+
+def test_round_trip(tmp_path):
+    source, target = str(tmp_path / "source"), str(tmp_path / "target")
+    files = {"embeddings.npy": os.urandom(10000), "records.pkl": b"records"}
+    write_generation(source, files)
+    out = io.BytesIO()
+    export_snapshot(out, snapshot_dir=source)
+    out.seek(0)
+    generation = import_snapshot(out, target)
+    assert current_generation(target) == generation
+    for name, data in files.items():
+        with open(os.path.join(generation_path(generation, target), name), "rb") as f:
+            assert f.read() == data
+
+
+@pytest.mark.parametrize("frames", [
+    [(MANIFEST, b"not json")],
+    [(MANIFEST, [1, 2])],
+    [(MANIFEST, {"generation": 1})],
+    [(MANIFEST, {"files": [{"name": "a.npy"}]})],
+    [(MANIFEST, {"files": [{"size": 3}]})],
+    [(MANIFEST, {"files": ["a.npy"]})],
+    [(MANIFEST, {"files": [{"name": "a.npy", "size": 3}]}), (FILE_START, b"\xff")],
+    [(MANIFEST, {"files": [{"name": "a.npy", "size": 3}]}), (FILE_START, {"size": 3})],
+    [(MANIFEST, {"files": [{"name": "a.npy", "size": 3}]}), (FILE_START, {"name": "a.npy"}), (DATA, b"abc"),
+     (FILE_END, {"name": "a.npy"})],
+    [(MANIFEST, {"files": [{"name": "../a.npy", "size": 3}]})],
+])
+def test_malformed_archives_raise_archive_error(tmp_path, frames):
+    with pytest.raises(ArchiveError):
+        import_snapshot(archive(*frames, (END, {"files": 1})), str(tmp_path))
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_corrupted_data_fails_verification(tmp_path):
+    source = str(tmp_path / "source")
+    write_generation(source, {"records.pkl": b"records"})
+    out = io.BytesIO()
+    export_snapshot(out, snapshot_dir=source)
+    data = bytearray(out.getvalue())
+    data[-60] ^= 1
+    with pytest.raises(ArchiveError):
+        import_snapshot(io.BytesIO(bytes(data)), str(tmp_path / "target"))